@@ -0,0 +1,463 @@
+import abc
+import collections
+import functools
+import os
+import pickle
+import statistics
+import threading
+import time
+import uuid
+import numpy as np
+from multiprocessing import Pool, shared_memory
+from multiprocessing.pool import ThreadPool
+
+from color_classifier import get_color_classifier
+from detection import filter_points_by_distance, find_matching_pixels, find_blobs, point_blobs
+from template_matching import TemplateMatcher
+
+# --- Analysis State and Pool (for "The Brain") ---
+# Everything that only changes with the window size or the color set (shared-memory
+# views, the compiled color table, ROI tile masks) lives in an AnalysisConfig. Each
+# pool worker arms itself from it once and keeps the state resident, so per-frame
+# tasks carry nothing but a config generation, a frame slot, a frame ID and a tile.
+
+class AnalysisConfig:
+    """
+    Per-session analysis settings, published to the pool once per change.
+
+    Args:
+        slot_names (list): Shared-memory names of the frame ring slots.
+        shape (tuple): Frame shape.
+        dtype: Frame dtype.
+        color_specs (tuple): Output of `build_color_specs`.
+        min_check_pixel (int): Minimum spacing between returned points.
+        stride (int): Pyramid search stride (1 = full resolution).
+        tile_masks (dict): (start_y, start_x) -> mask for tiles partly inside the ROI.
+        channel_order (str): Pixel layout of the frames, e.g. 'BGRA' for mss captures.
+        templates (tuple): Loaded `template_matching.Template`s. Their labels follow
+            the colors' (the first template is label len(color_specs) + 1).
+        blobs (bool): Blob mode: return `detection.find_blobs` rows (one per
+            connected region of matching pixels, plus the spans where it
+            touches the tile edge) instead of thinned pixels.
+        min_blob_area, max_blob_area (int): Area limits (px) of blobs (max None = no limit).
+    """
+
+    def __init__(self, slot_names, shape, dtype, color_specs, min_check_pixel, stride=1, tile_masks=None, channel_order="BGRA", templates=(),
+                 blobs=False, min_blob_area=1, max_blob_area=None):
+        self.slot_names = tuple(slot_names)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.color_specs = color_specs
+        self.min_check_pixel = min_check_pixel
+        self.stride = stride
+        self.tile_masks = tile_masks or {}
+        self.channel_order = channel_order
+        self.templates = tuple(templates)
+        self.blobs = blobs
+        self.min_blob_area, self.max_blob_area = min_blob_area, max_blob_area
+
+class AnalysisContext:
+    """Armed analysis state: zero-copy views of every frame slot plus the compiled classifier and templates."""
+
+    def __init__(self, config):
+        self.config = config
+        self._shms = [shared_memory.SharedMemory(name=name) for name in config.slot_names]
+        self.frames = [np.ndarray(config.shape, dtype=config.dtype, buffer=shm.buf) for shm in self._shms]
+        self.classifier = get_color_classifier(config.color_specs, channel_order=config.channel_order) if config.color_specs else None
+        self.template_matcher = (TemplateMatcher(config.templates, config.channel_order, first_label=len(config.color_specs) + 1)
+                                 if config.templates else None)
+
+    def analyze(self, slot_index, start_y, start_x, height, width):
+        """
+        Returns the (x, y, label) frame coordinates and color labels of target points
+        in one tile of one frame slot. In blob mode, returns blob rows instead
+        (template matches as area-0 rows), to be merged with `detection.stitch_blobs`.
+        """
+        frame = self.frames[slot_index]
+        chunk = frame[start_y:start_y + height, start_x:start_x + width]
+        found = []
+
+        if self.template_matcher:
+            # Template windows may reach past the tile (never past the frame), so seams don't split matches
+            margin_y, margin_x = self.template_matcher.margin
+            region = frame[start_y:start_y + height + margin_y, start_x:start_x + width + margin_x]
+            found.append(self.template_matcher.find(region, height, width))
+        if self.classifier and not self.config.blobs:
+            # Classify pixels against all target colors in a single lookup-table pass
+            # (coarse-to-fine when stride > 1)
+            found.append(find_matching_pixels(chunk, self.classifier, self.config.stride))
+        roi_mask = self.config.tile_masks.get((start_y, start_x))
+        points = []
+        if found:
+            y_local, x_local, labels = (np.concatenate(parts) for parts in zip(*found))
+            if roi_mask is not None and len(y_local):
+                # Tile only partly inside the region of interest: drop matches outside it
+                # (template centers can lie past the tile edge; those use the edge of the mask)
+                inside = roi_mask[np.minimum(y_local, height - 1), np.minimum(x_local, width - 1)]
+                y_local, x_local, labels = y_local[inside], x_local[inside], labels[inside]
+            if len(y_local):
+                all_match_points = np.column_stack((x_local + start_x, y_local + start_y, labels))
+                # Filter points for minimum distance before returning
+                points = filter_points_by_distance(all_match_points, self.config.min_check_pixel)
+
+        if self.classifier and self.config.blobs:
+            # Blob mode: one row per connected region instead of one point per matching pixel
+            blobs = find_blobs(self._label_image(chunk, roi_mask), (start_x, start_y), self.config.min_blob_area, self.config.max_blob_area)
+            return np.concatenate([point_blobs(points), blobs])
+        return points
+
+    def _label_image(self, chunk, roi_mask):
+        """Color labels of a whole tile (0 outside the region of interest)."""
+        if self.config.stride <= 1:
+            labels = self.classifier.labels(chunk)
+        else:
+            labels = np.zeros(chunk.shape[:2], dtype=np.uint8)
+            ys, xs, hits = find_matching_pixels(chunk, self.classifier, self.config.stride)
+            labels[ys, xs] = hits
+        if roi_mask is not None: labels[~roi_mask] = 0
+        return labels
+
+    def analyze_timed(self, worker, slot_index, start_y, start_x, height, width):
+        """`analyze()`, plus the wall and CPU time it took (ns) and the worker it ran on."""
+        started, cpu_started = time.perf_counter_ns(), time.thread_time_ns()
+        points = self.analyze(slot_index, start_y, start_x, height, width)
+        return points, time.perf_counter_ns() - started, time.thread_time_ns() - cpu_started, worker
+
+    def close(self):
+        self.frames = []
+        for shm in self._shms:
+            try: shm.close()
+            except BufferError: pass  # A tile still being analyzed holds a view; released once it finishes
+        self._shms = []
+
+# --- Multiprocessing Worker Functions ---
+
+_worker_config_prefix = None
+_worker_contexts = {}  # key -> (generation, AnalysisContext)
+
+def init_analysis_worker(config_prefix):
+    """Pool initializer: remembers where this session publishes its configs."""
+    global _worker_config_prefix
+    _worker_config_prefix = config_prefix
+
+def _arm_worker(key, generation):
+    """Loads the config of `generation` and rebuilds the resident state of `key` (only when it changed)."""
+    config_shm = shared_memory.SharedMemory(name=f"{_worker_config_prefix}{generation}")
+    try:
+        size = int.from_bytes(config_shm.buf[:8], "little")
+        config = pickle.loads(config_shm.buf[8:8 + size])
+    finally:
+        config_shm.close()
+    if key in _worker_contexts: _worker_contexts[key][1].close()
+    _worker_contexts[key] = (generation, AnalysisContext(config))
+
+def process_chunk_shared_memory(task):
+    """
+    Multiprocessing worker that analyzes one tile of a shared-memory frame.
+    The shared memory stays attached between tasks, so this is "zero-copy" and
+    free of per-task setup.
+    """
+    key, generation, slot_index, frame_id, start_y, start_x, height, width = task
+    if key not in _worker_contexts or _worker_contexts[key][0] != generation:
+        _arm_worker(key, generation)
+    return _worker_contexts[key][1].analyze_timed(f"process-{os.getpid()}", slot_index, start_y, start_x, height, width)
+
+# --- Analysis Backends ---
+# All backends share one interface: arm(config, key), submit(slot_index, frame_id, tiles,
+# callback, error_callback, key, on_timings) and close(). The callback receives one
+# result per tile. Pool backends hand out tiles one at a time (chunksize=1), so a
+# worker that finishes early pulls the next tile instead of idling.
+# Each key (one per target window) has its own resident config, so several windows
+# share one pool without re-arming the workers on every frame.
+# Workers also report how long each tile took; with metrics attached, that goes
+# into the `analysis` latency histogram and the worker's CPU account.
+
+class AnalysisBackend(abc.ABC):
+    name = "base"
+    metrics = None
+
+    @abc.abstractmethod
+    def arm(self, config, key=0):
+        """Makes `config` the resident analysis settings of `key`."""
+
+    @abc.abstractmethod
+    def submit(self, slot_index, frame_id, tiles, callback, error_callback, key=0, on_timings=None):
+        """Analyzes the tiles of one frame slot without blocking; `callback` gets one result per tile."""
+
+    def close(self): pass
+
+    def attach_metrics(self, metrics):
+        self.metrics = metrics
+
+    def _unpack(self, callback, on_timings=None):
+        """
+        Wraps `callback` so it receives the points of timed tile results, after recording
+        their timings (and passing the per-tile wall times in ns to `on_timings`, if given).
+        """
+        def deliver(timed_results):
+            if self.metrics:
+                for _, wall_ns, cpu_ns, worker in timed_results:
+                    self.metrics.record_ns("analysis", wall_ns)
+                    self.metrics.add_cpu(worker, cpu_ns)
+            if on_timings: on_timings([wall_ns for _, wall_ns, _, _ in timed_results])
+            callback([points for points, *_ in timed_results])
+        return deliver
+
+class ProcessBackend(AnalysisBackend):
+    """
+    Analysis on a multiprocessing pool whose workers keep their state resident.
+
+    `arm()` publishes a new AnalysisConfig as a pickled blob in its own shared
+    memory block. Tasks name the key and config generation they need, and a worker
+    re-arms that key the first time it sees a newer one. A replaced generation is
+    unlinked once the last frame submitted with it has finished.
+    """
+    name = "process"
+
+    def __init__(self, processes):
+        self._config_prefix = f"apexclick_cfg_{uuid.uuid4().hex[:12]}_"
+        self._config_shms = {}  # generation -> (key, shm)
+        self._next_generation = 0
+        self.generations = {}  # key -> current generation
+        self._outstanding = collections.Counter()  # generation -> frames in flight
+        self._lock = threading.Lock()
+        self.pool = Pool(processes=processes, initializer=init_analysis_worker, initargs=(self._config_prefix,))
+
+    def arm(self, config, key=0):
+        """Publishes a new config for `key`. Tasks submitted afterwards use it."""
+        blob = pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL)
+        self._next_generation += 1
+        generation = self._next_generation
+        shm = shared_memory.SharedMemory(name=f"{self._config_prefix}{generation}", create=True, size=len(blob) + 8)
+        shm.buf[:8] = len(blob).to_bytes(8, "little")
+        shm.buf[8:8 + len(blob)] = blob
+        with self._lock:
+            previous = self.generations.get(key)
+            self._config_shms[generation] = (key, shm)
+            self.generations[key] = generation
+            # Generations with frames still queued are released by `_finished`
+            if previous is not None and not self._outstanding[previous]:
+                self._release_config(previous)
+
+    def _finished(self, generation, callback, *args):
+        """Completion hook of one frame: releases its generation if it was the last frame using a replaced one."""
+        with self._lock:
+            self._outstanding[generation] -= 1
+            if not self._outstanding[generation]:
+                del self._outstanding[generation]
+                key, _ = self._config_shms[generation]
+                if self.generations[key] != generation: self._release_config(generation)
+        callback(*args)
+
+    def _release_config(self, generation):
+        _, shm = self._config_shms.pop(generation)
+        shm.close()
+        try: shm.unlink()
+        except FileNotFoundError: pass
+
+    def submit(self, slot_index, frame_id, tiles, callback, error_callback, key=0, on_timings=None):
+        """Analyzes the given (start_y, start_x, height, width) tiles of a frame slot without blocking."""
+        with self._lock:
+            generation = self.generations[key]
+            self._outstanding[generation] += 1
+        tasks = [(key, generation, slot_index, frame_id, start_y, start_x, height, width)
+                 for start_y, start_x, height, width in tiles]
+        self.pool.map_async(process_chunk_shared_memory, tasks, chunksize=1,
+                            callback=functools.partial(self._finished, generation, self._unpack(callback, on_timings)),
+                            error_callback=functools.partial(self._finished, generation, error_callback))
+
+    def close(self):
+        self.pool.close(); self.pool.join()
+        for generation in list(self._config_shms): self._release_config(generation)
+
+class ThreadBackend(AnalysisBackend):
+    """
+    Analysis on a thread pool in this process. NumPy releases the GIL in the heavy
+    loops, and there is no pickling or IPC, which wins for small windows.
+    """
+    name = "thread"
+
+    def __init__(self, threads):
+        self.pool = ThreadPool(processes=threads)
+        self._contexts = {}  # key -> AnalysisContext
+        self._retired = {}  # key -> replaced contexts
+
+    def arm(self, config, key=0):
+        # Queued tasks keep using the context they were submitted with, so a replaced
+        # context is only closed one re-arm later
+        retired = self._retired.setdefault(key, [])
+        if key in self._contexts: retired.append(self._contexts[key])
+        self._contexts[key] = AnalysisContext(config)
+        while len(retired) > 1: retired.pop(0).close()
+
+    def submit(self, slot_index, frame_id, tiles, callback, error_callback, key=0, on_timings=None):
+        context = self._contexts[key]
+        self.pool.map_async(lambda tile: context.analyze_timed(threading.current_thread().name, slot_index, *tile), tiles, chunksize=1,
+                            callback=self._unpack(callback, on_timings), error_callback=error_callback)
+
+    def close(self):
+        self.pool.close(); self.pool.join()
+        for context in [c for retired in self._retired.values() for c in retired] + list(self._contexts.values()):
+            context.close()
+
+class InlineBackend(AnalysisBackend):
+    """Analysis on the calling (capture) thread. No scheduling overhead at all."""
+    name = "inline"
+
+    def __init__(self):
+        self._contexts = {}  # key -> AnalysisContext
+
+    def arm(self, config, key=0):
+        if key in self._contexts: self._contexts[key].close()
+        self._contexts[key] = AnalysisContext(config)
+
+    def submit(self, slot_index, frame_id, tiles, callback, error_callback, key=0, on_timings=None):
+        try:
+            results = [self._contexts[key].analyze_timed("inline", slot_index, *tile) for tile in tiles]
+        except Exception as e:
+            error_callback(e)
+            return
+        self._unpack(callback, on_timings)(results)
+
+class AutoBackend(AnalysisBackend):
+    """
+    Micro-benchmarks the inline, thread and process backends on the first frames
+    (round-robin, `trials` frames each after one warm-up) and then sends every frame
+    to the one with the lowest median submit-to-result latency. If that takes longer
+    than `timeout` seconds (e.g. incremental analysis of a static screen submits no
+    frames), the fastest backend so far is selected, or the process backend if none
+    has finished a sample. The benchmark is repeated whenever the frame size of a
+    key changes.
+
+    The losing backends are closed once they have no frames in flight. Inline
+    analysis only runs on capture threads (the ones that `arm()` keys): frames the
+    scheduler dispatches from a pool's result thread sample the pools instead,
+    and go to the thread backend, which is kept open for them, if inline wins.
+    """
+    name = "auto"
+    DEFAULT = "process"
+
+    def __init__(self, workers, trials=5, on_select=None, timeout=3.0):
+        self._factories = {"inline": InlineBackend, "thread": functools.partial(ThreadBackend, workers),
+                           "process": functools.partial(ProcessBackend, workers)}
+        self.candidates = [factory() for factory in self._factories.values()]
+        self.trials = trials
+        self.timeout = timeout
+        self.on_select = on_select
+        self.selected = None
+        self._fallback = None  # Stands in for a selected inline backend off the capture threads
+        self._retiring = []  # Losers, closed by a capture thread once their frames are done
+        self._configs = {}  # key -> AnalysisConfig
+        self._capture_threads = set()
+        self._pending = collections.Counter()  # backend -> frames in flight
+        self._latencies = {}
+        self._warm = set()
+        self._turn = 0
+        self._deadline = None
+        self._lock = threading.Lock()
+
+    def arm(self, config, key=0):
+        with self._lock:
+            self._capture_threads.add(threading.get_ident())
+            restart = key not in self._configs or self._configs[key].shape != config.shape
+            others = [(k, c) for k, c in self._configs.items() if k != key]
+            self._configs[key] = config
+        if restart: self._restart(others)
+        for backend in self.candidates: backend.arm(config, key)
+
+    def _restart(self, configs):
+        """Starts a new benchmark, reopening the backends closed after the last one."""
+        with self._lock:
+            open_backends = {backend.name: backend for backend in self.candidates}
+        candidates = []
+        for name, factory in self._factories.items():
+            backend = open_backends.get(name)
+            if backend is None:
+                backend = factory()
+                if self.metrics: backend.attach_metrics(self.metrics)
+                for key, config in configs: backend.arm(config, key)
+            candidates.append(backend)
+        with self._lock:
+            self.candidates, self.selected, self._fallback = candidates, None, None
+            self._latencies = {backend.name: [] for backend in candidates}
+            self._warm, self._turn = set(), 0
+            self._deadline = time.perf_counter() + self.timeout
+
+    def submit(self, slot_index, frame_id, tiles, callback, error_callback, key=0, on_timings=None):
+        on_capture_thread = threading.get_ident() in self._capture_threads
+        if on_capture_thread and self._retiring: self._close_retired()
+        selection = None
+        with self._lock:
+            if self.selected is None and self._deadline is not None and time.perf_counter() >= self._deadline:
+                selection = self._select()
+            if self.selected is not None:
+                backend, sample = self.selected, False
+                if backend.name == "inline" and not on_capture_thread: backend = self._fallback
+            else:
+                candidates = [b for b in self.candidates if on_capture_thread or b.name != "inline"]
+                backend = candidates[self._turn % len(candidates)]
+                self._turn += 1
+                sample = backend.name in self._warm  # The first frame of each backend is its warm-up
+                self._warm.add(backend.name)
+            self._pending[backend] += 1
+        if selection: self._notify(*selection)
+        started = time.perf_counter()
+
+        def finished(deliver, result, timed=False):
+            with self._lock: self._pending[backend] -= 1
+            if timed: self._record(backend, time.perf_counter() - started)
+            deliver(result)
+        try:
+            backend.submit(slot_index, frame_id, tiles, functools.partial(finished, callback, timed=sample),
+                           functools.partial(finished, error_callback), key, on_timings)
+        except Exception:
+            with self._lock: self._pending[backend] -= 1
+            raise
+
+    def _record(self, backend, latency):
+        with self._lock:
+            if self.selected is not None or backend.name not in self._latencies: return
+            self._latencies[backend.name].append(latency)
+            if any(len(samples) < self.trials for samples in self._latencies.values()): return
+            selection = self._select()
+        self._notify(*selection)
+
+    def _select(self):
+        """Picks the backend with the lowest median latency so far and retires the others. Call with the lock held."""
+        medians = {name: statistics.median(samples) for name, samples in self._latencies.items() if samples}
+        name = min(medians, key=medians.get) if medians else self.DEFAULT
+        self.selected = next(b for b in self.candidates if b.name == name)
+        if name == "inline": self._fallback = next(b for b in self.candidates if b.name == "thread")
+        self._retiring = [b for b in self.candidates if b is not self.selected and b is not self._fallback]
+        self.candidates = [b for b in self.candidates if b not in self._retiring]
+        return name, medians
+
+    def _notify(self, name, medians):
+        if self.on_select: self.on_select(name, medians)
+
+    def _close_retired(self):
+        """Closes the retired backends without frames in flight (never from a pool's own result thread)."""
+        with self._lock:
+            idle = [b for b in self._retiring if not self._pending[b]]
+            self._retiring = [b for b in self._retiring if b not in idle]
+            for backend in idle: del self._pending[backend]
+        for backend in idle: backend.close()
+
+    def attach_metrics(self, metrics):
+        self.metrics = metrics
+        for backend in self.candidates: backend.attach_metrics(metrics)
+
+    def close(self):
+        with self._lock:
+            backends, self.candidates, self._retiring = self.candidates + self._retiring, [], []
+        for backend in backends: backend.close()
+
+BACKENDS = ("auto", "process", "thread", "inline")
+
+def create_backend(kind, workers, on_select=None):
+    """Creates an analysis backend by name: 'auto', 'process', 'thread' or 'inline'."""
+    if kind == "process": return ProcessBackend(workers)
+    if kind == "thread": return ThreadBackend(workers)
+    if kind == "inline": return InlineBackend()
+    if kind == "auto": return AutoBackend(workers, on_select=on_select)
+    raise ValueError(f"Unknown analysis backend: {kind}")
@@ -0,0 +1,220 @@
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import numpy as np
+
+from analysis import AnalysisConfig, create_backend
+from color_classifier import build_color_specs
+from detection import pyramid_stride
+from frame_ring import FrameSlot
+from frame_sources import SyntheticSource
+from pipeline import merge_tile_results
+from tiling import AdaptiveTiler, split_frame
+
+# --- Intelligent Mode Benchmark ---
+# Runs the Brain on synthetic frames, without windows, capture or clicks:
+#   python benchmark.py --size 1920x1080 --density 20 --colors 3 --workers 1,2,4 --output before.json
+#   python benchmark.py ... --output after.json --baseline before.json
+# Each frame goes through the same path as a live session: split into adaptive
+# tiles (or one chunk per worker with --tiling fixed), analyzed on the pool,
+# merged and thinned. Frames are analyzed one at a time,
+# so latency is the full per-frame cost. The frames are identical for every pool
+# size (same seed), and results are saved as JSON to compare between versions.
+
+RESULTS_VERSION = 1
+# Saturated colors that stand out from SyntheticSource's dark gray background
+PALETTE = ["#FF0000", "#00FF00", "#0000FF", "#FFFF00", "#FF00FF", "#00FFFF", "#FF8000", "#8000FF", "#FFFFFF"]
+
+def palette(count):
+    """`count` distinct target colors."""
+    if count > len(PALETTE):
+        raise ValueError(f"At most {len(PALETTE)} colors are supported.")
+    return PALETTE[:count]
+
+class MemorySampler(threading.Thread):
+    """
+    Samples the resident memory of this process and its children (the pool
+    workers) and keeps the peak. Needs psutil; `peak_mb` stays None without it.
+    """
+
+    def __init__(self, interval=0.01):
+        super().__init__(name="memory", daemon=True)
+        self.interval = interval
+        self.peak_mb = None
+        self._stopped = threading.Event()
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    def _sample(self):
+        processes = [self._process] + self._process.children(recursive=True)
+        total = 0
+        for process in processes:
+            try: total += process.memory_info().rss
+            except Exception: pass  # A worker exited between listing and sampling
+        self.peak_mb = max(self.peak_mb or 0.0, total / 2 ** 20)
+
+    def run(self):
+        if self._process is None: return
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        if self._process is not None: self._sample()
+        return self.peak_mb
+
+def run_case(settings, workers):
+    """
+    Benchmarks one pool size.
+
+    Args:
+        settings (argparse.Namespace): Parsed command-line settings.
+        workers (int): Pool size.
+
+    Returns:
+        A dict with FPS, latency percentiles, detections per frame and peak memory.
+    """
+    width, height = settings.size
+    targets = max(1, round(settings.density * width * height / 1e6))
+    colors = palette(settings.colors)
+    source = SyntheticSource(width, height, colors, targets=targets, target_size=settings.target_size, seed=settings.seed, spread=settings.spread)
+    slot = FrameSlot(0, source.shape, np.uint8)
+    sampler = MemorySampler()
+    sampler.start()
+    backend = create_backend(settings.backend, workers)
+    try:
+        stride = pyramid_stride(settings.min_check_pixel, settings.target_size) if settings.pyramid else 1
+        backend.arm(AnalysisConfig([slot.name], source.shape, np.uint8, build_color_specs(colors), settings.min_check_pixel, stride,
+                                   channel_order=source.channel_order, blobs=settings.blobs))
+        tiler = AdaptiveTiler(workers) if settings.tiling == "adaptive" else None
+        latencies, detections = [], []
+        done = threading.Event()
+        outcome = {}
+
+        def on_result(results): outcome["results"] = results; done.set()
+        def on_error(error): outcome["error"] = error; done.set()
+
+        for frame in range(settings.warmup + settings.frames):
+            source.grab_into(slot.array)
+            done.clear()
+            started = time.perf_counter()
+            chunks = tiler.tiles(source.shape) if tiler else split_frame(source.shape, workers)
+            backend.submit(slot.index, frame, chunks, on_result, on_error,
+                           on_timings=functools.partial(tiler.record, chunks) if tiler else None)
+            done.wait()
+            if "error" in outcome:
+                raise RuntimeError(f"Analysis failed: {outcome['error']}")
+            points = merge_tile_results(outcome["results"], settings.min_check_pixel)
+            elapsed = time.perf_counter() - started
+            if frame >= settings.warmup:
+                latencies.append(elapsed)
+                detections.append(len(points))
+    finally:
+        backend.close()
+        peak_mb = sampler.stop()
+        slot.close()
+
+    latencies = np.array(latencies)
+    return {
+        "workers": workers,
+        "backend": settings.backend,
+        "tiling": settings.tiling,
+        "frames": len(latencies),
+        "chunks": len(chunks),
+        "fps": len(latencies) / latencies.sum(),
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "mean_ms": float(latencies.mean() * 1000),
+        "detections_per_frame": float(np.mean(detections)),
+        "peak_memory_mb": peak_mb,
+    }
+
+def format_result(result, baseline=None):
+    line = (f"{result['workers']:>3} workers: {result['fps']:8.1f} FPS | p50/p99 {result['p50_ms']:7.2f}/{result['p99_ms']:7.2f} ms | "
+            f"{result['detections_per_frame']:7.1f} detections/frame | peak memory "
+            + (f"{result['peak_memory_mb']:.0f} MB" if result["peak_memory_mb"] is not None else "n/a (needs psutil)"))
+    if baseline:
+        # Positive = faster than the baseline
+        line += (f" || vs baseline: FPS {100 * (result['fps'] / baseline['fps'] - 1):+.1f}%, "
+                 f"p99 {100 * (1 - result['p99_ms'] / baseline['p99_ms']):+.1f}%")
+    return line
+
+def load_baseline(path):
+    """Baseline results of an earlier run, keyed by (backend, tiling, workers)."""
+    with open(path, "r") as f: data = json.load(f)
+    return {(result["backend"], result.get("tiling", "fixed"), result["workers"]): result for result in data["results"]}
+
+def parse_size(text):
+    try:
+        width, height = (int(value) for value in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected WIDTHxHEIGHT, got '{text}'")
+    return width, height
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Intelligent mode analysis pipeline on synthetic frames.")
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080), help="Frame size as WIDTHxHEIGHT (default 1920x1080).")
+    parser.add_argument("--density", type=float, default=20, help="Targets per megapixel (default 20).")
+    parser.add_argument("--target-size", type=int, default=12, help="Target side length in pixels (default 12).")
+    parser.add_argument("--spread", type=float, default=1.0, help="Fraction of the width/height the targets stay in, from the top-left (default 1; e.g. 0.3 clusters them).")
+    parser.add_argument("--tiling", choices=("adaptive", "fixed"), default="adaptive", help="Adaptive tiles (as sessions use) or one chunk per worker (default adaptive).")
+    parser.add_argument("--colors", type=int, default=3, help=f"Number of target colors, 1-{len(PALETTE)} (default 3).")
+    parser.add_argument("--workers", default=None, help="Comma-separated pool sizes (default 1,2,4,... up to the CPU count).")
+    parser.add_argument("--backend", choices=("process", "thread", "inline"), default="process", help="Analysis backend (default process).")
+    parser.add_argument("--min-check-pixel", type=int, default=10, help="Minimum spacing between detections (default 10).")
+    parser.add_argument("--blobs", action="store_true", help="Benchmark blob detection instead of pixel detection.")
+    parser.add_argument("--pyramid", action="store_true", help="Benchmark pyramid search.")
+    parser.add_argument("--frames", type=int, default=100, help="Measured frames per pool size (default 100).")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured frames before each run (default 5).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic frames.")
+    parser.add_argument("--output", help="Save the results to this JSON file.")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against.")
+    args = parser.parse_args(argv)
+    if args.workers:
+        args.workers = [int(value) for value in args.workers.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        args.workers = [n for n in (1, 2, 4, 8, 16, 32) if n < cpus] + [cpus]
+    if args.backend == "inline":
+        args.workers = [1]  # Inline analysis has no pool
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        palette(args.colors)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    width, height = args.size
+    print(f"{width}x{height}, {args.density:g} targets/MP, {args.colors} colors, {args.backend} backend, {args.tiling} tiling, "
+          f"{'blob' if args.blobs else 'pixel'} detection, {args.frames} frames", flush=True)
+
+    results = []
+    for workers in args.workers:
+        result = run_case(args, workers)
+        results.append(result)
+        print(format_result(result, baseline.get((result["backend"], result["tiling"], workers))), flush=True)
+
+    if args.output:
+        settings = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+        data = {"version": RESULTS_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "platform": {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system(),
+                             "processor": platform.processor(), "cpus": os.cpu_count(), "numpy": np.__version__},
+                "settings": settings, "results": results}
+        with open(args.output, "w") as f: json.dump(data, f, indent=2)
+        print(f"Saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import threading
+import time
+
+# --- Adaptive Capture Rate Governor (for "The Eye") ---
+# Capturing faster than the Brain can analyze only produces frames that the ring
+# drops again, and capturing at full speed while nothing is on screen burns a
+# core for nothing. The governor paces the Eye at the measured analysis
+# throughput, and backs off to an idle rate while frames yield no detections.
+
+DEFAULT_MIN_FPS = 5.0
+DEFAULT_MAX_FPS = 240.0
+
+class CaptureGovernor:
+    """
+    Decides how fast the Eye captures.
+
+    Args:
+        min_fps (float): Idle capture rate, used while no targets have been seen.
+        max_fps (float): Upper bound on the capture rate.
+        max_in_flight (int): Frames the Brain may analyze at once, i.e. how many
+            analyses overlap. Throughput is `max_in_flight / analysis latency`.
+        idle_after (float): Seconds without detections before backing off.
+        smoothing (float): EMA weight of new analysis latency samples.
+    """
+
+    def __init__(self, min_fps=DEFAULT_MIN_FPS, max_fps=DEFAULT_MAX_FPS, max_in_flight=1, idle_after=1.0, smoothing=0.2):
+        if not 0 < min_fps <= max_fps:
+            raise ValueError("FPS limits must satisfy 0 < min_fps <= max_fps")
+        self.min_fps = float(min_fps)
+        self.max_fps = float(max_fps)
+        self.max_in_flight = max(1, max_in_flight)
+        self.idle_after = idle_after
+        self.smoothing = smoothing
+        self.analysis_latency = None
+        self._last_detection = None
+        self._next_capture = None
+        self._lock = threading.Lock()
+
+    def record_analysis(self, latency, detections, timestamp=None):
+        """Feeds back one analyzed frame: its submit-to-result latency and detection count."""
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        with self._lock:
+            if latency is not None:
+                if self.analysis_latency is None: self.analysis_latency = latency
+                else: self.analysis_latency += self.smoothing * (latency - self.analysis_latency)
+            if detections:
+                # Targets are back: drop the idle deadline so the next frame is captured now
+                if self.is_idle(timestamp): self._next_capture = timestamp
+                self._last_detection = timestamp
+
+    def is_idle(self, now=None):
+        now = time.perf_counter() if now is None else now
+        return self._last_detection is None or now - self._last_detection > self.idle_after
+
+    def target_fps(self, now=None):
+        """The capture rate the Eye should run at right now."""
+        if self.is_idle(now):
+            return self.min_fps
+        if not self.analysis_latency:
+            return self.max_fps
+        return min(self.max_fps, max(self.min_fps, self.max_in_flight / self.analysis_latency))
+
+    def wait(self, should_continue=lambda: True):
+        """
+        Sleeps until the next capture is due. Long idle waits are taken in short
+        steps so a stop request or a fresh detection is noticed promptly.
+        """
+        # The deadline is shared with `record_analysis`, which runs on result callback threads
+        now = time.perf_counter()
+        with self._lock:
+            if self._next_capture is None: self._next_capture = now
+        while should_continue():
+            with self._lock: remaining = self._next_capture - now
+            if remaining <= 0: break
+            time.sleep(min(remaining, 0.05))
+            now = time.perf_counter()
+        # Schedule against absolute deadlines, but never as a catch-up burst after a stall
+        with self._lock:
+            self._next_capture = max(self._next_capture + 1.0 / self.target_fps(now), now)
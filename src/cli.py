@@ -0,0 +1,113 @@
+import time
+_STARTED = time.perf_counter()  # Before any other import, so startup time covers them
+
+import argparse
+import json
+import sys
+import threading
+
+from engine import AutoClickerEngine, MODES
+from metrics import MetricsExporter
+
+# --- Headless Runner ---
+# Runs a saved profile without Qt:
+#   python cli.py profile.json --mode dynamic --duration 30
+#   python cli.py profile.json --mode intelligent --window "Notepad" --metrics run.jsonl
+#   python cli.py profile.json --replay session.apxrec
+# Only the modules the chosen mode needs are imported, and the analysis pool is
+# only created when Intelligent mode starts.
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run an ApexClick profile headless.")
+    parser.add_argument("profile", help="Profile JSON saved with 'Save Color Data'.")
+    parser.add_argument("--mode", choices=MODES, help="Override the profile's mode.")
+    parser.add_argument("--window", help="Target window title (Intelligent mode). Defaults to the profile's window_title.")
+    parser.add_argument("--add-window", action="append", default=[], metavar="TITLE", help="Another window to automate with the same colors (repeatable).")
+    parser.add_argument("--positions", help="Positions or timeline JSON saved with 'Save Positions' (Multi-Position mode).")
+    parser.add_argument("--timed", action="store_true", help="Multi-Position: play the timeline's own delays instead of an even loop.")
+    parser.add_argument("--interval", type=float, help="Click interval in ms.")
+    parser.add_argument("--cps", type=float, help="Target clicks per second (overrides the interval).")
+    parser.add_argument("--backend", help="Analysis backend: auto, process, thread or inline.")
+    parser.add_argument("--replay", metavar="PATH", help="Intelligent mode on a frame recording instead of a live window. Without --window, clicks are only counted.")
+    parser.add_argument("--replay-speed", type=float, help="Replay at this multiple of the recorded timing (default: as fast as the pipeline runs).")
+    parser.add_argument("--window-max-cps", type=float, help="Intelligent mode: max background clicks per second per window (0 = unlimited).")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (default: until Ctrl+C).")
+    parser.add_argument("--metrics", help="Append pipeline metrics to this .jsonl or .csv file every second.")
+    parser.add_argument("--quiet", action="store_true", help="Only print errors and the final summary.")
+    parser.add_argument("--startup-only", action="store_true", help="Load the profile, report the startup time and exit.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    log = (lambda message: None) if args.quiet else (lambda message: print(message, flush=True))
+    failure = {}
+    replay = None
+    stopped = threading.Event()
+
+    def on_error(message):
+        # The end of a replay is the end of the run, not a failure
+        if not (replay and message.startswith(replay.end_message)): failure["message"] = message
+        stopped.set()
+
+    engine = AutoClickerEngine(on_message=log, on_error=on_error)
+    with open(args.profile, "r") as f: profile = json.load(f)
+    engine.apply_profile(profile)
+    if args.mode: engine.mode = args.mode
+    if args.positions: engine.load_positions(args.positions)
+    if args.timed: engine.timed_playback = True
+    if args.interval is not None: engine.click_interval = args.interval / 1000
+    if args.cps is not None: engine.target_cps = args.cps or None
+    if args.backend: engine.analysis_backend = args.backend
+    if args.window_max_cps is not None: engine.window_max_cps = args.window_max_cps
+    engine.metrics_path = args.metrics
+    if args.replay:
+        from frame_sources import ReplaySource
+        try:
+            replay = engine.frame_source = ReplaySource(args.replay, speed=args.replay_speed)
+        except (OSError, ValueError) as e:
+            print(f"Cannot replay: {e}", file=sys.stderr)
+            return 2
+        engine.mode = "intelligent"
+        if not args.window: engine.click_sink = lambda key, targets: None
+
+    title = args.window or (None if args.replay else profile.get("window_title"))
+    if engine.mode == "intelligent" and title and not engine.find_window(title):
+        print(f"No window titled '{title}' found.", file=sys.stderr)
+        return 2
+    for extra_title in args.add_window: engine.extra_windows.append({"title": extra_title, "window": None})
+
+    print(f"Ready in {(time.perf_counter() - _STARTED) * 1000:.0f} ms ({engine.mode} mode, {len(sys.modules)} modules loaded)", flush=True)
+    if args.startup_only:
+        return 0
+
+    try:
+        engine.start()
+    except ValueError as e:
+        print(f"Cannot start: {e}", file=sys.stderr)
+        return 2
+    log(f"Started in {(time.perf_counter() - _STARTED) * 1000:.0f} ms. Press Ctrl+C to stop.")
+
+    exporter = MetricsExporter(engine.metrics, engine.metrics_path) if engine.metrics_path else None
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    last_clicks = 0
+    try:
+        while not stopped.wait(1.0):
+            if exporter: exporter.write()
+            log(f"CPS: {engine.click_count - last_clicks}")
+            if len(engine.sessions) > 1: log(engine.window_summary())
+            last_clicks = engine.click_count
+            if deadline and time.perf_counter() >= deadline: break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+        if exporter: exporter.write(); exporter.close()
+
+    print(f"Clicks: {engine.click_count} | {engine.metrics.summary()}")
+    if failure:
+        print(failure["message"], file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import collections
+import time
+
+# --- Deadline-Based Click Scheduler (for "The Hand") ---
+# Sleeping a fixed interval after each click adds the click's own cost to every
+# period, so the delivered rate drifts below the configured one. The scheduler
+# instead waits for absolute deadlines: it sleeps until shortly before the
+# deadline, then spins the last stretch to get past the OS sleep granularity.
+
+DEFAULT_SPIN_THRESHOLD = 0.0015  # Seconds before a deadline to stop sleeping and start spinning
+DEFAULT_WINDOW_CPS = 1000  # Max background clicks per second posted to one window (0 = unlimited)
+DEFAULT_CLICK_BATCH = 32  # Max targets the Hand takes off the queue and posts at once
+
+class ClickScheduler:
+    """
+    Paces a loop against absolute `perf_counter_ns` deadlines.
+
+    Args:
+        period (float): Seconds between ticks.
+        spin_threshold (float): How long before each deadline to switch from
+            sleeping to busy-waiting. 0 disables spinning.
+        history (int): Number of recent ticks kept for jitter percentiles.
+    """
+
+    def __init__(self, period, spin_threshold=DEFAULT_SPIN_THRESHOLD, history=1024):
+        self.period_ns = max(1, int(period * 1e9))
+        self.spin_threshold_ns = int(spin_threshold * 1e9)
+        self._lateness_ns = collections.deque(maxlen=history)
+        self._next_deadline = None
+        self.ticks = 0
+        self.missed = 0
+        self._lateness_total_ns = 0
+        self._lateness_max_ns = 0
+
+    @classmethod
+    def from_cps(cls, cps, clicks_per_tick=1, **kwargs):
+        """Builds a scheduler delivering `cps` clicks per second, `clicks_per_tick` at a time."""
+        return cls(clicks_per_tick / cps, **kwargs)
+
+    def start(self):
+        """Anchors the first deadline one period from now."""
+        self._next_deadline = time.perf_counter_ns() + self.period_ns
+
+    def wait_until(self, deadline_ns, should_continue=None):
+        """
+        Sleeps, then spins, until `deadline_ns`. Returns the lateness in nanoseconds.
+        With `should_continue`, sleeps in steps of at most 50 ms and returns None
+        as soon as it returns False (so long waits stay interruptible).
+        """
+        remaining = deadline_ns - time.perf_counter_ns()
+        while remaining > self.spin_threshold_ns:
+            if should_continue is None:
+                time.sleep((remaining - self.spin_threshold_ns) / 1e9)
+                break
+            if not should_continue(): return None
+            time.sleep(min(remaining - self.spin_threshold_ns, 50_000_000) / 1e9)
+            remaining = deadline_ns - time.perf_counter_ns()
+        now = time.perf_counter_ns()
+        while now < deadline_ns:
+            now = time.perf_counter_ns()
+        return now - deadline_ns
+
+    def wait(self):
+        """Blocks until the next tick's deadline and schedules the one after it."""
+        if self._next_deadline is None:
+            self.start()
+        deadline = self._next_deadline
+        lateness = self.wait_until(deadline)
+        self._record(lateness)
+
+        # Missed whole periods are skipped rather than replayed as a catch-up burst
+        skipped = lateness // self.period_ns
+        self.missed += skipped
+        self._next_deadline = deadline + (skipped + 1) * self.period_ns
+        return lateness
+
+    def wait_for_event(self, deadline_ns, should_continue=None):
+        """Waits for an arbitrary deadline (e.g. a timeline event) and records its lateness."""
+        lateness = self.wait_until(deadline_ns, should_continue)
+        if lateness is not None: self._record(lateness)
+        return lateness
+
+    def _record(self, lateness):
+        self.ticks += 1
+        self._lateness_ns.append(lateness)
+        self._lateness_total_ns += lateness
+        self._lateness_max_ns = max(self._lateness_max_ns, lateness)
+
+    def stats(self):
+        """Returns tick count, missed deadlines and jitter (lateness) statistics in microseconds."""
+        recent = sorted(self._lateness_ns)
+        def percentile(p):
+            return recent[min(len(recent) - 1, int(p * len(recent)))] / 1e3 if recent else 0.0
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "target_rate": 1e9 / self.period_ns,
+            "jitter_mean_us": self._lateness_total_ns / self.ticks / 1e3 if self.ticks else 0.0,
+            "jitter_p50_us": percentile(0.50),
+            "jitter_p99_us": percentile(0.99),
+            "jitter_max_us": self._lateness_max_ns / 1e3,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"Scheduler: {s['ticks']} ticks @ {s['target_rate']:.0f}/s | missed: {s['missed']} | "
+                f"jitter p50/p99/max: {s['jitter_p50_us']:.0f}/{s['jitter_p99_us']:.0f}/{s['jitter_max_us']:.0f} us")
+
+# --- Token Bucket (for "The Hand" in Intelligent mode) ---
+# Background clicks are posted into the target window's message queue, which
+# the app drains at its own pace. Posting faster than that only fills the queue
+# (and past its quota, clicks are silently lost). A token bucket caps the rate
+# per window while still allowing short bursts.
+
+class TokenBucket:
+    """
+    Rate limiter: `rate` tokens per second, at most `burst` saved up.
+
+    Only its owner thread may take tokens; it is not locked.
+    """
+
+    def __init__(self, rate, burst=DEFAULT_CLICK_BATCH):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.perf_counter()
+
+    def _refill(self):
+        now = time.perf_counter()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def wait(self, should_continue=None):
+        """
+        Blocks until at least one token is available.
+
+        Returns:
+            The number of whole tokens available, or 0 if `should_continue()`
+            turned False while waiting.
+        """
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                return int(self._tokens)
+            if should_continue is not None and not should_continue():
+                return 0
+            time.sleep(min((1 - self._tokens) / self.rate, 0.05))
+
+    def consume(self, tokens):
+        self._tokens -= tokens
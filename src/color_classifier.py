@@ -0,0 +1,267 @@
+import functools
+import numpy as np
+
+# --- Precompiled Color Classifier (for "The Brain") ---
+# Instead of scanning a chunk once per target color, every target color is
+# compiled into a single quantized 3D lookup table. Classifying a pixel is then
+# one gather, no matter how many colors are defined.
+
+DISTANCE_MODES = ("rgb", "hsv", "lab")
+DEFAULT_TOLERANCE = 10
+DEFAULT_MODE = "rgb"
+DEFAULT_BITS = 6  # 6 bits per channel -> 64x64x64 table (256 KiB)
+CHANNEL_ORDERS = ("RGB", "BGR", "RGBA", "BGRA")
+AMBIGUOUS = 255  # Table label of cells that need an exact per-pixel check
+
+def parse_hex_color(color):
+    """Converts a '#RRGGBB' string into an (r, g, b) tuple of ints."""
+    return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+
+def build_color_specs(colors, tolerance=DEFAULT_TOLERANCE, mode=DEFAULT_MODE, color_settings=None):
+    """
+    Normalizes the app's color list into a hashable tuple of (hex, tolerance, mode).
+
+    Args:
+        colors (list): Hex color strings, in priority order.
+        tolerance (int): Default tolerance for colors without an override (None = DEFAULT_TOLERANCE).
+        mode (str): Default distance mode ('rgb', 'hsv' or 'lab'; None = DEFAULT_MODE).
+        color_settings (dict): Optional per-color overrides, keyed by hex string,
+            e.g. {"#FF0000": {"tolerance": 20, "mode": "lab"}}.
+    """
+    tolerance = DEFAULT_TOLERANCE if tolerance is None else tolerance
+    mode = mode or DEFAULT_MODE
+    color_settings = {key.upper(): value for key, value in (color_settings or {}).items()}
+    specs = []
+    for color in colors:
+        override = color_settings.get(color.upper(), {})
+        spec_mode = override.get("mode", mode)
+        if spec_mode not in DISTANCE_MODES:
+            raise ValueError(f"Unknown color distance mode: {spec_mode}")
+        specs.append((color.upper(), float(override.get("tolerance", tolerance)), spec_mode))
+    return tuple(specs)
+
+def _rgb_to_hsv(rgb):
+    """Vectorized RGB -> HSV with every component scaled to 0-255 (hue is circular)."""
+    rgb = rgb / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    v = np.maximum(np.maximum(r, g), b)  # Elementwise: much faster than reducing a 3-wide axis
+    delta = v - np.minimum(np.minimum(r, g), b)
+    s = np.where(v > 0, delta / np.where(v > 0, v, 1), 0)
+    safe_delta = np.where(delta > 0, delta, 1)
+    h = np.select(
+        [delta == 0, v == r, v == g],
+        [0.0, ((g - b) / safe_delta) % 6, (b - r) / safe_delta + 2],
+        (r - g) / safe_delta + 4,
+    )
+    return np.stack([h / 6.0 * 255.0, s * 255.0, v * 255.0], axis=-1)
+
+_RGB_TO_XYZ = np.array([[0.4124, 0.2126, 0.0193],
+                        [0.3576, 0.7152, 0.1192],
+                        [0.1805, 0.0722, 0.9505]])
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+def _srgb_to_linear(c):
+    c = c / 255.0
+    return np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+
+def _lab_f(t):
+    return np.where(t > 0.008856, np.cbrt(t), 7.787 * t + 16.0 / 116.0)
+
+def _rgb_to_lab(rgb):
+    """Vectorized sRGB -> CIE L*a*b* (D65 white point)."""
+    f = _lab_f(_srgb_to_linear(rgb) @ _RGB_TO_XYZ / _WHITE)
+    return np.stack([116.0 * f[..., 1] - 16.0,
+                     500.0 * (f[..., 0] - f[..., 1]),
+                     200.0 * (f[..., 1] - f[..., 2])], axis=-1)
+
+def _to_space(mode, rgb):
+    """Converts an (..., 3) array of RGB colors into the color space of `mode`."""
+    rgb = np.asarray(rgb, dtype=np.float64)
+    if mode == "hsv": return _rgb_to_hsv(rgb)
+    if mode == "lab": return _rgb_to_lab(rgb)
+    return rgb
+
+def _space_distance(mode, candidates, target):
+    """Distance between (..., 3) candidates and one target, both already in the space of `mode`."""
+    diff = candidates - target
+    if mode == "lab":
+        return np.sqrt(diff[..., 0] ** 2 + diff[..., 1] ** 2 + diff[..., 2] ** 2)
+    diff = np.abs(diff)
+    if mode == "hsv":
+        diff[..., 0] = np.minimum(diff[..., 0], 255.0 - diff[..., 0])  # Hue wraps around
+    return np.maximum(np.maximum(diff[..., 0], diff[..., 1]), diff[..., 2])
+
+def _color_distance(mode, candidates, target):
+    """Distance between an (..., 3) array of RGB candidates and one RGB target."""
+    return _space_distance(mode, _to_space(mode, candidates), _to_space(mode, target))
+
+def _interval_distance(low, high, value):
+    """Distance from `value` to the nearest point of [low, high] (0 inside)."""
+    return np.maximum(np.maximum(low - value, value - high), 0)
+
+class ColorClassifier:
+    """
+    Maps pixels to the index of the first matching target color in one gather.
+
+    The RGB cube is quantized to `bits` bits per channel. Each cell stores a label:
+    0 when no color in the cell can match, 1 + the index of the first target color
+    when every color in the cell is sure to get that label, or AMBIGUOUS when the
+    cell straddles a tolerance boundary. Ambiguous cells get a second-level block
+    with the exact label of each of their colors, so results match a per-pixel
+    comparison and every pixel costs one or two gathers, whatever the color count.
+
+    In rgb mode the distance range of a cell is exact (nearest and farthest point
+    of the cell box). For HSV and Lab, a cheap lower bound (from the monotone
+    parts of the conversion) rules out most cells, and the distance range of the
+    remaining cells is measured exactly over all their colors.
+
+    The table is transposed at compile time to the frame's native `channel_order`
+    (mss captures BGRA), so pixels are classified in place without reordering.
+    """
+
+    def __init__(self, color_specs, bits=DEFAULT_BITS, channel_order="RGB"):
+        if not 1 <= bits <= 8:
+            raise ValueError("bits must be between 1 and 8")
+        if len(color_specs) >= AMBIGUOUS:
+            raise ValueError(f"A color classifier supports at most {AMBIGUOUS - 1} colors")
+        if channel_order not in CHANNEL_ORDERS:
+            raise ValueError(f"Unsupported channel order: {channel_order}")
+        self.color_specs = tuple(color_specs)
+        self.bits = bits
+        self.shift = 8 - bits
+        self.channel_order = channel_order
+        # Pixel channels holding R, G and B (for exact checks in RGB)
+        self._native_order = [channel_order.index(c) for c in "RGB"]
+        # Axis k of the native table is indexed by pixel channel k
+        self.lut = np.ascontiguousarray(self._build_lut().transpose(["RGB".index(c) for c in channel_order[:3]]))
+        self.flat_lut = self.lut.ravel()
+        self._build_refinement()
+
+    def _cell_ranges(self):
+        """Lowest and highest channel value of every cell along one axis."""
+        lows = np.arange(1 << self.bits, dtype=np.float64) * (1 << self.shift)
+        return lows, lows + (1 << self.shift) - 1
+
+    def _lower_bound(self, target, mode):
+        """A lower bound of the hsv or lab distance from `target` (in that space) over every cell, as a (levels,)*3 array."""
+        lows, highs = self._cell_ranges()
+        if mode == "hsv":
+            # V = max(r, g, b) and the min channel are monotone; hue is left unbounded
+            v_low, v_high = np.maximum.outer(np.maximum.outer(lows, lows), lows), np.maximum.outer(np.maximum.outer(highs, highs), highs)
+            min_low, min_high = np.minimum.outer(np.minimum.outer(lows, lows), lows), np.minimum.outer(np.minimum.outer(highs, highs), highs)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                s_low = np.where(v_low > 0, 255.0 * (1 - min_high / v_low), 0.0).clip(min=0)
+                s_high = np.where(v_high > 0, 255.0 * (1 - min_low / v_high), 0.0)
+            return np.maximum(_interval_distance(s_low, s_high, target[1]), _interval_distance(v_low, v_high, target[2]))
+        # Linear RGB -> XYZ has positive weights and f is increasing, so each of
+        # fx, fy, fz is bounded by the cell's low and high corners
+        linear_low, linear_high = _srgb_to_linear(lows), _srgb_to_linear(highs)
+        def f_range(axis):
+            weights = _RGB_TO_XYZ[:, axis] / _WHITE[axis]
+            bound = lambda c: _lab_f(np.add.outer(np.add.outer(weights[0] * c, weights[1] * c), weights[2] * c))
+            return bound(linear_low), bound(linear_high)
+        (fx_low, fx_high), (fy_low, fy_high), (fz_low, fz_high) = f_range(0), f_range(1), f_range(2)
+        return np.sqrt(_interval_distance(116.0 * fy_low - 16.0, 116.0 * fy_high - 16.0, target[0]) ** 2
+                       + _interval_distance(500.0 * (fx_low - fy_high), 500.0 * (fx_high - fy_low), target[1]) ** 2
+                       + _interval_distance(200.0 * (fy_low - fz_high), 200.0 * (fy_high - fz_low), target[2]) ** 2)
+
+    def _cell_distances(self, color, tolerance, mode, open_cells, batch=4096):
+        """
+        Flat indices of the open cells that may hold a color within `tolerance`,
+        with the (min, max) distance from `color` over each of them.
+        """
+        rgb = np.array(parse_hex_color(color), dtype=np.float64)
+        if mode == "rgb":
+            lows, highs = self._cell_ranges()
+            # Chebyshev distance: per-axis nearest and farthest point of the cell box
+            near = [_interval_distance(lows, highs, t) for t in rgb]
+            far = [np.maximum(np.abs(lows - t), np.abs(highs - t)) for t in rgb]
+            low = np.maximum.outer(np.maximum.outer(near[0], near[1]), near[2]).ravel()
+            cells = np.flatnonzero(open_cells & (low <= tolerance))
+            high = np.maximum.outer(np.maximum.outer(far[0], far[1]), far[2]).ravel()[cells]
+            return cells, low[cells], high
+        target = _to_space(mode, rgb)
+        # The bound and the exact distances round differently: keep a margin
+        cells = np.flatnonzero(open_cells & (self._lower_bound(target, mode).ravel() <= tolerance + 1e-6))
+        # Every color of a cell: its low corner plus each offset inside the cell
+        step = 1 << self.shift
+        offsets = np.stack(np.meshgrid(*[np.arange(step)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)
+        low, high = np.empty(len(cells)), np.empty(len(cells))
+        for start in range(0, len(cells), batch):
+            corner = np.stack(np.unravel_index(cells[start:start + batch], (1 << self.bits,) * 3), axis=-1) * step
+            distance = _space_distance(mode, _to_space(mode, corner[:, None, :] + offsets), target)
+            low[start:start + batch], high[start:start + batch] = distance.min(axis=1), distance.max(axis=1)
+        return cells, low, high
+
+    def _build_lut(self):
+        levels = 1 << self.bits
+        lut = np.zeros(levels ** 3, dtype=np.uint8)
+        # Cells not yet settled: an earlier color may still claim some of their pixels
+        open_cells = np.ones(lut.shape, dtype=bool)
+        for label, (color, tolerance, mode) in enumerate(self.color_specs, start=1):
+            cells, low, high = self._cell_distances(color, tolerance, mode, open_cells)
+            cells, high = cells[low <= tolerance], high[low <= tolerance]
+            inside = cells[(high <= tolerance) & (lut[cells] == 0)]
+            lut[inside] = label
+            open_cells[inside] = False
+            lut[cells[open_cells[cells]]] = AMBIGUOUS
+        return lut.reshape(levels, levels, levels)
+
+    def _exact_labels(self, pixels):
+        """Exact labels of an (N, C) array of pixels in `channel_order` (first matching color wins)."""
+        rgb = pixels[:, self._native_order].astype(np.float64)
+        labels = np.zeros(len(rgb), dtype=np.uint8)
+        spaces = {}  # Each mode converts the pixels once
+        for label, (color, tolerance, mode) in enumerate(self.color_specs, start=1):
+            open_pixels = np.flatnonzero(labels == 0)
+            if not len(open_pixels): break
+            if mode not in spaces: spaces[mode] = _to_space(mode, rgb)
+            hits = _space_distance(mode, spaces[mode][open_pixels], _to_space(mode, parse_hex_color(color))) <= tolerance
+            labels[open_pixels[hits]] = label
+        return labels
+
+    def _build_refinement(self):
+        """
+        Exact labels of every color in the ambiguous cells: one block of
+        step**3 labels per cell, indexed by the low bits of the pixel channels.
+        """
+        step = 1 << self.shift
+        cells = np.flatnonzero(self.flat_lut == AMBIGUOUS)
+        self._block = np.full(self.flat_lut.shape, -1, dtype=np.int32)
+        self._block[cells] = np.arange(len(cells), dtype=np.int32)
+        offsets = np.stack(np.meshgrid(*[np.arange(step)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)
+        corners = np.stack(np.unravel_index(cells, self.lut.shape), axis=-1) * step
+        # Native-order pixels of every cell (a 4th channel, if any, is never read)
+        pixels = (corners[:, None, :] + offsets).reshape(-1, 3)
+        pixels = np.concatenate([pixels, np.zeros((len(pixels), len(self.channel_order) - 3), dtype=pixels.dtype)], axis=1)
+        self._refined = self._exact_labels(pixels)
+
+    def labels(self, pixels):
+        """Returns a uint8 (H, W) array of color labels (0 = no match) for pixels in `channel_order`."""
+        # Pack the quantized channels into one flat table index, in place
+        index = (pixels[..., 0] >> self.shift).astype(np.uint32)
+        index <<= self.bits
+        index |= pixels[..., 1] >> self.shift
+        index <<= self.bits
+        index |= pixels[..., 2] >> self.shift
+        labels = self.flat_lut.take(index)
+        if labels.size and labels.max() == AMBIGUOUS:
+            # Ambiguous cells: look the pixel up in its cell's block of exact labels
+            ambiguous = np.nonzero(labels == AMBIGUOUS)
+            mask = (1 << self.shift) - 1
+            inner = (pixels[ambiguous + (0,)] & mask).astype(np.int64)
+            inner <<= self.shift
+            inner |= pixels[ambiguous + (1,)] & mask
+            inner <<= self.shift
+            inner |= pixels[ambiguous + (2,)] & mask
+            labels[ambiguous] = self._refined[self._block[index[ambiguous]].astype(np.int64) << (3 * self.shift) | inner]
+        return labels
+
+    def match(self, pixels):
+        """Returns a boolean (H, W) mask of pixels matching any target color."""
+        return self.labels(pixels) != 0
+
+@functools.lru_cache(maxsize=8)
+def get_color_classifier(color_specs, bits=DEFAULT_BITS, channel_order="RGB"):
+    """Returns a cached classifier so each process compiles a color set only once."""
+    return ColorClassifier(color_specs, bits, channel_order)
@@ -0,0 +1,348 @@
+import numpy as np
+
+# --- Detection Primitives (for "The Brain") ---
+
+# Neighbouring grid cells that can hold a conflicting point (besides the cell
+# itself, where every pair of points conflicts).
+_NEIGHBOUR_OFFSETS = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if (dx, dy) != (0, 0)]
+
+def filter_points_by_distance(points, min_distance):
+    """
+    Thins (x, y, ...) points so that every pair is at least `min_distance` apart on
+    some axis (|dx| >= d or |dy| >= d). The result is the same as the greedy
+    filter: each point is kept unless it conflicts with an earlier kept point.
+
+    Points are bucketed into a grid of d x d cells, so a point can only conflict
+    with points in its own and the 8 surrounding cells, and at most one point per
+    cell is kept. The greedy order is resolved in vectorized rounds: the earliest
+    remaining point of a cell is kept once it is earlier than every remaining point
+    of the neighbouring cells, and those cells then skip the points it conflicts
+    with. A cell whose first point is rejected still offers its later points.
+
+    Args:
+        points: An (N, k) array or a list of (x, y, ...) tuples, in priority
+            order. Columns after x and y (e.g. a color label) are carried along.
+        min_distance (int): The minimum spacing, e.g. `min_check_pixel`.
+
+    Returns:
+        An (M, k) int64 array of the accepted points, in their input order.
+    """
+    rows = np.asarray(points, dtype=np.int64)
+    rows = rows.reshape(-1, rows.shape[-1] if rows.ndim > 1 else 2)
+    points = rows[:, :2]
+    count = len(points)
+    if count == 0:
+        return rows
+    if min_distance <= 1:
+        _, first = np.unique(points, axis=0, return_index=True)
+        return rows[np.sort(first)]
+
+    # Bucket into cells, padded by one so neighbour keys never wrap around a row
+    cells = (points - points.min(axis=0)) // min_distance + 1
+    grid_width = int(cells[:, 0].max()) + 2
+    keys = cells[:, 1] * grid_width + cells[:, 0]
+
+    # Sort by cell, then by input order: a cell's remaining points are a run, earliest first
+    order = np.lexsort((np.arange(count), keys))
+    cell_keys, cell_starts = np.unique(keys[order], return_index=True)
+    point_cell = np.repeat(np.arange(len(cell_keys)), np.diff(np.append(cell_starts, count)))
+    sorted_points = points[order]
+    neighbour_keys = cell_keys[:, None] + np.array([dy * grid_width + dx for dx, dy in _NEIGHBOUR_OFFSETS])
+    found = np.searchsorted(cell_keys, neighbour_keys).clip(max=len(cell_keys) - 1)
+    neighbours = np.where(cell_keys[found] == neighbour_keys, found, -1)  # (cells, 8), -1 = empty
+
+    cell_ends = np.append(cell_starts[1:], count)
+    accepted = np.full(len(cell_keys), -1)  # Sorted position of each cell's kept point
+    candidate = cell_starts.copy()  # Sorted position of each cell's earliest remaining point (-1 = none left)
+    while True:
+        open_cells = np.flatnonzero(candidate >= 0)
+        if not len(open_cells):
+            break
+        rank = np.full(len(cell_keys) + 1, count)  # Index -1 (no neighbour) reads the sentinel
+        rank[open_cells] = order[candidate[open_cells]]
+        winners = open_cells[(rank[open_cells][:, None] < rank[neighbours[open_cells]]).all(axis=1)]
+        accepted[winners] = candidate[winners]
+        # The rest of a winner's cell conflicts with it
+        candidate[winners] = -1
+
+        # A winner may conflict with the candidates next to it: move those forward to
+        # their first point that conflicts with no kept point (in growing blocks)
+        touched = np.unique(neighbours[winners])
+        touched = touched[touched >= 0]
+        touched = touched[candidate[touched] >= 0]
+        block = 4
+        while len(touched):
+            starts = candidate[touched]
+            lengths = np.minimum(cell_ends[touched] - starts, block)
+            positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+            near = neighbours[point_cell[positions]]
+            near = np.where(near >= 0, accepted[near], -1)
+            delta = np.abs(sorted_points[positions][:, None, :] - sorted_points[np.maximum(near, 0)])
+            conflict = ((near >= 0) & (delta[..., 0] < min_distance) & (delta[..., 1] < min_distance)).any(axis=1)
+            survivors = positions[~conflict]
+            settled = np.zeros(len(cell_keys), dtype=bool)
+            if len(survivors):
+                survivor_cells = point_cell[survivors]
+                first = np.ones(len(survivors), dtype=bool)
+                first[1:] = survivor_cells[1:] != survivor_cells[:-1]
+                candidate[survivor_cells[first]] = survivors[first]
+                settled[survivor_cells] = True
+            # Cells whose whole block conflicted: continue after it, or close them when exhausted
+            unsettled = ~settled[touched]
+            touched, ends = touched[unsettled], starts[unsettled] + lengths[unsettled]
+            candidate[touched] = np.where(ends < cell_ends[touched], ends, -1)
+            touched = touched[candidate[touched] >= 0]
+            block *= 2
+
+    return rows[np.sort(order[accepted[accepted >= 0]])]
+
+# --- Coarse-to-Fine (Pyramid) Search ---
+
+def pyramid_stride(min_check_pixel, min_target_size=None):
+    """
+    Sampling stride for the coarse pass. Accepted points end up at least
+    `min_check_pixel` apart anyway, so sampling every half of that distance still
+    lands on any target at least that wide. Narrower targets can fall between
+    samples, so `min_target_size` (px, the narrowest target side to find) caps
+    the stride.
+    """
+    stride = min_check_pixel // 2
+    if min_target_size: stride = min(stride, min_target_size)
+    return max(1, stride)
+
+def find_matching_pixels(pixels, classifier, stride=1):
+    """
+    Returns the (ys, xs, labels) of pixels matching the classifier, where a
+    label is the 1-based index of the matched color in priority order.
+
+    With stride > 1 the search is coarse-to-fine: only every `stride`-th pixel in
+    each direction is classified first. Each hit (and its 8 neighbours, to cover
+    blob edges) marks a stride x stride cell that is then classified at full
+    resolution, so exact coordinates are only computed where targets are.
+    """
+    height, width = pixels.shape[:2]
+    if stride <= 1:
+        labels = classifier.labels(pixels)
+        ys, xs = np.nonzero(labels)
+        return ys, xs, labels[ys, xs]
+
+    coarse = classifier.match(pixels[::stride, ::stride])
+    if not np.any(coarse):
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.uint8)
+
+    # Dilate the coarse hits by one cell so targets straddling a cell border are refined too
+    cells = coarse.copy()
+    cells[1:] |= coarse[:-1]; cells[:-1] |= coarse[1:]
+    rows_dilated = cells.copy()
+    cells[:, 1:] |= rows_dilated[:, :-1]; cells[:, :-1] |= rows_dilated[:, 1:]
+    cell_y, cell_x = np.nonzero(cells)
+
+    # Gather the full-resolution pixels of every selected cell as one (K, stride, stride) block
+    offsets = np.arange(stride)
+    rows = cell_y[:, None] * stride + offsets
+    cols = cell_x[:, None] * stride + offsets
+    valid = (rows < height)[:, :, None] & (cols < width)[:, None, :]
+    block = pixels[np.minimum(rows, height - 1)[:, :, None], np.minimum(cols, width - 1)[:, None, :]]
+    labels = classifier.labels(block)
+    k, dy, dx = np.nonzero((labels != 0) & valid)
+    return rows[k, dy], cols[k, dx], labels[k, dy, dx]
+# --- Connected-Component Blobs ---
+# Blob mode turns each connected region of same-color matching pixels into one
+# centroid. Tiles are labeled independently as horizontal runs joined by a
+# vectorized union-find; blobs that touch a tile edge also emit one "edge span"
+# row per run of their pixels along that edge, so `stitch_blobs` can merge them
+# across seams where their pixels actually touch.
+
+# Blob rows have side -1 and a frame-unique id (the packed position of their
+# first pixel); edge span rows carry their blob's id, the edge side, the frame
+# row (top/bottom) or column (left/right) they lie on and their start/end along it
+BLOB_FIELDS = ("x", "y", "label", "area", "sum_x", "sum_y", "id", "side", "line", "start", "end")
+TOP, BOTTOM, LEFT, RIGHT = range(4)
+_ID_SHIFT = 32
+
+def _area_ok(area, min_area, max_area):
+    ok = area >= min_area
+    return ok if max_area is None else ok & (area <= max_area)
+
+def _union_find(count, a, b):
+    """Returns the root (smallest member) of every node after joining the pairs (a[i], b[i])."""
+    parent = np.arange(count)
+    while len(a):
+        root_a, root_b = parent[a], parent[b]
+        unmerged = root_a != root_b
+        if not np.any(unmerged):
+            break
+        a, b = a[unmerged], b[unmerged]
+        low, high = np.minimum(root_a[unmerged], root_b[unmerged]), np.maximum(root_a[unmerged], root_b[unmerged])
+        np.minimum.at(parent, high, low)
+        # Pointer jumping until every node points straight at its root
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent): break
+            parent = jumped
+    return parent
+
+def _expand_ranges(low, high):
+    """Pairs (i, j) for every j in [low[i], high[i])."""
+    counts = np.maximum(high - low, 0)
+    i = np.repeat(np.arange(len(low)), counts)
+    j = np.repeat(low, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return i, j
+
+def _touching_spans(line, start, end, next_line, next_start, next_end):
+    """
+    Pairs (i, j) of spans where span j lies on the line after span i and their
+    pixels touch, diagonally included. Spans on one line must be disjoint and
+    the `next_*` spans sorted by (line, start).
+    """
+    stride = max(end.max(initial=0), next_end.max(initial=0)) + 3
+    start_keys = next_line * stride + next_start + 1
+    end_keys = next_line * stride + next_end + 1
+    following = (line + 1) * stride + 1
+    low = np.searchsorted(end_keys, following + start - 1, "left")
+    high = np.searchsorted(start_keys, following + end + 1, "right")
+    return _expand_ranges(low, high)
+
+def _edge_spans(side, line, start, end):
+    """Edge span rows, before their blob ids and labels are filled in."""
+    spans = np.zeros((len(start), len(BLOB_FIELDS)), dtype=np.int64)
+    spans[:, 7] = side
+    spans[:, 8] = line
+    spans[:, 9] = start
+    spans[:, 10] = end
+    return spans
+
+def _column_spans(side, line, run_y, blob):
+    """Groups the edge-column runs (one per row, in row order) into spans of consecutive rows of one blob."""
+    if not len(run_y):
+        return _edge_spans(side, line, run_y, run_y), blob
+    breaks = np.flatnonzero((np.diff(run_y) != 1) | (np.diff(blob) != 0)) + 1
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks - 1, [len(run_y) - 1]))
+    return _edge_spans(side, line, run_y[first], run_y[last]), blob[first]
+
+def find_blobs(label_image, origin=(0, 0), min_area=1, max_area=None):
+    """
+    Finds the 8-connected blobs of equal nonzero labels in a label image.
+
+    Args:
+        label_image (np.ndarray): (H, W) color labels, 0 = background.
+        origin (tuple): (x, y) added to every coordinate, e.g. the tile's offset.
+        min_area (int): Blobs smaller than this (px) are dropped, unless they
+            touch the tile edge and may continue in the next tile.
+        max_area (int): Same for blobs larger than this (None = no limit).
+
+    Returns:
+        An (N, len(BLOB_FIELDS)) int64 array: one row per blob, followed by the
+        edge span rows of the blobs that touch the tile edge.
+    """
+    height, width = label_image.shape
+    columns = len(BLOB_FIELDS)
+    left_neighbour = np.zeros_like(label_image); left_neighbour[:, 1:] = label_image[:, :-1]
+    right_neighbour = np.zeros_like(label_image); right_neighbour[:, :-1] = label_image[:, 1:]
+    foreground = label_image != 0
+    run_y, run_x0 = np.nonzero(foreground & (label_image != left_neighbour))
+    if not len(run_y):
+        return np.empty((0, columns), dtype=np.int64)
+    run_x1 = np.nonzero(foreground & (label_image != right_neighbour))[1]
+    run_label = label_image[run_y, run_x0].astype(np.int64)
+
+    # Runs are in row-major order, so rows are contiguous and x0/x1 increase within
+    # a row: the runs of row r touching run b of row r + 1 form one index range
+    b, a = _touching_spans(run_y, run_x0, run_x1, run_y, run_x0, run_x1)
+    same = run_label[a] == run_label[b]
+    root = _union_find(len(run_y), a[same], b[same])
+    roots, blob = np.unique(root, return_inverse=True)
+    blob = blob.ravel()
+    n = len(roots)
+
+    length = run_x1 - run_x0 + 1
+    blobs = np.full((n, columns), -1, dtype=np.int64)
+    area = np.bincount(blob, length, n)
+    sum_x = np.bincount(blob, (run_x0 + run_x1) * length / 2, n)
+    sum_y = np.bincount(blob, run_y * length, n)
+    blobs[:, 2] = run_label[roots]
+    blobs[:, 3] = area
+    blobs[:, 4] = np.rint(sum_x + origin[0] * area)
+    blobs[:, 5] = np.rint(sum_y + origin[1] * area)
+    blobs[:, 0] = np.rint(blobs[:, 4] / area)
+    blobs[:, 1] = np.rint(blobs[:, 5] / area)
+    # The root is the blob's first run, so its first pixel is unique in the frame
+    blobs[:, 6] = ((run_y[roots] + origin[1]) << _ID_SHIFT) + run_x0[roots] + origin[0]
+
+    top, bottom, left, right = run_y == 0, run_y == height - 1, run_x0 == 0, run_x1 == width - 1
+    spans = [(_edge_spans(TOP, origin[1], run_x0[top] + origin[0], run_x1[top] + origin[0]), blob[top]),
+             (_edge_spans(BOTTOM, origin[1] + height - 1, run_x0[bottom] + origin[0], run_x1[bottom] + origin[0]), blob[bottom]),
+             _column_spans(LEFT, origin[0], run_y[left] + origin[1], blob[left]),
+             _column_spans(RIGHT, origin[0] + width - 1, run_y[right] + origin[1], blob[right])]
+    edges = np.concatenate([rows for rows, _ in spans])
+    owner = np.concatenate([owners for _, owners in spans])
+    edges[:, 2] = blobs[owner, 2]
+    edges[:, 6] = blobs[owner, 6]
+
+    on_edge = np.zeros(n, dtype=bool)
+    on_edge[owner] = True
+    return np.concatenate([blobs[on_edge | _area_ok(area, min_area, max_area)], edges])
+
+def point_blobs(points):
+    """
+    Wraps (x, y, label) point detections (e.g. template matches) as blob rows with
+    area 0, so they pass through `stitch_blobs` unchanged.
+    """
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 3)
+    blobs = np.full((len(points), len(BLOB_FIELDS)), -1, dtype=np.int64)
+    blobs[:, :3] = points
+    blobs[:, 3] = 0
+    blobs[:, 4], blobs[:, 5] = points[:, 0], points[:, 1]
+    return blobs
+
+def stitch_blobs(blobs, min_area=1, max_area=None):
+    """
+    Merges blobs of neighbouring tiles that touch across a seam, then applies the
+    area limits.
+
+    Two blobs of the same label are joined when an edge span of one (bottom or
+    right) lies on the row (column) just before an edge span of the other (top
+    or left) and the two spans overlap or touch diagonally, i.e. exactly when
+    their pixels are 8-connected.
+
+    Args:
+        blobs (np.ndarray): Rows from `find_blobs` (or `point_blobs`) of every tile.
+
+    Returns:
+        An (M, 3) int64 array of (x, y, label) centroids, largest blob first.
+    """
+    rows = np.asarray(blobs, dtype=np.int64).reshape(-1, len(BLOB_FIELDS))
+    blobs, edges = rows[rows[:, 7] < 0], rows[rows[:, 7] >= 0]
+    if not len(blobs):
+        return np.empty((0, 3), dtype=np.int64)
+    pairs = []
+    if len(edges):
+        # Blob rows by id (point rows have id -1 and own no edge spans)
+        by_id = np.argsort(blobs[:, 6], kind="stable")
+        owner = by_id[np.searchsorted(blobs[by_id, 6], edges[:, 6])]
+        for before, after in ((BOTTOM, TOP), (RIGHT, LEFT)):
+            first = np.flatnonzero(edges[:, 7] == before)
+            second = np.flatnonzero(edges[:, 7] == after)
+            if not len(first) or not len(second): continue
+            second = second[np.lexsort((edges[second, 9], edges[second, 8]))]
+            a, b = edges[first], edges[second]
+            i, j = _touching_spans(a[:, 8], a[:, 9], a[:, 10], b[:, 8], b[:, 9], b[:, 10])
+            same = a[i, 2] == b[j, 2]
+            pairs.append((owner[first[i[same]]], owner[second[j[same]]]))
+    if pairs:
+        root = _union_find(len(blobs), np.concatenate([p[0] for p in pairs]), np.concatenate([p[1] for p in pairs]))
+        roots, group = np.unique(root, return_inverse=True)
+        group = group.ravel()
+        area = np.bincount(group, blobs[:, 3], len(roots))
+        sum_x = np.bincount(group, blobs[:, 4], len(roots))
+        sum_y = np.bincount(group, blobs[:, 5], len(roots))
+        # Point rows (area 0) never touch an edge, so they stay groups of one
+        xs = np.where(area == 0, blobs[roots, 0], np.rint(sum_x / np.maximum(area, 1)))
+        ys = np.where(area == 0, blobs[roots, 1], np.rint(sum_y / np.maximum(area, 1)))
+        labels = blobs[roots, 2]
+    else:
+        area, xs, ys, labels = blobs[:, 3], blobs[:, 0], blobs[:, 1], blobs[:, 2]
+    keep = (area == 0) | _area_ok(area, min_area, max_area)
+    order = np.argsort(-area[keep], kind="stable")
+    return np.column_stack((xs[keep], ys[keep], labels[keep])).astype(np.int64)[order]
@@ -0,0 +1,360 @@
+import json
+import threading
+import time
+
+from fast_input import fast_click, compile_burst, send_burst, compile_timeline, send_event_group
+from click_scheduler import ClickScheduler, DEFAULT_WINDOW_CPS, DEFAULT_CLICK_BATCH
+from macro import Timeline, MacroRecorder
+from capture_governor import DEFAULT_MIN_FPS, DEFAULT_MAX_FPS
+from metrics import PipelineMetrics, ThreadCpuMeter
+from target_queue import DEFAULT_TTL, DEFAULT_AGE_WEIGHT, DEFAULT_DISTANCE_WEIGHT
+
+# --- Automation Engine (Qt-free) ---
+# Everything needed to run a profile lives here, so the GUI and the headless CLI
+# are just front ends over the same engine. Heavy dependencies are imported per
+# mode: Dynamic and Multi-Position only need ctypes, while NumPy, mss and the
+# analysis pool are loaded the first time Intelligent mode starts.
+
+MODES = ("multi-position", "dynamic", "intelligent")
+
+class ClickWorker(threading.Thread):
+    """Optimized thread for Multi-Position and Dynamic clicking using direct input."""
+
+    def __init__(self, engine, mode, click_interval_sec, positions, target_cps=None, timeline=None):
+        super().__init__(name="click", daemon=True)
+        self._is_running = True
+        self.engine = engine
+        self.metrics = engine.metrics
+        self.mode = mode
+        self.interval = click_interval_sec
+        self.positions = positions
+        # Timed playback: the whole macro is one preallocated event array played against absolute timestamps
+        self.timeline = compile_timeline(*timeline.events()) if timeline else None
+        # Multi-Position: compile every position into one SendInput array up front
+        self.burst = compile_burst(positions) if mode == "multi-position" and not self.timeline else None
+        # Pace ticks against absolute deadlines; a target CPS overrides the interval
+        clicks_per_tick = max(1, self.burst.count) if self.burst else 1
+        if self.timeline:
+            self.scheduler = ClickScheduler(self.timeline.duration_ns / 1e9 / len(self.timeline.offsets_ns))
+        else:
+            self.scheduler = ClickScheduler.from_cps(target_cps, clicks_per_tick) if target_cps else ClickScheduler(click_interval_sec)
+
+    def stop(self):
+        self._is_running = False
+        self.join()
+
+    def _play_timeline(self):
+        """Plays the compiled timeline in a loop; every event group waits for its own absolute deadline."""
+        timeline, scheduler, metrics = self.timeline, self.scheduler, self.metrics
+        offsets, clicks_per_group = timeline.offsets_ns, timeline.clicks
+        groups = range(len(offsets))
+        should_continue = lambda: self._is_running
+        cpu_meter = ThreadCpuMeter(metrics, "click")
+        clicks_since_last_update = 0
+        last_update = loop_start = time.perf_counter_ns() + scheduler.spin_threshold_ns
+        try:
+            while self._is_running:
+                for group in groups:
+                    if scheduler.wait_for_event(loop_start + offsets[group], should_continue) is None: break
+                    dispatch_started = time.perf_counter_ns()
+                    send_event_group(timeline, group)
+                    metrics.record_ns("click", time.perf_counter_ns() - dispatch_started)
+                    clicks_since_last_update += clicks_per_group[group]
+                    if dispatch_started - last_update > 200_000_000:
+                        metrics.count("clicks", clicks_since_last_update)
+                        self.engine.add_clicks(clicks_since_last_update)
+                        clicks_since_last_update = 0
+                        cpu_meter.tick()
+                        last_update = dispatch_started
+                loop_start += timeline.duration_ns
+                # Fell more than a whole loop behind (e.g. the system stalled): restart the timeline from now
+                now = time.perf_counter_ns()
+                if now - loop_start > timeline.duration_ns: loop_start = now
+        except Exception as e:
+            self.engine.report_error(f"Click error: {e}. Stopping.")
+        metrics.count("clicks", clicks_since_last_update)
+        if clicks_since_last_update: self.engine.add_clicks(clicks_since_last_update)
+
+    def run(self):
+        if self.timeline:
+            self._play_timeline()
+            return
+        clicks_since_last_update = 0
+        last_update_time = time.time()
+        cpu_meter = ThreadCpuMeter(self.metrics, "click")
+        self.scheduler.start()
+
+        while self._is_running:
+            dispatch_started = time.perf_counter_ns()
+            try:
+                if self.mode == "dynamic":
+                    fast_click()
+                    clicks = 1
+                elif self.mode == "multi-position":
+                    if not self.burst.count:
+                        time.sleep(0.1)
+                        continue
+                    # Perform a high-speed "burst" of clicks in a single SendInput call before sleeping
+                    clicks = send_burst(self.burst)
+            except Exception as e:
+                self.engine.report_error(f"Click error: {e}. Stopping.")
+                break
+            clicks_since_last_update += clicks
+            self.metrics.record_ns("click", time.perf_counter_ns() - dispatch_started)
+            self.metrics.count("clicks", clicks)
+
+            # Batch click count updates to reduce CPU load
+            current_time = time.time()
+            if current_time - last_update_time > 0.2:
+                if clicks_since_last_update > 0:
+                    self.engine.add_clicks(clicks_since_last_update)
+                    clicks_since_last_update = 0
+                cpu_meter.tick()
+                last_update_time = current_time
+
+            self.scheduler.wait()
+        if clicks_since_last_update: self.engine.add_clicks(clicks_since_last_update)
+
+class AutoClickerEngine:
+    """
+    Holds a profile's settings and runs it in one of the three modes.
+
+    Args:
+        on_message (callable): Receives log lines (str). Called from any thread.
+        on_error (callable): Receives a message when a worker fails. The engine
+            keeps running; the front end is expected to call `stop()`.
+    """
+
+    def __init__(self, on_message=print, on_error=None):
+        self.on_message = on_message
+        self.on_error = on_error
+
+        # Profile settings
+        self.pointer_positions = []; self.mode = "multi-position"; self.window = None; self.colors = []
+        # Multi-Position steps with their own timing; played instead of the even loop when timed_playback is on
+        self.timeline = Timeline(); self.timed_playback = False
+        self.recorder = MacroRecorder(self.timeline)
+        # More Intelligent mode windows: {"title": ..., "window": <window or None>, "colors": [...], "color_settings": {...}}
+        # ("colors" and "color_settings" are optional and default to the main window's)
+        self.extra_windows = []
+        self.min_check_pixel = 10; self.click_interval = 0.003; self.target_cps = None
+        self.color_tolerance = None; self.color_mode = None; self.color_settings = {}  # None = classifier defaults
+        self.templates = []  # [{"path": ..., "threshold": ..., "key_tolerance": ..., "priority": ...}]
+        self.incremental_analysis = True; self.pyramid_search = False; self.min_target_size = None  # None = MinCheckPixel / 2
+        self.detection = "pixels"; self.min_blob_area = 1; self.max_blob_area = None  # "blobs" = one click per connected region
+        self.capture_min_fps = DEFAULT_MIN_FPS; self.capture_max_fps = DEFAULT_MAX_FPS
+        self.click_cooldown = 0.25; self.analysis_backend = "auto"
+        self.frame_slots = 3; self.max_in_flight = 2
+        self.roi = {}  # RegionOfInterest.to_dict() form; empty = whole window
+        self.record_path = None; self.record_max_frames = 600
+        # Headless runs: frames to analyze instead of capturing the window (e.g. a ReplaySource),
+        # and a callable(key, targets) that gets the clicks instead of the window
+        self.frame_source = None; self.click_sink = None
+        self.target_ttl = DEFAULT_TTL; self.target_anchor = None  # (x, y) in window coordinates, e.g. a crosshair
+        self.age_weight = DEFAULT_AGE_WEIGHT; self.distance_weight = DEFAULT_DISTANCE_WEIGHT
+        self.window_max_cps = DEFAULT_WINDOW_CPS; self.click_batch = DEFAULT_CLICK_BATCH  # Background click flood control, per window
+
+        # Runtime state
+        self.clicking = False; self.click_count = 0; self._click_lock = threading.Lock()
+        self.metrics = PipelineMetrics(); self.metrics_path = None
+        self.num_cores = None; self.pool = None; self.pool_kind = None
+        self.click_worker = None; self.sessions = []
+
+    # --- Running ---
+
+    def start(self):
+        """
+        Starts clicking in the current mode.
+
+        Raises:
+            ValueError: If the mode is missing what it needs (positions, colors,
+                a window) or the region of interest does not fit the window.
+        """
+        self.stop()
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown mode: {self.mode}")
+        if self.mode == "multi-position" and not self.pointer_positions:
+            raise ValueError("No positions captured yet!")
+        if self.mode == "intelligent":
+            if not self.colors and not self.templates:
+                raise ValueError("No target colors or templates defined!")
+            if self.frame_source is None and (not self.window or not hasattr(self.window, '_hWnd')):
+                raise ValueError("Please select a valid target window.")
+            if self.window is None and self.click_sink is None:
+                raise ValueError("Frames without a target window need a click sink.")
+            self._resolve_extra_windows()
+
+        self.clicking = True
+        if self.mode in ["dynamic", "multi-position"]:
+            timeline = self.timeline if self.mode == "multi-position" and self.timed_playback and self.timeline.steps else None
+            self.click_worker = ClickWorker(self, self.mode, self.click_interval, self.pointer_positions, self.target_cps, timeline)
+            self.click_worker.start()
+        else:
+            from pipeline import IntelligentSession, RoundRobinScheduler  # NumPy, mss and the analysis modules
+            self._ensure_pool()
+            # One session per window; all of them share the pool, taking turns frame by frame
+            targets = [(self.window, None, None)] + [(entry["window"], entry.get("colors"), entry.get("color_settings")) for entry in self.extra_windows]
+            scheduler = RoundRobinScheduler(max(self.max_in_flight, len(targets)))
+            try:
+                for key, (window, colors, color_settings) in enumerate(targets):
+                    frame_source = self.frame_source if key == 0 else None
+                    self.sessions.append(IntelligentSession(self, window, key, scheduler, colors, color_settings, frame_source))
+            except ValueError:
+                for session in self.sessions: session.frame_ring.close()
+                self.sessions = []
+                self.clicking = False
+                raise
+            for session in self.sessions: session.start()
+
+    def stop(self):
+        if self.click_worker:
+            if self.click_worker.is_alive(): self.click_worker.stop()
+            self.on_message(self.click_worker.scheduler.summary())
+            self.click_worker = None
+        if self.sessions:
+            # Stop every Eye first, so no window keeps the shared pool busy while the others wind down
+            for session in self.sessions:
+                if session.capture_worker.is_alive(): session.capture_worker.stop()
+            lines = [line for session in self.sessions for line in session.stop()]
+            for line in [self.metrics.summary()] + lines: self.on_message(line)
+            self.sessions = []
+        self.clicking = False
+
+    def close(self):
+        self.stop()
+        if self.pool: self.pool.close(); self.pool = None
+
+    def report_error(self, message):
+        """Called by workers when they stop on an error."""
+        if self.on_error: self.on_error(message)
+        else: self.on_message(message)
+
+    def add_clicks(self, clicks):
+        # Called by every click thread (one per Intelligent window), once per batch
+        with self._click_lock: self.click_count += clicks
+
+    def get_position_count(self): return len(self.pointer_positions) if self.mode == "multi-position" else (len(self.colors) * (1 + len(self.extra_windows)) if self.mode == "intelligent" else 1)
+
+    def window_stats(self):
+        """Per-window clicks, CPS and capture-to-click latency of the running Intelligent sessions."""
+        return [session.stats() for session in self.sessions]
+
+    def window_summary(self):
+        return "\n".join(session.stats_line() for session in self.sessions)
+
+    def get_color_specs(self):
+        from color_classifier import build_color_specs
+        return build_color_specs(self.colors, self.color_tolerance, self.color_mode, self.color_settings)
+
+    def invalidate_tile_cache(self):
+        for session in self.sessions: session.invalidate_tile_cache()
+
+    def _ensure_pool(self):
+        """Creates the analysis backend on first use, or when a different one was selected."""
+        if self.pool and self.pool_kind == self.analysis_backend: return
+        from analysis import create_backend
+        if self.num_cores is None:
+            import psutil
+            from multiprocessing import cpu_count
+            self.num_cores = psutil.cpu_count(logical=False) or cpu_count()
+        if self.pool: self.pool.close()
+        self.pool = create_backend(self.analysis_backend, self.num_cores, on_select=self._on_backend_selected)
+        self.pool.attach_metrics(self.metrics)
+        self.pool_kind = self.analysis_backend
+
+    def _on_backend_selected(self, name, medians):
+        timings = ", ".join(f"{n}: {latency * 1000:.1f} ms" for n, latency in medians.items())
+        self.on_message(f"Analysis backend selected: {name} ({timings})")
+
+    # --- Positions and Timelines ---
+
+    def capture_position(self, x, y):
+        """Adds a Multi-Position step at (x, y), timed from the previous capture."""
+        self.pointer_positions.append((x, y))
+        return self.recorder.record(x, y)
+
+    def clear_positions(self):
+        self.pointer_positions.clear(); self.timeline.steps.clear(); self.recorder.reset()
+
+    def set_timeline(self, timeline):
+        self.timeline = timeline; self.recorder = MacroRecorder(timeline)
+        self.pointer_positions = timeline.positions
+
+    def save_positions(self, path):
+        """Saves the Multi-Position steps as a timeline (see `macro`)."""
+        with open(path, "w") as f: json.dump(self.timeline.to_data(), f)
+
+    def load_positions(self, path):
+        """Loads a saved timeline, or a bare list of positions (spaced by the click interval)."""
+        with open(path, "r") as f: self.set_timeline(Timeline.from_data(json.load(f), self.click_interval))
+
+    # --- Windows ---
+
+    def find_window(self, title):
+        """Selects the first top-level window whose title contains `title`. Returns it, or None."""
+        import pygetwindow as gw
+        matches = gw.getWindowsWithTitle(title)
+        self.window = matches[0] if matches else None
+        return self.window
+
+    def add_window(self, window, colors=None, color_settings=None):
+        """Adds another Intelligent mode window, optionally with its own colors."""
+        entry = {"title": window.title, "window": window}
+        if colors is not None: entry["colors"] = colors
+        if color_settings is not None: entry["color_settings"] = color_settings
+        self.extra_windows.append(entry)
+
+    def _resolve_extra_windows(self):
+        """Finds the windows of extra entries loaded from a profile (by title)."""
+        missing = [entry for entry in self.extra_windows if not hasattr(entry.get("window"), "_hWnd")]
+        if not missing: return
+        import pygetwindow as gw
+        for entry in missing:
+            matches = gw.getWindowsWithTitle(entry["title"])
+            if not matches: raise ValueError(f"No window titled '{entry['title']}' found.")
+            entry["window"] = matches[0]
+
+    # --- Profiles ---
+
+    def to_profile(self):
+        """The engine's settings as a JSON-serializable profile."""
+        data = {"colors_to_click": self.colors, "tolerance": self.color_tolerance, "mode": self.color_mode, "color_settings": self.color_settings, "templates": self.templates, "click_cooldown": self.click_cooldown, "incremental": self.incremental_analysis, "max_in_flight": self.max_in_flight, "pyramid": self.pyramid_search, "min_target_size": self.min_target_size, "detection": self.detection, "min_blob_area": self.min_blob_area, "max_blob_area": self.max_blob_area, "roi": self.roi, "backend": self.analysis_backend, "min_fps": self.capture_min_fps, "max_fps": self.capture_max_fps,
+                "target_ttl": self.target_ttl, "target_anchor": list(self.target_anchor) if self.target_anchor else None, "age_weight": self.age_weight, "distance_weight": self.distance_weight, "window_max_cps": self.window_max_cps, "click_batch": self.click_batch,
+                "run_mode": self.mode, "positions": [list(p) for p in self.pointer_positions], "timeline": self.timeline.to_data() if self.timeline.steps else None, "timed_playback": self.timed_playback, "interval": self.click_interval, "target_cps": self.target_cps, "min_check_pixel": self.min_check_pixel}
+        if self.window: data["window_title"] = self.window.title
+        if self.extra_windows: data["windows"] = [{key: value for key, value in entry.items() if key != "window"} for entry in self.extra_windows]
+        return {key: value for key, value in data.items() if value is not None}
+
+    def apply_profile(self, data):
+        """
+        Loads settings from a profile. Color data saved by older versions (colors
+        and detection settings only) leaves positions, mode and interval untouched.
+        """
+        self.colors = data.get("colors_to_click", [])
+        self.color_tolerance = data.get("tolerance"); self.color_mode = data.get("mode")
+        self.color_settings = data.get("color_settings", {}); self.templates = data.get("templates", []); self.click_cooldown = data.get("click_cooldown", 0.25)
+        self.incremental_analysis = data.get("incremental", True); self.max_in_flight = data.get("max_in_flight", 2)
+        self.frame_slots = self.max_in_flight + 1
+        self.pyramid_search = data.get("pyramid", False); self.min_target_size = data.get("min_target_size")
+        self.detection = data.get("detection", "pixels"); self.min_blob_area = data.get("min_blob_area", 1); self.max_blob_area = data.get("max_blob_area")
+        self.roi = data.get("roi") or {}
+        self.analysis_backend = data.get("backend", "auto")
+        self.capture_min_fps = data.get("min_fps", DEFAULT_MIN_FPS); self.capture_max_fps = data.get("max_fps", DEFAULT_MAX_FPS)
+        self.target_ttl = data.get("target_ttl", DEFAULT_TTL); self.target_anchor = tuple(data["target_anchor"]) if data.get("target_anchor") else None
+        self.age_weight = data.get("age_weight", DEFAULT_AGE_WEIGHT); self.distance_weight = data.get("distance_weight", DEFAULT_DISTANCE_WEIGHT)
+        self.window_max_cps = data.get("window_max_cps", DEFAULT_WINDOW_CPS); self.click_batch = data.get("click_batch", DEFAULT_CLICK_BATCH)
+        if "run_mode" in data: self.mode = data["run_mode"]
+        if "interval" in data: self.click_interval = data["interval"]
+        if "timeline" in data: self.set_timeline(Timeline.from_data(data["timeline"], self.click_interval))
+        elif "positions" in data: self.set_timeline(Timeline.from_data(data["positions"], self.click_interval))
+        if "timed_playback" in data: self.timed_playback = data["timed_playback"]
+        if "target_cps" in data: self.target_cps = data["target_cps"]
+        if "min_check_pixel" in data: self.min_check_pixel = data["min_check_pixel"]
+        if "windows" in data: self.extra_windows = [dict(entry, window=None) for entry in data["windows"]]
+        self.invalidate_tile_cache()
+
+    def save_profile(self, path):
+        with open(path, "w") as f: json.dump(self.to_profile(), f)
+
+    def load_profile(self, path):
+        with open(path, "r") as f: self.apply_profile(json.load(f))
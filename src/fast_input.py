@@ -1,8 +1,10 @@
 import ctypes
-import ctypes.wintypes
-import win32api
-import win32con
-import win32gui
+try:
+    import win32api
+    import win32con
+    import win32gui
+except ImportError:  # pywin32 only exists on Windows; background clicks are unavailable elsewhere
+    win32api = win32con = win32gui = None
 
 # --- Part 1: CTypes for High-Speed Global Cursor Control ---
 # Used for Dynamic and Multi-Position modes where the main cursor must move.
@@ -25,34 +27,124 @@ MOUSEEVENTF_MOVE = 0x0001
 MOUSEEVENTF_ABSOLUTE = 0x8000
 MOUSEEVENTF_LEFTDOWN = 0x0002
 MOUSEEVENTF_LEFTUP = 0x0004
+MOUSEEVENTF_RIGHTDOWN = 0x0008
+MOUSEEVENTF_RIGHTUP = 0x0010
+MOUSEEVENTF_MIDDLEDOWN = 0x0020
+MOUSEEVENTF_MIDDLEUP = 0x0040
 INPUT_MOUSE = 0
 
-user32 = ctypes.windll.user32
-SCREEN_WIDTH = user32.GetSystemMetrics(0)
-SCREEN_HEIGHT = user32.GetSystemMetrics(1)
+# Shared dwExtraInfo target for every preallocated input structure
+_EXTRA = ctypes.c_ulong(0)
+_EXTRA_PTR = ctypes.pointer(_EXTRA)
+INPUT_SIZE = ctypes.sizeof(Input)
+
+user32 = None
+SCREEN_WIDTH = SCREEN_HEIGHT = 0
+
+def use_user32(dll):
+    """
+    Selects the user32 implementation used for SendInput and screen metrics.
+    Pass a stand-in object (with SendInput and GetSystemMetrics) to exercise the
+    input code on non-Windows hosts.
+    """
+    global user32, SCREEN_WIDTH, SCREEN_HEIGHT
+    user32 = dll
+    SCREEN_WIDTH = dll.GetSystemMetrics(0) if dll else 0
+    SCREEN_HEIGHT = dll.GetSystemMetrics(1) if dll else 0
+
+use_user32(ctypes.windll.user32 if hasattr(ctypes, "windll") else None)
+
+def _mouse_input(inp, flags, dx=0, dy=0):
+    """Fills a preallocated Input structure in place."""
+    inp.type = INPUT_MOUSE
+    mi = inp.ii.mi
+    mi.dx, mi.dy, mi.mouseData, mi.dwFlags, mi.time, mi.dwExtraInfo = dx, dy, 0, flags, 0, _EXTRA_PTR
+
+def _normalize(x, y):
+    """Converts screen pixels into SendInput's 0-65535 absolute coordinate space."""
+    return int(x * 65535 / SCREEN_WIDTH), int(y * 65535 / SCREEN_HEIGHT)
+
+# Preallocated inputs, reused on every call instead of building new structures
+_CLICK_INPUTS = (Input * 2)()
+_mouse_input(_CLICK_INPUTS[0], MOUSEEVENTF_LEFTDOWN)
+_mouse_input(_CLICK_INPUTS[1], MOUSEEVENTF_LEFTUP)
+_MOVE_CLICK_INPUT = (Input * 1)()
+_MOVE_CLICK_FLAGS = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_LEFTDOWN | MOUSEEVENTF_LEFTUP
 
 def fast_click():
     """Performs a left click at the current cursor position using SendInput."""
-    extra = ctypes.c_ulong(0)
-    ii_ = Input_I()
-    ii_.mi = MouseInput(0, 0, 0, MOUSEEVENTF_LEFTDOWN, 0, ctypes.pointer(extra))
-    x = Input(ctypes.c_ulong(INPUT_MOUSE), ii_)
-    user32.SendInput(1, ctypes.byref(x), ctypes.sizeof(x))
-    
-    ii_.mi = MouseInput(0, 0, 0, MOUSEEVENTF_LEFTUP, 0, ctypes.pointer(extra))
-    x = Input(ctypes.c_ulong(INPUT_MOUSE), ii_)
-    user32.SendInput(1, ctypes.byref(x), ctypes.sizeof(x))
+    user32.SendInput(2, _CLICK_INPUTS, INPUT_SIZE)
 
 def fast_move_and_click(x: int, y: int):
     """Atomically moves the global cursor to absolute coordinates and clicks."""
-    norm_x = int(x * 65535 / SCREEN_WIDTH)
-    norm_y = int(y * 65535 / SCREEN_HEIGHT)
-    extra = ctypes.c_ulong(0)
-    ii_ = Input_I()
-    flags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_LEFTDOWN | MOUSEEVENTF_LEFTUP
-    ii_.mi = MouseInput(norm_x, norm_y, 0, flags, 0, ctypes.pointer(extra))
-    inp = Input(ctypes.c_ulong(INPUT_MOUSE), ii_)
-    user32.SendInput(1, ctypes.byref(inp), ctypes.sizeof(inp))
+    norm_x, norm_y = _normalize(x, y)
+    _mouse_input(_MOVE_CLICK_INPUT[0], _MOVE_CLICK_FLAGS, norm_x, norm_y)
+    user32.SendInput(1, _MOVE_CLICK_INPUT, INPUT_SIZE)
+
+class ClickBurst:
+    """A sequence of move-and-click inputs compiled into one preallocated ctypes array."""
+
+    def __init__(self, positions):
+        self.count = len(positions)
+        self.inputs = (Input * self.count)()
+        for inp, (x, y) in zip(self.inputs, positions):
+            norm_x, norm_y = _normalize(x, y)
+            _mouse_input(inp, _MOVE_CLICK_FLAGS, norm_x, norm_y)
+
+def compile_burst(positions):
+    """
+    Compiles a list of (x, y) screen positions into a ClickBurst. Do this once when
+    the autoclicker starts; each `send_burst` is then a single SendInput call.
+    """
+    return ClickBurst(positions)
+
+def send_burst(burst):
+    """Injects every click of a compiled burst with one SendInput call. Returns the number sent."""
+    if not burst.count:
+        return 0
+    return user32.SendInput(burst.count, burst.inputs, INPUT_SIZE)
+
+_BUTTON_FLAGS = {"left": (MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP),
+                 "right": (MOUSEEVENTF_RIGHTDOWN, MOUSEEVENTF_RIGHTUP),
+                 "middle": (MOUSEEVENTF_MIDDLEDOWN, MOUSEEVENTF_MIDDLEUP)}
+
+class EventTimeline:
+    """
+    Timed move-and-button events compiled into one preallocated ctypes array.
+
+    Events sharing a timestamp form a group that is sent with a single SendInput
+    call. Group offsets, sizes, click counts and array pointers are plain lists
+    built up front, so playback only indexes them.
+    """
+
+    def __init__(self, events, duration):
+        self.count = len(events)
+        self.duration_ns = max(1, int(duration * 1e9))
+        self.inputs = (Input * self.count)()
+        self.offsets_ns, self.counts, self.clicks, self.pointers = [], [], [], []
+        for i, (offset, x, y, button, phase) in enumerate(events):
+            down, up = _BUTTON_FLAGS[button]
+            flags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | {"click": down | up, "down": down, "up": up}[phase]
+            norm_x, norm_y = _normalize(x, y)
+            _mouse_input(self.inputs[i], flags, norm_x, norm_y)
+            offset_ns = int(offset * 1e9)
+            if self.offsets_ns and self.offsets_ns[-1] == offset_ns:
+                self.counts[-1] += 1
+            else:
+                self.offsets_ns.append(offset_ns); self.counts.append(1); self.clicks.append(0)
+                self.pointers.append(ctypes.byref(self.inputs, i * INPUT_SIZE))
+            if phase != "up": self.clicks[-1] += 1
+
+def compile_timeline(events, duration):
+    """
+    Compiles `macro.Timeline.events()` output into an EventTimeline. Do this once
+    when the autoclicker starts; `send_event_group` then costs one SendInput call.
+    """
+    return EventTimeline(events, duration)
+
+def send_event_group(timeline, index):
+    """Injects the events of one group of a compiled timeline. Returns the number sent."""
+    return user32.SendInput(timeline.counts[index], timeline.pointers[index], INPUT_SIZE)
 
 # --- Part 2: Win32 API for Background Window Clicking ---
 # Used for Intelligent Mode to click without moving the user's cursor.
@@ -67,9 +159,30 @@ def fast_background_click(hwnd, x, y):
         x (int): The x-coordinate relative to the window's top-left corner.
         y (int): The y-coordinate relative to the window's top-left corner.
     """
+    if win32api is None:
+        raise RuntimeError("Background clicks require pywin32 on Windows.")
     # Pack coordinates into a single integer for the API call
     l_param = win32api.MAKELONG(x, y)
     
     # Post the messages. PostMessage is non-blocking and extremely fast.
     win32gui.PostMessage(hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, l_param)
     win32gui.PostMessage(hwnd, win32con.WM_LBUTTONUP, 0, l_param)
+
+def fast_background_clicks(hwnd, targets):
+    """
+    Posts a click to `hwnd` for every target, in one tight loop.
+
+    Args:
+        hwnd: The handle (HWND) of the target window.
+        targets (list): Sequences starting with window-relative (x, y), e.g.
+            the tuples of `PriorityTargetQueue.get_batch`.
+    """
+    if win32api is None:
+        raise RuntimeError("Background clicks require pywin32 on Windows.")
+    # Bind everything once; the loop itself is only the two PostMessage calls
+    post, make_long = win32gui.PostMessage, win32api.MAKELONG
+    down, up, button = win32con.WM_LBUTTONDOWN, win32con.WM_LBUTTONUP, win32con.MK_LBUTTON
+    for target in targets:
+        l_param = make_long(target[0], target[1])
+        post(hwnd, down, button, l_param)
+        post(hwnd, up, 0, l_param)
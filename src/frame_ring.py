@@ -0,0 +1,121 @@
+import threading
+import uuid
+import numpy as np
+from multiprocessing import shared_memory
+
+# --- Shared-Memory Frame Ring (between "The Eye" and "The Brain") ---
+# The Eye writes each frame into its own slot, so a frame is never overwritten
+# while pool workers are still reading it. Submissions are capped by an
+# in-flight limit: when the Brain falls behind, the oldest waiting frame is
+# dropped instead of letting the pool backlog grow without bound.
+
+FREE, PENDING, IN_FLIGHT = "free", "pending", "in_flight"
+
+class FrameSlot:
+    """One shared-memory frame buffer and the frame currently stored in it."""
+
+    def __init__(self, index, shape, dtype):
+        self.index = index
+        self.name = f"autoclicker_frame_{uuid.uuid4()}"
+        required_bytes = int(np.prod(shape) * np.dtype(dtype).itemsize)
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=required_bytes)
+        except FileExistsError:
+            temp_shm = shared_memory.SharedMemory(name=self.name, create=False)
+            temp_shm.close(); temp_shm.unlink()
+            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=required_bytes)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        self.state = FREE
+        self.frame_id = None
+        self.capture_time = None
+
+    def close(self):
+        self.array = None
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError: pass
+
+class FrameRing:
+    """
+    A ring of shared-memory frame slots with sequence numbers and backpressure.
+
+    Args:
+        shape (tuple): Frame shape, e.g. (height, width, 4).
+        dtype: Frame dtype.
+        slots (int): Number of shared-memory frame buffers.
+        max_in_flight (int): Max frames being analyzed at once. Must be lower than
+            `slots` so the Eye always has a buffer to write into.
+    """
+
+    def __init__(self, shape, dtype=np.uint8, slots=3, max_in_flight=2):
+        if not 1 <= max_in_flight < slots:
+            raise ValueError("max_in_flight must be at least 1 and lower than the number of slots")
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.max_in_flight = max_in_flight
+        self.slots = [FrameSlot(i, self.shape, dtype) for i in range(slots)]
+        self.dropped_frames = 0
+        self.stale_results = 0
+        self._next_frame_id = 0
+        self._last_delivered_id = -1
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Returns a slot the Eye may overwrite, or None if every slot is in flight.
+        When no slot is free, the oldest frame still waiting for submission is dropped.
+        """
+        with self._lock:
+            free = [slot for slot in self.slots if slot.state == FREE]
+            if free:
+                return free[0]
+            pending = [slot for slot in self.slots if slot.state == PENDING]
+            if not pending:
+                return None
+            oldest = min(pending, key=lambda slot: slot.frame_id)
+            oldest.state = FREE
+            self.dropped_frames += 1
+            return oldest
+
+    def publish(self, slot, capture_time):
+        """Marks a freshly written slot as ready for analysis and assigns its frame ID."""
+        with self._lock:
+            slot.frame_id = self._next_frame_id
+            slot.capture_time = capture_time
+            slot.state = PENDING
+            self._next_frame_id += 1
+            return slot.frame_id
+
+    def next_submission(self):
+        """Returns the oldest pending slot (now in flight) if the in-flight limit allows it."""
+        with self._lock:
+            if sum(slot.state == IN_FLIGHT for slot in self.slots) >= self.max_in_flight:
+                return None
+            pending = [slot for slot in self.slots if slot.state == PENDING]
+            if not pending:
+                return None
+            slot = min(pending, key=lambda slot: slot.frame_id)
+            slot.state = IN_FLIGHT
+            return slot
+
+    def release(self, slot):
+        """Returns an analyzed slot to the ring."""
+        with self._lock:
+            slot.state = FREE
+
+    def mark_delivered(self, frame_id):
+        """
+        Records that results for `frame_id` arrived. Returns False if a newer frame
+        was already delivered, in which case the caller should discard the results.
+        """
+        with self._lock:
+            if frame_id <= self._last_delivered_id:
+                self.stale_results += 1
+                return False
+            self._last_delivered_id = frame_id
+            return True
+
+    def close(self):
+        for slot in self.slots: slot.close()
+        self.slots = []
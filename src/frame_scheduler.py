@@ -0,0 +1,72 @@
+import collections
+import threading
+
+# --- Round-Robin Frame Scheduler (between "The Eyes" and "The Brain") ---
+# With several target windows, every window has its own Eye but they all share
+# one analysis pool. Submitting straight to the pool is first come, first served,
+# so a window that captures faster would crowd the others out. Frames are queued
+# per window instead, and the pool receives them in round-robin order with a cap
+# on the frames being analyzed at once.
+
+class RoundRobinScheduler:
+    """
+    Fair admission of frames from several windows into one analysis pool.
+
+    Args:
+        capacity (int): Max frames (from all windows) being analyzed at once.
+    """
+
+    def __init__(self, capacity=2):
+        self.capacity = max(1, capacity)
+        self._queues = {}  # key -> deque of pending submissions
+        self._last_turn = {}  # key -> dispatch number of the key's last served frame
+        self._turns = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def submit(self, key, start, callback, error_callback):
+        """
+        Queues one frame of window `key`. `start(callback, error_callback)` is
+        called once it is the window's turn and must hand the frame to the pool;
+        the wrapped callbacks free its place when the analysis finishes.
+        """
+        with self._lock:
+            self._queues.setdefault(key, collections.deque()).append((start, callback, error_callback))
+        self._dispatch()
+
+    def cancel(self, key):
+        """Drops the frames of `key` that are still waiting for their turn."""
+        with self._lock:
+            self._queues.pop(key, None)
+            self._last_turn.pop(key, None)
+
+    def pending(self, key=None):
+        with self._lock:
+            if key is not None: return len(self._queues.get(key, ()))
+            return sum(len(queue) for queue in self._queues.values())
+
+    def _finished(self, callback, result):
+        with self._lock:
+            self._in_flight -= 1
+        try:
+            callback(result)
+        finally:
+            self._dispatch()
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._in_flight >= self.capacity: return
+                waiting = [key for key, queue in self._queues.items() if queue]
+                if not waiting: return
+                # The window served longest ago goes next; windows never served yet go first, in arrival order
+                key = min(waiting, key=lambda key: self._last_turn.get(key, -1))
+                start, callback, error_callback = self._queues[key].popleft()
+                self._turns += 1
+                self._last_turn[key] = self._turns
+                self._in_flight += 1
+            try:
+                start(lambda result, callback=callback: self._finished(callback, result),
+                      lambda error, error_callback=error_callback: self._finished(error_callback, error))
+            except Exception as e:
+                self._finished(error_callback, e)
@@ -0,0 +1,271 @@
+import abc
+import os
+import time
+import numpy as np
+
+FRAME_CHANNELS = 4
+
+# --- Frame Sources (for "The Eye") ---
+# CaptureWorker pulls frames from a FrameSource instead of calling mss directly,
+# so the pipeline can also run on generated or pre-recorded frames: headless,
+# reproducible, and (for replays) faster than real time.
+
+class FrameSource(abc.ABC):
+    """
+    Base class for everything the Eye can capture from.
+
+    Frames are (height, width, 4) uint8 arrays in mss's native BGRA layout, so a
+    capture can be copied into a shared-memory slot as-is. `grab_into` writes the
+    next frame straight into a caller-provided buffer (a shared-memory slot) and
+    returns its capture timestamp (`time.perf_counter()`), or None once the source
+    is exhausted.
+    """
+    shape = None
+    channel_order = "BGRA"
+    origin = (0, 0)  # (x, y) of the frame inside the target window
+    end_message = "Frame source exhausted."
+
+    def open(self): pass
+    def close(self): pass
+    def is_alive(self): return True
+
+    @abc.abstractmethod
+    def grab_into(self, out):
+        """Writes the next frame into `out` and returns its capture time, or None."""
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class LiveWindowSource(FrameSource):
+    """
+    Captures a `pygetwindow` window with mss.
+
+    Args:
+        window: The target window.
+        region (tuple): Optional (x, y, width, height) inside the window to capture
+            instead of the whole window, e.g. a region of interest's bounding box.
+    """
+    end_message = "Target window is closed or invalid."
+
+    def __init__(self, window, region=None):
+        self.window = window
+        self.region = region or (0, 0, window.width, window.height)
+        self.origin = self.region[:2]
+        self.shape = (self.region[3], self.region[2], FRAME_CHANNELS)
+        self._sct = None
+
+    def open(self):
+        import mss  # Only needed for live capture
+        self._sct = mss.mss()
+
+    def close(self):
+        if self._sct: self._sct.close(); self._sct = None
+
+    def is_alive(self):
+        return bool(self.window and self.window.isActive)
+
+    def grab_into(self, out):
+        x, y, width, height = self.region
+        monitor = {"top": self.window.top + y, "left": self.window.left + x, "width": width, "height": height}
+        capture_time = time.perf_counter()
+        sct_img = self._sct.grab(monitor)
+        # mss already holds the pixels as packed BGRA: one straight memcpy into the slot
+        np.copyto(out.reshape(-1), np.frombuffer(sct_img.raw, dtype=np.uint8))
+        return capture_time
+
+class SyntheticSource(FrameSource):
+    """
+    Generates frames with square targets drifting over a noisy background.
+
+    Args:
+        width (int), height (int): Frame size.
+        colors (list): Hex colors the targets are drawn in (cycled).
+        targets (int): Number of targets per frame.
+        target_size (int): Side length of each target, in pixels.
+        speed (float): Max target movement per frame, in pixels.
+        frames (int): Frames to produce before the source is exhausted (None = endless).
+        seed (int): Random seed, so runs are reproducible.
+        spread (float): Fraction of the width and height (from the top-left) the
+            targets stay in; below 1 they cluster in one part of the frame.
+    """
+
+    def __init__(self, width, height, colors, targets=20, target_size=12, speed=2.0, frames=None, seed=0, spread=1.0):
+        self.shape = (height, width, FRAME_CHANNELS)
+        self.target_size = target_size
+        self.frames = frames
+        self._rng = np.random.default_rng(seed)
+        self._background = self._rng.integers(40, 80, size=self.shape, dtype=np.uint8)
+        self._background[..., 3] = 255
+        # Hex colors -> BGRA pixels
+        self._colors = np.array([[int(c[i:i+2], 16) for i in (5, 3, 1)] + [255] for c in colors] or [[0, 0, 255, 255]], dtype=np.uint8)
+        limits = np.array([width * spread - target_size, height * spread - target_size], dtype=np.float64).clip(min=0)
+        self._limits = limits
+        self._positions = self._rng.uniform(0, 1, size=(targets, 2)) * limits
+        self._velocities = self._rng.uniform(-speed, speed, size=(targets, 2))
+        self._count = 0
+
+    def is_alive(self):
+        return self.frames is None or self._count < self.frames
+
+    def grab_into(self, out):
+        if not self.is_alive():
+            return None
+        capture_time = time.perf_counter()
+        np.copyto(out, self._background)
+        for i, (x, y) in enumerate(self._positions.astype(int)):
+            out[y:y + self.target_size, x:x + self.target_size] = self._colors[i % len(self._colors)]
+        # Bounce the targets off the frame edges
+        self._positions += self._velocities
+        out_of_bounds = (self._positions < 0) | (self._positions > self._limits)
+        self._velocities[out_of_bounds] *= -1
+        self._positions = self._positions.clip(0, self._limits)
+        self._count += 1
+        return capture_time
+
+# --- On-Disk Recording ---
+# Layout: a 64-byte header, then `capacity` float64 timestamps, then `capacity`
+# raw frames. The file is memory-mapped, so recording is a single memcpy per frame.
+
+_MAGIC = b"APXFRM01"
+_HEADER = np.dtype([("magic", "S8"), ("height", "<u4"), ("width", "<u4"), ("channels", "<u4"),
+                    ("capacity", "<u4"), ("count", "<u4")])
+_HEADER_BYTES = 64
+
+def _recording_layout(header):
+    shape = (int(header["height"]), int(header["width"]), int(header["channels"]))
+    capacity = int(header["capacity"])
+    frames_offset = _HEADER_BYTES + 8 * capacity
+    frames_offset += -frames_offset % 64  # Keep frames cache-line aligned
+    return shape, capacity, frames_offset
+
+class FrameRecorder:
+    """
+    Writes frames and their capture timestamps to a memory-mapped recording file.
+
+    Args:
+        path (str): Recording file to create (overwritten if it exists).
+        shape (tuple): Frame shape, (height, width, channels).
+        max_frames (int): Capacity; frames beyond it are not recorded.
+    """
+
+    def __init__(self, path, shape, max_frames=600):
+        header = np.zeros((), dtype=_HEADER)
+        header["magic"], header["capacity"] = _MAGIC, max_frames
+        header["height"], header["width"], header["channels"] = shape
+        self.shape, self.capacity, frames_offset = _recording_layout(header)
+        size = frames_offset + max_frames * int(np.prod(self.shape))
+        with open(path, "wb") as f:
+            f.truncate(size)
+        self._file = np.memmap(path, dtype=np.uint8, mode="r+", shape=(size,))
+        self._header = self._file[:_HEADER.itemsize].view(_HEADER).reshape(())
+        self._header[...] = header
+        self._timestamps = self._file[_HEADER_BYTES:_HEADER_BYTES + 8 * max_frames].view("<f8")
+        self._frames = self._file[frames_offset:].reshape((max_frames,) + self.shape)
+        self.count = 0
+
+    def record(self, frame, timestamp):
+        """Appends one frame. Returns False once the recording is full."""
+        if self.count >= self.capacity:
+            return False
+        self._frames[self.count] = frame
+        self._timestamps[self.count] = timestamp
+        self.count += 1
+        self._header["count"] = self.count
+        return True
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            self._file = self._header = self._timestamps = self._frames = None
+
+class RecordingSource(FrameSource):
+    """Wraps another source and records every frame it produces."""
+
+    def __init__(self, source, path, max_frames=600):
+        self.source = source
+        self.shape = source.shape
+        self.path = path
+        self.max_frames = max_frames
+        self.recorder = None
+
+    def open(self):
+        self.source.open()
+        self.recorder = FrameRecorder(self.path, self.shape, self.max_frames)
+
+    def close(self):
+        self.source.close()
+        if self.recorder: self.recorder.close()
+
+    @property
+    def origin(self):
+        return self.source.origin
+
+    def is_alive(self):
+        return self.source.is_alive()
+
+    @property
+    def end_message(self):
+        return self.source.end_message
+
+    @property
+    def channel_order(self):
+        return self.source.channel_order
+
+    def grab_into(self, out):
+        capture_time = self.source.grab_into(out)
+        if capture_time is not None:
+            self.recorder.record(out, capture_time)
+        return capture_time
+
+class ReplaySource(FrameSource):
+    """
+    Plays back a recording made by FrameRecorder.
+
+    Args:
+        path (str): Recording file.
+        speed (float): Playback speed relative to the recorded timing (2.0 = twice
+            as fast). None replays frames as fast as the pipeline consumes them.
+        loop (bool): Restart from the first frame when the recording ends.
+    """
+
+    def __init__(self, path, speed=None, loop=False):
+        if os.path.getsize(path) < _HEADER_BYTES:
+            raise ValueError(f"{path} is not a frame recording")
+        self._file = np.memmap(path, dtype=np.uint8, mode="r")
+        header = self._file[:_HEADER.itemsize].view(_HEADER).reshape(())
+        if bytes(header["magic"]) != _MAGIC:
+            raise ValueError(f"{path} is not a frame recording")
+        self.shape, capacity, frames_offset = _recording_layout(header)
+        self.count = int(header["count"])
+        self._timestamps = self._file[_HEADER_BYTES:_HEADER_BYTES + 8 * capacity].view("<f8")[:self.count]
+        self._frames = self._file[frames_offset:frames_offset + self.count * int(np.prod(self.shape))].reshape((self.count,) + self.shape)
+        self.speed = speed
+        self.loop = loop
+        self._index = 0
+        self._start = None
+
+    def is_alive(self):
+        return self.count > 0 and (self.loop or self._index < self.count)
+
+    def grab_into(self, out):
+        if not self.is_alive():
+            return None
+        if self._index == self.count:
+            self._index, self._start = 0, None
+        if self.speed:
+            # Wait until this frame's (scaled) offset from the first frame has elapsed
+            if self._start is None:
+                self._start = time.perf_counter()
+            due = self._start + (self._timestamps[self._index] - self._timestamps[0]) / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+        np.copyto(out, self._frames[self._index])
+        self._index += 1
+        return time.perf_counter()
+
+    def close(self):
+        self._file = self._timestamps = self._frames = None
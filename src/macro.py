@@ -0,0 +1,132 @@
+import time
+
+# --- Macro Timelines (for Multi-Position mode) ---
+# A timeline is a list of steps, each with its own delay, repeat count, mouse
+# button and hold time. Steps are recorded with the `P` hotkey using the real
+# time between presses, and saved as JSON:
+#   {"version": 1, "loop_delay": 0.5,
+#    "steps": [{"x": 100, "y": 200, "delay": 0.0, "repeat": 1, "interval": 0.05, "button": "left", "hold": 0.0}, ...]}
+# Bare [[x, y], ...] position lists saved by older versions still load.
+# `Timeline.events()` flattens the steps into timed button events, which
+# `fast_input.compile_timeline` turns into one preallocated SendInput array.
+
+TIMELINE_VERSION = 1
+BUTTONS = ("left", "right", "middle")
+DEFAULT_REPEAT_INTERVAL = 0.05  # Seconds between the starts of a step's repeats
+
+class MacroStep:
+    """
+    One timeline step.
+
+    Args:
+        x, y (int): Screen position.
+        delay (float): Seconds to wait after the previous step finished.
+        repeat (int): Number of clicks at this position.
+        interval (float): Seconds between the starts of repeated clicks.
+        button (str): 'left', 'right' or 'middle'.
+        hold (float): Seconds between button down and up (0 = one atomic click).
+
+    Raises:
+        ValueError: On an unknown button, a repeat below 1 or negative times.
+    """
+    __slots__ = ("x", "y", "delay", "repeat", "interval", "button", "hold")
+
+    def __init__(self, x, y, delay=0.0, repeat=1, interval=DEFAULT_REPEAT_INTERVAL, button="left", hold=0.0):
+        if button not in BUTTONS:
+            raise ValueError(f"Unknown mouse button: {button}")
+        if repeat < 1 or min(delay, interval, hold) < 0:
+            raise ValueError("Step repeat must be at least 1 and its times must not be negative")
+        self.x, self.y = int(x), int(y)
+        self.delay, self.repeat, self.interval = float(delay), int(repeat), float(interval)
+        self.button, self.hold = button, float(hold)
+
+    @property
+    def duration(self):
+        """Seconds from the step's first button down to its last button up."""
+        return (self.repeat - 1) * max(self.interval, self.hold) + self.hold
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+class Timeline:
+    """
+    An ordered list of MacroSteps played in a loop.
+
+    Args:
+        steps (list): MacroStep instances.
+        loop_delay (float): Seconds between the end of the last step and the
+            start of the next loop (the first step's own delay is added on top).
+    """
+
+    def __init__(self, steps=(), loop_delay=DEFAULT_REPEAT_INTERVAL):
+        self.steps = list(steps)
+        self.loop_delay = float(loop_delay)
+
+    @classmethod
+    def from_positions(cls, positions, interval):
+        """An evenly spaced timeline, equivalent to the classic position loop."""
+        return cls([MacroStep(x, y, delay=interval if i else 0.0) for i, (x, y) in enumerate(positions)], loop_delay=interval)
+
+    @classmethod
+    def from_data(cls, data, interval=DEFAULT_REPEAT_INTERVAL):
+        """Loads a saved timeline, or a bare list of positions spaced by `interval`."""
+        if isinstance(data, list):
+            return cls.from_positions(data, interval)
+        return cls([MacroStep.from_dict(step) for step in data.get("steps", [])], data.get("loop_delay", interval))
+
+    def to_data(self):
+        return {"version": TIMELINE_VERSION, "loop_delay": self.loop_delay, "steps": [step.to_dict() for step in self.steps]}
+
+    @property
+    def positions(self):
+        return [(step.x, step.y) for step in self.steps]
+
+    def events(self):
+        """
+        Flattens the steps into button events.
+
+        Returns:
+            (events, duration): `events` is a time-sorted list of
+            (offset_seconds, x, y, button, phase) with phase 'click' (down and up
+            at once), 'down' or 'up'; `duration` is the length of one loop.
+        """
+        events, t = [], 0.0
+        for step in self.steps:
+            t += step.delay
+            spacing = max(step.interval, step.hold)
+            for r in range(step.repeat):
+                start = t + r * spacing
+                if step.hold > 0:
+                    events.append((start, step.x, step.y, step.button, "down"))
+                    events.append((start + step.hold, step.x, step.y, step.button, "up"))
+                else:
+                    events.append((start, step.x, step.y, step.button, "click"))
+            t += step.duration
+        events.sort(key=lambda event: event[0])
+        return events, t + self.loop_delay
+
+    def __len__(self):
+        return len(self.steps)
+
+class MacroRecorder:
+    """Turns hotkey presses into timeline steps, keeping the real time between presses."""
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self._last_press = None
+
+    def record(self, x, y, button="left"):
+        now = time.perf_counter()
+        # The first step of a recording keeps no lead-in; the loop delay covers the wrap-around
+        delay = 0.0 if self._last_press is None or not self.timeline.steps else now - self._last_press
+        self._last_press = now
+        step = MacroStep(x, y, delay=delay, button=button)
+        self.timeline.steps.append(step)
+        return step
+
+    def reset(self):
+        self._last_press = None
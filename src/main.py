@@ -1,15 +1,8 @@
 import sys
-import pynput.keyboard
-import threading
 import time
-import json
 import psutil
+import pynput.keyboard
 import pygetwindow as gw
-import numpy as np
-import mss
-import queue
-import uuid
-from multiprocessing import Pool, cpu_count, shared_memory
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
@@ -20,198 +13,52 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QCoreApplication
 from PyQt6.QtGui import QColor, QPalette
 
-# Optimized input module (requires fast_input.py in the same directory)
-from fast_input import fast_click, fast_move_and_click, fast_background_click
-
-# --- Multiprocessing Worker Function (for "The Brain") ---
-
-def _filter_points_by_distance_worker(points, min_distance):
-    """Filters a list of (x, y) tuples to ensure they are min_distance apart."""
-    filtered_points = []
-    while points:
-        px, py = points.pop(0)
-        filtered_points.append((px, py))
-        points = [(x, y) for x, y in points if abs(x - px) >= min_distance or abs(y - py) >= min_distance]
-    return filtered_points
-
-def process_chunk_shared_memory(task):
-    """
-    Multiprocessing worker that uses shared memory to analyze an image chunk.
-    This "zero-copy" approach is highly efficient.
-    """
-    (shm_name, full_shape, dtype,
-     chunk_start_y, chunk_start_x, chunk_height, chunk_width,
-     colors, min_check_pixel, tolerance) = task
-
-    existing_shm = None
-    try:
-        # Connect to shared memory and create a zero-copy NumPy view
-        existing_shm = shared_memory.SharedMemory(name=shm_name)
-        full_image = np.ndarray(full_shape, dtype=dtype, buffer=existing_shm.buf)
-        
-        # Get the specific chunk this worker is responsible for
-        chunk_end_y = chunk_start_y + chunk_height
-        chunk_end_x = chunk_start_x + chunk_width
-        chunk = full_image[chunk_start_y:chunk_end_y, chunk_start_x:chunk_end_x]
-
-        # Perform color matching
-        all_match_points = []
-        target_color_nps = [np.array([int(color[i:i+2], 16) for i in (1, 3, 5)]) for color in colors]
-
-        for target_color in target_color_nps:
-            matches = np.all(np.abs(chunk - target_color) <= tolerance, axis=-1)
-            if np.any(matches):
-                y_local, x_local = np.where(matches)
-                y_global = y_local + chunk_start_y
-                x_global = x_local + chunk_start_x
-                all_match_points.extend(zip(x_global.tolist(), y_global.tolist()))
-
-        # Filter points for minimum distance before returning
-        if all_match_points:
-            return _filter_points_by_distance_worker(all_match_points, min_check_pixel)
-        
-        return []
-
-    finally:
-        # CRITICAL: Always close the shared memory handle in the worker process
-        if existing_shm:
-            existing_shm.close()
+# The Qt-free engine runs every mode; this window is just a front end over it
+# (see cli.py for the headless one)
+from engine import AutoClickerEngine
+from capture_governor import DEFAULT_MIN_FPS, DEFAULT_MAX_FPS
+from metrics import MetricsExporter
 
 # --- PyQt Worker Threads ---
 
-class ClickWorker(QThread):
-    """Optimized thread for Multi-Position and Dynamic clicking using direct input."""
-    click_signal = pyqtSignal(int)
-    
-    def __init__(self, mode, click_interval_sec, positions):
-        super().__init__()
-        self._is_running = True
-        self.mode = mode
-        self.interval = click_interval_sec
-        self.positions = positions
-
-    def stop(self):
-        self._is_running = False
-        self.wait()
-
-    def run(self):
-        clicks_since_last_update = 0
-        last_update_time = time.time()
-
-        while self._is_running:
-            if self.mode == "dynamic":
-                fast_click()
-                clicks_since_last_update += 1
-            elif self.mode == "multi-position":
-                if not self.positions:
-                    time.sleep(0.1)
-                    continue
-                # Perform a high-speed "burst" of clicks before sleeping
-                for pos in self.positions:
-                    if not self._is_running: break
-                    fast_move_and_click(pos[0], pos[1])
-                    clicks_since_last_update += 1
-            
-            # Batch GUI updates to reduce CPU load
-            current_time = time.time()
-            if current_time - last_update_time > 0.2:
-                if clicks_since_last_update > 0:
-                    self.click_signal.emit(clicks_since_last_update)
-                    clicks_since_last_update = 0
-                last_update_time = current_time
-            
-            time.sleep(self.interval)
-
-# --- New Decoupled Workers for Intelligent Mode ---
-
-class ClickActionWorker(QThread):
-    """The 'Hand': Pulls coordinates from a queue and executes background clicks."""
-    click_executed_signal = pyqtSignal()
-
-    def __init__(self, target_queue, window_handle):
-        super().__init__()
-        self._is_running = True
-        self.target_queue = target_queue
-        self.hwnd = window_handle
-
-    def stop(self):
-        self._is_running = False
-        self.target_queue.put(None) # Sentinel to unblock .get()
-        self.wait()
-
-    def run(self):
-        while self._is_running:
-            coords = self.target_queue.get()
-            if coords is None or not self._is_running: break
-            fast_background_click(self.hwnd, coords[0], coords[1])
-            self.click_executed_signal.emit()
-
-class CaptureWorker(QThread):
-    """The 'Eye': Captures screenshots with MSS and submits them to the 'Brain' for analysis."""
-    error_signal = pyqtSignal(str)
-
-    def __init__(self, main_app_instance):
-        super().__init__()
-        self._is_running = True
-        self.app = main_app_instance
-
-    def stop(self):
-        self._is_running = False
-        self.wait()
-    
-    def run(self):
-        with mss.mss() as sct:
-            while self._is_running:
-                try:
-                    if not self.app.window or not self.app.window.isActive:
-                        self.error_signal.emit("Target window is closed or invalid. Stopping.")
-                        break
-
-                    monitor = {"top": self.app.window.top, "left": self.app.window.left, "width": self.app.window.width, "height": self.app.window.height}
-                    sct_img = sct.grab(monitor)
-                    
-                    # Copy screenshot data into the shared memory buffer
-                    screenshot_np = np.array(sct_img, dtype=np.uint8)[:, :, :3]
-                    shm_array = np.ndarray(self.app.shm_shape, dtype=self.app.shm_dtype, buffer=self.app.shm.buf)
-                    np.copyto(shm_array, screenshot_np)
-
-                    # Create and submit tasks to the processing pool without blocking
-                    chunks = self.app.split_screenshot_into_chunks(self.app.shm_shape)
-                    tasks = [
-                        (self.app.shm_name, self.app.shm_shape, self.app.shm_dtype,
-                         start_y, start_x, height, width,
-                         self.app.colors, self.app.min_check_pixel, 10) # 10 = tolerance
-                        for start_y, start_x, height, width in chunks
-                    ]
-                    self.app.pool.map_async(process_chunk_shared_memory, tasks, callback=self.app.handle_results)
-
-                except Exception as e:
-                    self.error_signal.emit(f"Capture error: {e}. Stopping.")
-                    break
-
 class PerformanceWorker(QThread):
-    performance_signal = pyqtSignal(int, float, float)
+    """Reports CPS and CPU once a second, and appends pipeline metrics to the export file if one is set."""
+    performance_signal = pyqtSignal(int, float, float, str)
     
     def __init__(self, app_instance):
         super().__init__()
         self._is_running = True
         self.app = app_instance
+        self.engine = app_instance.engine
         self.last_click_count = 0
         self.last_time = time.time()
+        # The exporter is only ever opened, written and closed on this thread
+        self.exporter = None
 
-    def stop(self): self._is_running = False; self.wait()
+    def stop(self): self._is_running = False; self.wait(); self._sync_exporter(None)
+
+    def _sync_exporter(self, path):
+        if self.exporter and self.exporter.path != path: self.exporter.close(); self.exporter = None
+        if path and not self.exporter: self.exporter = MetricsExporter(self.engine.metrics, path)
 
     def run(self):
         while self._is_running:
             time.sleep(1)
             current_time = time.time()
             if current_time - self.last_time >= 1:
-                current_click_count = self.app.click_count
+                current_click_count = self.engine.click_count
                 cps = current_click_count - self.last_click_count
-                position_count = self.app.get_position_count()
+                position_count = self.engine.get_position_count()
                 cps_per_position = cps / position_count if position_count > 0 else 0
                 cpu_usage = psutil.cpu_percent()
-                self.performance_signal.emit(cps, cps_per_position, cpu_usage)
+                try:
+                    self._sync_exporter(self.engine.metrics_path)
+                    if self.exporter: self.exporter.write()
+                except OSError as e:
+                    self.app.text_signal.emit(f"Metrics export failed: {e}. Export disabled."); self.engine.metrics_path = None
+                summary = self.engine.metrics.summary()
+                if len(self.engine.sessions) > 1: summary += "\n" + self.engine.window_summary()
+                self.performance_signal.emit(cps, cps_per_position, cpu_usage, summary)
                 self.last_click_count = current_click_count
                 self.last_time = current_time
 
@@ -219,30 +66,23 @@ class PerformanceWorker(QThread):
 
 class PointerAutoClicker(QMainWindow):
     text_signal = pyqtSignal(str)
+    worker_error_signal = pyqtSignal(str)
     
     def __init__(self):
         super().__init__()
         self.setWindowTitle("ApexClick")
         self.setGeometry(100, 100, 960, 580)
 
-        # Core application state
-        self.pointer_positions = []; self.clicking = False; self.click_count = 0
-        self.mode = "multi-position"; self.window = None; self.colors = []
-        self.selected_color_index = None; self.min_check_pixel = 10; self.click_interval = 0.003
-        
-        # High-performance pipeline components
-        self.target_queue = queue.Queue(maxsize=2000)
-        self.num_cores = psutil.cpu_count(logical=False) or cpu_count()
-        self.pool = Pool(processes=self.num_cores)
-        self.shm = None; self.shm_name = None; self.shm_shape = None; self.shm_dtype = np.uint8
-        
-        # Worker thread references
-        self.click_worker = None; self.capture_worker = None; self.click_action_worker = None; self.performance_worker = None
+        # All settings and workers live in the engine; the window only edits and displays them
+        self.engine = AutoClickerEngine(on_message=self.text_signal.emit, on_error=self.worker_error_signal.emit)
+        self.selected_color_index = None
+        self.performance_worker = None
 
         self.setup_ui()
         self.start_global_hotkey_listener()
         self.start_performance_monitoring()
         self.text_signal.connect(self.update_text_box)
+        self.worker_error_signal.connect(self.on_worker_error)
         self.set_multi_position_mode()
 
     def setup_ui(self):
@@ -301,6 +141,9 @@ class PointerAutoClicker(QMainWindow):
         interval_frame.addWidget(QLabel("Autoclicker Interval (ms):"))
         self.interval_entry = QLineEdit("3")
         interval_frame.addWidget(self.interval_entry)
+        interval_frame.addWidget(QLabel("Target CPS:"))
+        self.cps_entry = QLineEdit("0"); self.cps_entry.setFixedWidth(60); self.cps_entry.setToolTip("0 = use the interval")
+        interval_frame.addWidget(self.cps_entry)
         set_interval_button = QPushButton("Set Interval")
         set_interval_button.clicked.connect(lambda: self.set_interval("multi-position"))
         interval_frame.addWidget(set_interval_button)
@@ -309,7 +152,9 @@ class PointerAutoClicker(QMainWindow):
         self.save_button = QPushButton("Save Positions"); self.save_button.clicked.connect(self.save_positions)
         self.load_button = QPushButton("Load Positions"); self.load_button.clicked.connect(self.load_positions)
         self.clear_button = QPushButton("Clear Positions"); self.clear_button.clicked.connect(self.clear_positions)
-        button_frame.addWidget(self.save_button, 0, 0); button_frame.addWidget(self.load_button, 0, 1); button_frame.addWidget(self.clear_button, 1, 0, 1, 2)
+        self.timed_button = QPushButton("Timed Playback: Off"); self.timed_button.clicked.connect(self.toggle_timed_playback)
+        self.timed_button.setToolTip("On: replay the recorded delays between 'P' presses (and per-step repeat, button and hold from a saved timeline)")
+        button_frame.addWidget(self.save_button, 0, 0); button_frame.addWidget(self.load_button, 0, 1); button_frame.addWidget(self.clear_button, 1, 0); button_frame.addWidget(self.timed_button, 1, 1)
         layout.addLayout(button_frame)
         self.autoclick_button_multi = QPushButton("Start/Stop Autoclicker (`)"); self.autoclick_button_multi.clicked.connect(self.toggle_autoclicker)
         layout.addWidget(self.autoclick_button_multi)
@@ -323,6 +168,9 @@ class PointerAutoClicker(QMainWindow):
         interval_frame.addWidget(QLabel("Autoclicker Interval (ms):"))
         self.dynamic_interval_entry = QLineEdit("3")
         interval_frame.addWidget(self.dynamic_interval_entry)
+        interval_frame.addWidget(QLabel("Target CPS:"))
+        self.dynamic_cps_entry = QLineEdit("0"); self.dynamic_cps_entry.setFixedWidth(60); self.dynamic_cps_entry.setToolTip("0 = use the interval")
+        interval_frame.addWidget(self.dynamic_cps_entry)
         dynamic_set_interval_button = QPushButton("Set Interval")
         dynamic_set_interval_button.clicked.connect(lambda: self.set_interval("dynamic"))
         interval_frame.addWidget(dynamic_set_interval_button)
@@ -358,16 +206,40 @@ class PointerAutoClicker(QMainWindow):
         set_min_check_pixel_button = QPushButton("Set"); set_min_check_pixel_button.clicked.connect(self.set_min_pixel)
         min_check_frame.addWidget(set_min_check_pixel_button); min_check_frame.addStretch(1)
         right_layout.addLayout(min_check_frame)
+        roi_frame = QHBoxLayout()
+        roi_frame.addWidget(QLabel("ROI (x,y,w,h; ...):"))
+        self.roi_entry = QLineEdit(""); self.roi_entry.setPlaceholderText("Whole window")
+        roi_frame.addWidget(self.roi_entry)
+        set_roi_button = QPushButton("Set"); set_roi_button.clicked.connect(self.set_roi)
+        roi_frame.addWidget(set_roi_button)
+        right_layout.addLayout(roi_frame)
+        fps_frame = QHBoxLayout()
+        fps_frame.addWidget(QLabel("Capture FPS (idle-max):"))
+        self.fps_entry = QLineEdit(f"{DEFAULT_MIN_FPS:g}-{DEFAULT_MAX_FPS:g}"); self.fps_entry.setFixedWidth(80)
+        fps_frame.addWidget(self.fps_entry)
+        set_fps_button = QPushButton("Set"); set_fps_button.clicked.connect(self.set_capture_fps)
+        fps_frame.addWidget(set_fps_button); fps_frame.addStretch(1)
+        right_layout.addLayout(fps_frame)
         window_frame = QHBoxLayout()
         select_window_button = QPushButton("Select Window (O)"); select_window_button.clicked.connect(self.select_window)
+        add_window_button = QPushButton("Add Window"); add_window_button.clicked.connect(self.add_window)
         clear_window_button = QPushButton("Clear Window"); clear_window_button.clicked.connect(self.clear_window)
-        window_frame.addWidget(select_window_button); window_frame.addWidget(clear_window_button)
+        window_frame.addWidget(select_window_button); window_frame.addWidget(add_window_button); window_frame.addWidget(clear_window_button)
         right_layout.addLayout(window_frame)
         save_load_frame = QHBoxLayout()
         save_colors_button = QPushButton("Save Color Data"); save_colors_button.clicked.connect(self.save_colors)
         load_colors_button = QPushButton("Load Color Data"); load_colors_button.clicked.connect(self.load_colors)
         save_load_frame.addWidget(save_colors_button); save_load_frame.addWidget(load_colors_button)
         right_layout.addLayout(save_load_frame)
+        self.pyramid_button = QPushButton("Pyramid Search: Off"); self.pyramid_button.clicked.connect(self.toggle_pyramid_search)
+        self.pyramid_button.setToolTip("Samples every MinCheckPixel / 2 pixels first: targets narrower than that can be missed. Set min_target_size in the saved color data to lower it.")
+        right_layout.addWidget(self.pyramid_button)
+        self.blob_button = QPushButton("Blob Detection: Off"); self.blob_button.clicked.connect(self.toggle_blob_detection)
+        right_layout.addWidget(self.blob_button)
+        self.record_button = QPushButton("Record Frames: Off"); self.record_button.clicked.connect(self.toggle_recording)
+        right_layout.addWidget(self.record_button)
+        self.metrics_button = QPushButton("Export Metrics: Off"); self.metrics_button.clicked.connect(self.toggle_metrics_export)
+        right_layout.addWidget(self.metrics_button)
         self.autoclick_button_intelligent = QPushButton("Start/Stop Autoclicker (`)"); self.autoclick_button_intelligent.clicked.connect(self.toggle_autoclicker)
         right_layout.addWidget(self.autoclick_button_intelligent)
         right_layout.addStretch(1)
@@ -379,143 +251,131 @@ class PointerAutoClicker(QMainWindow):
         self.performance_worker.performance_signal.connect(self._update_performance_ui)
         self.performance_worker.start()
 
-    def _update_performance_ui(self, cps, cps_per_position, cpu_usage):
+    def _update_performance_ui(self, cps, cps_per_position, cpu_usage, latency_summary):
         self.performance_label.setText(f"Performance: CPS: {cps} | CPS/Position: {cps_per_position:.2f} | CPU: {cpu_usage:.2f}%")
+        self.performance_label.setToolTip(latency_summary)
         
     def closeEvent(self, event):
-        self.stop_autoclicker_worker()
         if self.performance_worker: self.performance_worker.stop()
         if hasattr(self, 'keyboard_listener'): self.keyboard_listener.stop()
-        self._cleanup_shared_memory()
-        if self.pool: self.pool.close(); self.pool.join()
+        self.engine.close()
         event.accept()
 
-    def _create_shared_memory(self, shape, dtype=np.uint8):
-        if hasattr(self, 'shm') and self.shm: self._cleanup_shared_memory()
-        self.shm_shape = shape; self.shm_dtype = dtype
-        required_bytes = int(np.prod(shape) * np.dtype(dtype).itemsize)
-        self.shm_name = f"autoclicker_screenshot_{uuid.uuid4()}"
-        try:
-            self.shm = shared_memory.SharedMemory(name=self.shm_name, create=True, size=required_bytes)
-        except FileExistsError:
-            temp_shm = shared_memory.SharedMemory(name=self.shm_name, create=False)
-            temp_shm.close(); temp_shm.unlink()
-            self.shm = shared_memory.SharedMemory(name=self.shm_name, create=True, size=required_bytes)
-
-    def _cleanup_shared_memory(self):
-        if hasattr(self, 'shm') and self.shm:
-            try:
-                self.shm.close()
-                self.shm.unlink()
-            except FileNotFoundError: pass
-            finally: self.shm = None; self.shm_name = None
-
-    def handle_results(self, results):
-        if not self.clicking: return
-        for result_chunk in results:
-            for coords in result_chunk:
-                x_local = coords[0] - self.window.left
-                y_local = coords[1] - self.window.top
-                if not self.target_queue.full():
-                    self.target_queue.put((x_local, y_local))
-
-    def split_screenshot_into_chunks(self, shape):
-        height, width, _ = shape
-        chunks = []
-        rows = int(np.ceil(np.sqrt(self.num_cores)))
-        cols = int(np.ceil(self.num_cores / rows))
-        chunk_height, chunk_width = height // rows, width // cols
-        for row in range(rows):
-            for col in range(cols):
-                start_y = row * chunk_height
-                h = (height - start_y) if row == rows - 1 else chunk_height
-                start_x = col * chunk_width
-                w = (width - start_x) if col == cols - 1 else chunk_width
-                chunks.append((start_y, start_x, h, w))
-        return chunks
-
-    def start_autoclicker_worker(self):
-        self.stop_autoclicker_worker()
-        if self.mode in ["dynamic", "multi-position"]:
-            self.click_worker = ClickWorker(self.mode, self.click_interval, self.pointer_positions)
-            self.click_worker.click_signal.connect(self._update_click_count)
-            self.click_worker.start()
-        elif self.mode == "intelligent":
-            if not self.window or not hasattr(self.window, '_hWnd'):
-                QMessageBox.warning(self, "No Window", "Please select a valid target window."); self.clicking = False; return
-            while not self.target_queue.empty(): self.target_queue.get()
-            self._create_shared_memory(shape=(self.window.height, self.window.width, 3))
-            self.click_action_worker = ClickActionWorker(self.target_queue, self.window._hWnd)
-            self.click_action_worker.click_executed_signal.connect(lambda: self._update_click_count(1))
-            self.click_action_worker.start()
-            self.capture_worker = CaptureWorker(self)
-            self.capture_worker.error_signal.connect(self.on_worker_error)
-            self.capture_worker.start()
-
-    def stop_autoclicker_worker(self):
-        if self.click_worker and self.click_worker.isRunning(): self.click_worker.stop()
-        if self.capture_worker and self.capture_worker.isRunning(): self.capture_worker.stop()
-        if self.click_action_worker and self.click_action_worker.isRunning(): self.click_action_worker.stop()
-        self._cleanup_shared_memory()
-
     def on_worker_error(self, message):
         self.text_signal.emit(message)
-        if self.clicking: self.toggle_autoclicker()
+        if self.engine.clicking: self.toggle_autoclicker()
 
     def toggle_autoclicker(self):
-        if self.clicking:
-            self.stop_autoclicker_worker()
-            self.clicking = False
+        if self.engine.clicking:
+            self.engine.stop()
             self.text_signal.emit("Autoclicker disabled.")
         else:
-            if self.mode == "multi-position" and not self.pointer_positions:
-                QMessageBox.warning(self, "No Positions", "No positions captured yet!"); return
-            if self.mode == "intelligent" and not self.colors:
-                QMessageBox.warning(self, "No Colors", "No target colors defined!"); return
-            self.clicking = True
+            try:
+                self.engine.start()
+            except ValueError as e:
+                QMessageBox.warning(self, "Cannot Start", str(e)); return
             self.text_signal.emit("Autoclicker enabled.")
-            self.start_autoclicker_worker()
 
-    def _update_click_count(self, clicks=1): self.click_count += clicks
-    def get_position_count(self): return len(self.pointer_positions) if self.mode == "multi-position" else (len(self.colors) if self.mode == "intelligent" else 1)
     def update_text_box(self, message): self.text_box.insertPlainText(message + "\n"); self.text_box.ensureCursorVisible()
-    def set_multi_position_mode(self): self.mode = "multi-position"; self.multi_position_frame.show(); self.dynamic_frame.hide(); self.intelligent_frame.hide(); self.resize(500, 500)
-    def set_dynamic_mode(self): self.mode = "dynamic"; self.multi_position_frame.hide(); self.dynamic_frame.show(); self.intelligent_frame.hide(); self.resize(500, 400)
-    def set_intelligent_mode(self): self.mode = "intelligent"; self.multi_position_frame.hide(); self.dynamic_frame.hide(); self.intelligent_frame.show(); self.resize(960, 580)
-    def add_color(self): color = QColorDialog.getColor(); self.colors.append(color.name().upper()) if color.isValid() else None; self.update_color_boxes()
-    def delete_color(self): self.colors.pop(self.selected_color_index) if self.selected_color_index is not None else None; self.selected_color_index = None; self.update_color_boxes()
+    def set_multi_position_mode(self): self.engine.mode = "multi-position"; self.multi_position_frame.show(); self.dynamic_frame.hide(); self.intelligent_frame.hide(); self.resize(500, 500)
+    def set_dynamic_mode(self): self.engine.mode = "dynamic"; self.multi_position_frame.hide(); self.dynamic_frame.show(); self.intelligent_frame.hide(); self.resize(500, 400)
+    def set_intelligent_mode(self): self.engine.mode = "intelligent"; self.multi_position_frame.hide(); self.dynamic_frame.hide(); self.intelligent_frame.show(); self.resize(960, 580)
+    def add_color(self): color = QColorDialog.getColor(); self.engine.colors.append(color.name().upper()) if color.isValid() else None; self.update_color_boxes(); self.engine.invalidate_tile_cache()
+    def delete_color(self): self.engine.colors.pop(self.selected_color_index) if self.selected_color_index is not None else None; self.selected_color_index = None; self.update_color_boxes(); self.engine.invalidate_tile_cache()
     def start_global_hotkey_listener(self):
         def on_press(key):
             try:
                 if key == pynput.keyboard.KeyCode.from_char('`'): QTimer.singleShot(0, self.toggle_autoclicker)
-                elif key == pynput.keyboard.KeyCode.from_char('p') and not self.clicking and self.mode == "multi-position": QTimer.singleShot(0, self.capture_position)
-                elif key == pynput.keyboard.KeyCode.from_char('o') and self.mode == "intelligent": QTimer.singleShot(0, self.select_window)
+                elif key == pynput.keyboard.KeyCode.from_char('p') and not self.engine.clicking and self.engine.mode == "multi-position": QTimer.singleShot(0, self.capture_position)
+                elif key == pynput.keyboard.KeyCode.from_char('o') and self.engine.mode == "intelligent": QTimer.singleShot(0, self.select_window)
             except Exception: pass
         self.keyboard_listener = pynput.keyboard.Listener(on_press=on_press); self.keyboard_listener.daemon = True; self.keyboard_listener.start()
-    def capture_position(self): x, y = pynput.mouse.Controller().position; self.pointer_positions.append((x, y)); self.text_signal.emit(f"Captured: ({x}, {y})")
-    def clear_positions(self): self.pointer_positions.clear(); self.text_signal.emit("Positions cleared.")
-    def select_window(self):
+    def capture_position(self): x, y = pynput.mouse.Controller().position; step = self.engine.capture_position(x, y); self.text_signal.emit(f"Captured: ({x}, {y}) after {step.delay * 1000:.0f} ms")
+    def clear_positions(self): self.engine.clear_positions(); self.text_signal.emit("Positions cleared.")
+    def toggle_timed_playback(self): self.engine.timed_playback = not self.engine.timed_playback; self._update_timed_button()
+    def _update_timed_button(self): self.timed_button.setText(f"Timed Playback: {'On' if self.engine.timed_playback else 'Off'}")
+    def _pick_active_window(self):
         self.setWindowState(self.windowState() | Qt.WindowState.WindowMinimized); QCoreApplication.processEvents(); time.sleep(0.5)
-        self.window = gw.getActiveWindow()
+        window = gw.getActiveWindow()
         self.setWindowState(self.windowState() & ~Qt.WindowState.WindowMinimized); self.activateWindow(); self.raise_()
-        if self.window: self.text_signal.emit(f"Window selected: {self.window.title}")
+        return window
+    def select_window(self):
+        self.engine.window = self._pick_active_window()
+        if self.engine.window: self.text_signal.emit(f"Window selected: {self.engine.window.title}")
         else: self.text_signal.emit("No active window detected.")
-    def clear_window(self): self.window = None; self.text_signal.emit("Window cleared.")
+    def add_window(self):
+        if not self.engine.window: self.select_window(); return
+        window = self._pick_active_window()
+        if not window: self.text_signal.emit("No active window detected."); return
+        self.engine.add_window(window); self.text_signal.emit(f"Window added: {window.title} ({1 + len(self.engine.extra_windows)} windows, same colors). Applies on the next start.")
+    def clear_window(self): self.engine.window = None; self.engine.extra_windows = []; self.text_signal.emit("Windows cleared.")
     def update_color_boxes(self):
         for i in reversed(range(self.color_boxes_layout.count())): self.color_boxes_layout.itemAt(i).widget().deleteLater()
-        for i, color in enumerate(self.colors):
+        for i, color in enumerate(self.engine.colors):
             color_box = QLabel(color); color_box.setAlignment(Qt.AlignmentFlag.AlignCenter)
             fg_color = "black" if (int(color[1:3], 16)*0.299 + int(color[3:5], 16)*0.587 + int(color[5:7], 16)*0.114) > 140 else "white"
             style = f"QLabel {{ background-color: {color}; color: {fg_color}; border: 1px solid #555; padding: 5px; }}"
             if i == self.selected_color_index: style += "QLabel { border: 2px solid yellow; }"
             color_box.setStyleSheet(style); color_box.mousePressEvent = lambda e, idx=i: self.select_color(idx); self.color_boxes_layout.addWidget(color_box)
     def select_color(self, index): self.selected_color_index = index; self.update_color_boxes()
-    def set_min_pixel(self): self.min_check_pixel = int(self.min_check_pixel_entry.text())
-    def save_positions(self): file_name, _ = QFileDialog.getSaveFileName(self, "Save Positions", "", "JSON Files (*.json)"); json.dump(self.pointer_positions, open(file_name, "w")) if file_name else None
-    def load_positions(self): file_name, _ = QFileDialog.getOpenFileName(self, "Load Positions", "", "JSON Files (*.json)"); self.pointer_positions = json.load(open(file_name, "r")) if file_name else None
-    def save_colors(self): file_name, _ = QFileDialog.getSaveFileName(self, "Save Colors", "", "JSON Files (*.json)"); json.dump({"colors_to_click": self.colors}, open(file_name, "w")) if file_name else None
-    def load_colors(self): file_name, _ = QFileDialog.getOpenFileName(self, "Load Colors", "", "JSON Files (*.json)"); self.colors = json.load(open(file_name, "r")).get("colors_to_click", []) if file_name else None; self.update_color_boxes()
-    def set_interval(self, mode): self.click_interval = float(self.interval_entry.text()) / 1000 if mode == "multi-position" else float(self.dynamic_interval_entry.text()) / 1000
+    def set_min_pixel(self): self.engine.min_check_pixel = int(self.min_check_pixel_entry.text()); self.engine.invalidate_tile_cache()
+    def save_positions(self): file_name, _ = QFileDialog.getSaveFileName(self, "Save Positions", "", "JSON Files (*.json)"); self.engine.save_positions(file_name) if file_name else None
+    def load_positions(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Load Positions", "", "JSON Files (*.json)")
+        if not file_name: return
+        try: self.engine.load_positions(file_name)
+        except (ValueError, TypeError, KeyError) as e: QMessageBox.warning(self, "Invalid Positions", f"Cannot load {file_name}: {e}"); return
+        self.text_signal.emit(f"Loaded {len(self.engine.timeline)} steps.")
+    def save_colors(self):
+        file_name, _ = QFileDialog.getSaveFileName(self, "Save Colors", "", "JSON Files (*.json)")
+        if file_name: self.engine.save_profile(file_name)
+    def load_colors(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Load Colors", "", "JSON Files (*.json)")
+        if not file_name: return
+        self.engine.load_profile(file_name)
+        self._update_pyramid_button(); self._update_blob_button(); self._update_timed_button(); self._update_roi_entry(); self._update_fps_entry()
+        self.min_check_pixel_entry.setText(str(self.engine.min_check_pixel))
+        for interval_entry, cps_entry in ((self.interval_entry, self.cps_entry), (self.dynamic_interval_entry, self.dynamic_cps_entry)):
+            interval_entry.setText(f"{self.engine.click_interval * 1000:g}"); cps_entry.setText(f"{self.engine.target_cps or 0:g}")
+        {"multi-position": self.set_multi_position_mode, "dynamic": self.set_dynamic_mode, "intelligent": self.set_intelligent_mode}.get(self.engine.mode, self.set_multi_position_mode)()
+        self.update_color_boxes()
+    def set_roi(self):
+        try:
+            rects = [tuple(int(v) for v in part.split(",")) for part in self.roi_entry.text().split(";") if part.strip()]
+            if any(len(rect) != 4 for rect in rects): raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Invalid ROI", "Enter rectangles as x,y,w,h separated by ';'."); return
+        polygons = self.engine.roi.get("polygons", [])
+        self.engine.roi = {"rects": [list(rect) for rect in rects], "polygons": polygons}
+        self.text_signal.emit(f"Region of interest: {len(rects)} rectangle(s), {len(polygons)} polygon(s). Applies on the next start.")
+    def set_capture_fps(self):
+        try:
+            min_fps, max_fps = (float(v) for v in self.fps_entry.text().split("-"))
+            if not 0 < min_fps <= max_fps: raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Invalid FPS", "Enter the idle and max capture FPS as min-max, e.g. 5-240."); return
+        self.engine.capture_min_fps, self.engine.capture_max_fps = min_fps, max_fps
+        self.text_signal.emit(f"Capture rate: {min_fps:g} FPS idle, up to {max_fps:g} FPS. Applies on the next start.")
+    def _update_fps_entry(self): self.fps_entry.setText(f"{self.engine.capture_min_fps:g}-{self.engine.capture_max_fps:g}")
+    def _update_roi_entry(self): self.roi_entry.setText("; ".join(",".join(str(v) for v in rect) for rect in self.engine.roi.get("rects", [])))
+    def toggle_pyramid_search(self): self.engine.pyramid_search = not self.engine.pyramid_search; self._update_pyramid_button()
+    def _update_pyramid_button(self): self.pyramid_button.setText(f"Pyramid Search: {'On' if self.engine.pyramid_search else 'Off'}")
+    def toggle_blob_detection(self): self.engine.detection = "pixels" if self.engine.detection == "blobs" else "blobs"; self._update_blob_button(); self.text_signal.emit("Detection mode applies on the next start.")
+    def _update_blob_button(self): self.blob_button.setText(f"Blob Detection: {'On' if self.engine.detection == 'blobs' else 'Off'}")
+    def toggle_recording(self):
+        if self.engine.record_path: self.engine.record_path = None
+        else: self.engine.record_path, _ = QFileDialog.getSaveFileName(self, "Record Frames To", "", "Frame Recordings (*.apxrec)"); self.engine.record_path = self.engine.record_path or None
+        self.record_button.setText(f"Record Frames: {'On' if self.engine.record_path else 'Off'}")
+        self.text_signal.emit(f"Frames will be recorded to {self.engine.record_path} on the next start." if self.engine.record_path else "Frame recording disabled.")
+    def toggle_metrics_export(self):
+        if self.engine.metrics_path: self.engine.metrics_path = None
+        else: self.engine.metrics_path, _ = QFileDialog.getSaveFileName(self, "Export Metrics To", "", "JSON Lines (*.jsonl);;CSV (*.csv)"); self.engine.metrics_path = self.engine.metrics_path or None
+        self.metrics_button.setText(f"Export Metrics: {'On' if self.engine.metrics_path else 'Off'}")
+        self.text_signal.emit(f"Pipeline metrics are appended to {self.engine.metrics_path} every second." if self.engine.metrics_path else "Metrics export disabled.")
+    def set_interval(self, mode):
+        interval_entry, cps_entry = (self.interval_entry, self.cps_entry) if mode == "multi-position" else (self.dynamic_interval_entry, self.dynamic_cps_entry)
+        self.engine.click_interval = float(interval_entry.text()) / 1000
+        self.engine.target_cps = float(cps_entry.text() or 0) or None
     
 if __name__ == "__main__":
     app = QApplication(sys.argv)
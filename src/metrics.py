@@ -0,0 +1,213 @@
+import bisect
+import csv
+import itertools
+import json
+import os
+import threading
+import time
+
+# --- Pipeline Metrics (Eye -> Brain -> Hand) ---
+# Every stage records its latencies into log-linear ("HDR-style") histograms.
+# Each thread writes to its own histograms and counters, so recording is a plain
+# list increment without locks; readers merge the per-thread copies on demand.
+
+STAGES = ("grab", "analysis", "frame", "queue_wait", "click", "end_to_end")
+COUNTERS = ("frames", "dropped_frames", "stale_results", "targets", "dropped_targets", "expired_targets", "clicks")
+
+_SUB_BITS = 5  # 32 sub-buckets per power of two -> ~3% relative error
+_SUB_BUCKETS = 1 << _SUB_BITS
+_MAX_EXPONENT = 40  # Values are clamped at ~2^45 ns (about 10 hours)
+_BUCKETS = (_MAX_EXPONENT + 2) * _SUB_BUCKETS
+
+def _bucket_index(value_ns):
+    if value_ns < _SUB_BUCKETS:
+        return max(0, value_ns)
+    exponent = min(value_ns.bit_length() - _SUB_BITS - 1, _MAX_EXPONENT)
+    mantissa = min(value_ns >> exponent, 2 * _SUB_BUCKETS - 1)
+    return (exponent + 1) * _SUB_BUCKETS + mantissa - _SUB_BUCKETS
+
+def _bucket_value(index):
+    """Midpoint value (ns) of a bucket, used when reading percentiles back."""
+    if index < _SUB_BUCKETS:
+        return float(index)
+    exponent = index // _SUB_BUCKETS - 1
+    mantissa = index % _SUB_BUCKETS + _SUB_BUCKETS
+    return (mantissa << exponent) + ((1 << exponent) - 1) / 2.0
+
+_BUCKET_VALUES = [_bucket_value(index) for index in range(_BUCKETS)]
+
+class LatencyHistogram:
+    """
+    A log-linear latency histogram with a fixed number of buckets.
+
+    `record()` must only be called from one thread (the owner). Other threads
+    may read `counts` at any time; they see a slightly stale but valid copy.
+    """
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record_ns(self, value_ns):
+        self.counts[_bucket_index(value_ns)] += 1
+        self.total_ns += value_ns
+        if value_ns > self.max_ns: self.max_ns = value_ns
+
+    def record(self, seconds):
+        self.record_ns(int(seconds * 1e9))
+
+def summarize(counts, total_ns=None, max_ns=None):
+    """Returns count, mean and p50/p90/p99/max in microseconds for a list of bucket counts."""
+    count = sum(counts)
+    if not count:
+        return {"count": 0, "mean_us": 0.0, "p50_us": 0.0, "p90_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+    cumulative = list(itertools.accumulate(counts))
+    def percentile(p):
+        return _BUCKET_VALUES[bisect.bisect_left(cumulative, p * count)] / 1e3
+    mean = total_ns / count if total_ns is not None else sum(c * v for c, v in zip(counts, _BUCKET_VALUES)) / count
+    return {
+        "count": count,
+        "mean_us": mean / 1e3,
+        "p50_us": percentile(0.50),
+        "p90_us": percentile(0.90),
+        "p99_us": percentile(0.99),
+        "max_us": max_ns / 1e3 if max_ns is not None else percentile(1.0),
+    }
+
+class _ThreadMetrics:
+    """The histograms, counters and CPU time owned by one writer thread."""
+
+    def __init__(self, name):
+        self.name = name
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.cpu_ns = {}
+
+class PipelineMetrics:
+    """
+    Per-stage latencies, counters and per-worker CPU time of the pipeline.
+
+    Stages: `grab` (screen capture), `analysis` (one tile, measured in the
+    worker), `frame` (submit to merged result), `queue_wait` (target queued until
+    picked up by the Hand), `click` (click dispatch) and `end_to_end` (capture to
+    click).
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._threads = []
+        self._lock = threading.Lock()  # Only taken when a new thread records for the first time
+        self.started = time.perf_counter()
+
+    def _mine(self):
+        mine = getattr(self._local, "metrics", None)
+        if mine is None:
+            mine = self._local.metrics = _ThreadMetrics(threading.current_thread().name)
+            with self._lock: self._threads.append(mine)
+        return mine
+
+    def record(self, stage, seconds):
+        self._mine().histograms[stage].record(seconds)
+
+    def record_ns(self, stage, value_ns):
+        self._mine().histograms[stage].record_ns(value_ns)
+
+    def count(self, counter, n=1):
+        self._mine().counters[counter] += n
+
+    def add_cpu(self, worker, cpu_ns):
+        """Charges `cpu_ns` of CPU time to `worker` (a thread name or pool worker ID)."""
+        cpu = self._mine().cpu_ns
+        cpu[worker] = cpu.get(worker, 0) + cpu_ns
+
+    def snapshot(self):
+        """Returns cumulative, merged bucket counts per stage, counters and CPU seconds per worker."""
+        with self._lock: threads = list(self._threads)
+        stages = {}
+        for stage in STAGES:
+            histograms = [t.histograms[stage] for t in threads]
+            stages[stage] = {
+                "counts": [sum(column) for column in zip(*(h.counts for h in histograms))] if histograms else [0] * _BUCKETS,
+                "total_ns": sum(h.total_ns for h in histograms),
+                "max_ns": max((h.max_ns for h in histograms), default=0),
+            }
+        counters = {name: sum(t.counters[name] for t in threads) for name in COUNTERS}
+        cpu = {}
+        for t in threads:
+            for worker, cpu_ns in list(t.cpu_ns.items()):
+                cpu[worker] = cpu.get(worker, 0) + cpu_ns / 1e9
+        return {"time": time.time(), "uptime": time.perf_counter() - self.started, "stages": stages, "counters": counters, "cpu_seconds": cpu}
+
+    def summary(self, snapshot=None):
+        """One line of p50/p99 latencies per stage, for the log."""
+        snapshot = snapshot or self.snapshot()
+        parts = []
+        for stage, data in snapshot["stages"].items():
+            s = summarize(data["counts"], data["total_ns"], data["max_ns"])
+            if s["count"]: parts.append(f"{stage} {s['p50_us'] / 1e3:.2f}/{s['p99_us'] / 1e3:.2f}")
+        counters = snapshot["counters"]
+        return (f"Latency p50/p99 (ms): {' | '.join(parts) or 'no samples'} || "
+                f"dropped frames: {counters['dropped_frames']}, dropped targets: {counters['dropped_targets']}, expired targets: {counters['expired_targets']}")
+
+class ThreadCpuMeter:
+    """Charges the CPU time of the calling thread to `worker` every `tick()`."""
+
+    def __init__(self, metrics, worker):
+        self.metrics = metrics
+        self.worker = worker
+        self._last = time.thread_time_ns()
+
+    def tick(self):
+        now = time.thread_time_ns()
+        self.metrics.add_cpu(self.worker, now - self._last)
+        self._last = now
+
+# --- Export ---
+
+CSV_FIELDS = ("time", "interval", "metric", "value", "count", "mean_us", "p50_us", "p90_us", "p99_us", "max_us")
+
+class MetricsExporter:
+    """
+    Appends interval metrics to a file: JSON lines for `.jsonl`/`.json` paths,
+    CSV rows otherwise (one row per stage, counter and worker). Each `write()`
+    covers the samples recorded since the previous one.
+    """
+
+    def __init__(self, metrics, path):
+        self.metrics = metrics
+        self.path = path
+        self.format = "jsonl" if os.path.splitext(path)[1].lower() in (".jsonl", ".json") else "csv"
+        self._file = open(path, "a", newline="")
+        self._csv = csv.writer(self._file) if self.format == "csv" else None
+        if self._csv and self._file.tell() == 0:
+            self._csv.writerow(CSV_FIELDS)
+        self._previous = metrics.snapshot()
+
+    def write(self):
+        current = self.metrics.snapshot()
+        previous, self._previous = self._previous, current
+        interval = current["uptime"] - previous["uptime"]
+        stages = {}
+        for stage, data in current["stages"].items():
+            before = previous["stages"][stage]
+            stages[stage] = summarize([a - b for a, b in zip(data["counts"], before["counts"])], data["total_ns"] - before["total_ns"])
+        counters = {name: value - previous["counters"][name] for name, value in current["counters"].items()}
+        cpu = {worker: seconds - previous["cpu_seconds"].get(worker, 0.0) for worker, seconds in current["cpu_seconds"].items()}
+        cpu_percent = {worker: 100.0 * seconds / interval if interval else 0.0 for worker, seconds in cpu.items()}
+
+        if self._csv:
+            prefix = [f"{current['time']:.3f}", f"{interval:.3f}"]
+            for stage, s in stages.items():
+                self._csv.writerow(prefix + [f"latency:{stage}", "", s["count"]] + [f"{s[field]:.1f}" for field in CSV_FIELDS[5:]])
+            for name, value in counters.items():
+                self._csv.writerow(prefix + [f"counter:{name}", value] + [""] * 6)
+            for worker, percent in cpu_percent.items():
+                self._csv.writerow(prefix + [f"cpu_percent:{worker}", f"{percent:.1f}"] + [""] * 6)
+        else:
+            record = {"time": current["time"], "interval": interval, "stages": stages, "counters": counters, "cpu_percent": cpu_percent}
+            self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,342 @@
+import functools
+import threading
+import time
+import numpy as np
+
+from analysis import AnalysisConfig
+from capture_governor import CaptureGovernor
+from color_classifier import build_color_specs
+from detection import filter_points_by_distance, pyramid_stride, stitch_blobs
+from click_scheduler import TokenBucket
+from fast_input import fast_background_clicks
+from frame_ring import FrameRing
+from frame_scheduler import RoundRobinScheduler
+from frame_sources import LiveWindowSource, RecordingSource, FRAME_CHANNELS
+from metrics import LatencyHistogram, ThreadCpuMeter, summarize
+from target_queue import PriorityTargetQueue
+from target_tracker import TargetTracker
+from template_matching import load_templates
+from tiling import AdaptiveTiler, DirtyTileTracker, RegionOfInterest
+
+# --- Intelligent Mode Pipeline (Eye -> Brain -> Hand) ---
+# Only imported once Intelligent mode is started, so the other modes never pay for
+# NumPy, mss or the analysis pool.
+
+def merge_tile_results(results, min_check_pixel, min_blob_area=1, max_blob_area=None):
+    """Joins the per-tile results of one frame into (N, 3) [x, y, label] rows in frame coordinates."""
+    chunk_points = [result_chunk for result_chunk in results if len(result_chunk)]
+    if not chunk_points:
+        return np.empty((0, 3), dtype=np.intp)
+    merged_points = np.concatenate(chunk_points)
+    # Blob mode: join blobs cut by chunk seams into one centroid each
+    if merged_points.shape[1] > 3: merged_points = stitch_blobs(merged_points, min_blob_area, max_blob_area)
+    # Re-filter the merged points so targets on either side of a chunk seam are also thinned
+    return filter_points_by_distance(merged_points, min_check_pixel)
+
+class ClickActionWorker(threading.Thread):
+    """
+    The 'Hand': Pulls the best targets from the priority queue in batches and
+    executes background clicks. Each batch is posted in one tight loop and
+    counted once, and a token bucket caps the clicks posted to the window.
+    """
+
+    def __init__(self, session):
+        super().__init__(name="click", daemon=True)
+        self._is_running = True
+        self.session = session
+        self.target_queue = session.target_queue
+        # Clicks go to the window, or to the engine's click sink (headless runs)
+        sink = session.engine.click_sink
+        self.post = functools.partial(sink, session.key) if sink else functools.partial(fast_background_clicks, session.window._hWnd)
+        self.target_tracker = session.target_tracker
+        self.metrics = session.engine.metrics
+        self.batch_size = max(1, session.engine.click_batch)
+        max_cps = session.engine.window_max_cps
+        self.rate_limiter = TokenBucket(max_cps, self.batch_size) if max_cps else None
+
+    def stop(self):
+        self._is_running = False
+        self.target_queue.close() # Unblocks .get()
+        self.join()
+
+    def run(self):
+        cpu_meter = ThreadCpuMeter(self.metrics, "click")
+        session, metrics, rate_limiter = self.session, self.metrics, self.rate_limiter
+        should_continue = lambda: self._is_running
+        while self._is_running:
+            room = rate_limiter.wait(should_continue) if rate_limiter else self.batch_size
+            if not room: break
+            batch = self.target_queue.get_batch(min(room, self.batch_size))
+            if not batch or not self._is_running: break
+            dispatch_started = time.perf_counter()
+            self.post(batch)
+            clicked = time.perf_counter()
+            if rate_limiter: rate_limiter.consume(len(batch))
+
+            per_click = (clicked - dispatch_started) / len(batch)
+            total_latency = 0.0
+            for _, _, _, capture_time, queued_time in batch:
+                metrics.record("queue_wait", dispatch_started - queued_time)
+                metrics.record("click", per_click)
+                metrics.record("end_to_end", clicked - capture_time)
+                session.latency.record(clicked - capture_time)
+                total_latency += clicked - capture_time
+            # Feed the capture-to-click latency back so moving targets are extrapolated
+            self.target_tracker.record_latency(total_latency / len(batch))
+            metrics.count("clicks", len(batch))
+            cpu_meter.tick()
+            session.click_count += len(batch)
+            session.engine.add_clicks(len(batch))
+
+class CaptureWorker(threading.Thread):
+    """The 'Eye': Captures screenshots with MSS and submits them to the 'Brain' for analysis."""
+
+    def __init__(self, session, frame_source, region=None):
+        super().__init__(name="capture", daemon=True)
+        self._is_running = True
+        self.session = session
+        self.engine = session.engine
+        self.frame_source = frame_source
+        self.frame_ring = session.frame_ring
+        # Compiled region of interest: only its tiles are analyzed (None = whole frame)
+        self.region = region
+        self._region_tiles = set(region.tile_indices) if region else None
+        self._armed_key = None
+        # Blob mode changes the layout of tile results, so it is fixed for the session
+        self.blobs = self.engine.detection == "blobs"
+        # Incremental mode: only tiles that changed since the last submitted frame are re-analyzed
+        self.dirty_tracker = DirtyTileTracker(self.frame_ring.shape) if self.engine.incremental_analysis else None
+        # Paces capture to the analysis throughput, and to an idle rate while nothing is detected
+        self.governor = CaptureGovernor(self.engine.capture_min_fps, self.engine.capture_max_fps, self.frame_ring.max_in_flight)
+        self.metrics = self.engine.metrics
+        self._dropped_frames_seen = 0
+
+    def stop(self):
+        self._is_running = False
+        self.join()
+
+    def _on_frame_analyzed(self, slot, frame_id, dirty_tracker, tile_indices, capture_time, submit_time, results):
+        self.frame_ring.release(slot)
+        if tile_indices is not None:
+            results = dirty_tracker.update(tile_indices, results, frame_id)
+        frame_latency = time.perf_counter() - submit_time
+        self.metrics.record("frame", frame_latency)
+        self.governor.record_analysis(frame_latency, sum(len(points) for points in results))
+        self.session.handle_results(results, capture_time=capture_time, frame_id=frame_id)
+
+    def _on_frame_error(self, slot, error):
+        self.frame_ring.release(slot)
+        if self._is_running: self.engine.report_error(f"Analysis error: {error}. Stopping.")
+
+    def _retile(self):
+        """Moves the dirty-tile and ROI grids to the adaptive tiler's current tile size."""
+        tile_size = self.session.tiler.tile_size(self.frame_ring.shape)
+        if self.dirty_tracker is not None and self.dirty_tracker.tile_size != tile_size:
+            # A new grid has no fingerprints yet, so its first frame is analyzed in full
+            self.dirty_tracker = DirtyTileTracker(self.frame_ring.shape, tile_size)
+        if self.region is not None and self.region.tile_size != tile_size:
+            self.region.retile(tile_size)
+            self._region_tiles = set(self.region.tile_indices)
+
+    def _submit(self, slot):
+        """Sends one captured frame slot to the processing pool without blocking."""
+        frame_id, capture_time = slot.frame_id, slot.capture_time
+        self._retile()
+        dirty_tracker, tile_indices = self.dirty_tracker, None
+        if dirty_tracker is not None:
+            tile_indices = dirty_tracker.dirty_tiles(slot.array)
+            if self._region_tiles is not None:
+                tile_indices = [i for i in tile_indices if i in self._region_tiles]
+            if not tile_indices:
+                # Nothing changed: reuse the cached detections of every tile
+                self.frame_ring.release(slot)
+                results = dirty_tracker.cached_results()
+                self.governor.record_analysis(None, sum(len(points) for points in results))
+                self.session.handle_results(results, capture_time=capture_time, frame_id=frame_id)
+                return
+            selected = tile_indices
+        elif self.region is not None:
+            selected = self.region.tile_indices
+        else:
+            selected = None
+
+        if selected is None:
+            chunks = self.session.split_screenshot_into_chunks(self.frame_ring.shape)
+        else:
+            tiles = dirty_tracker.tiles if dirty_tracker else self.region.tiles
+            chunks = [tiles[i] for i in selected]
+        self._arm_pool()
+        # Frames of all windows take turns in the shared pool; every tile layout feeds the tiler's cost estimate
+        self.session.scheduler.submit(self.session.key, functools.partial(self.engine.pool.submit, slot.index, frame_id, chunks, key=self.session.key,
+                                                                          on_timings=functools.partial(self.session.tiler.record, chunks)),
+                                      callback=functools.partial(self._on_frame_analyzed, slot, frame_id, dirty_tracker, tile_indices, capture_time, time.perf_counter()),
+                                      error_callback=functools.partial(self._on_frame_error, slot))
+
+    def _arm_pool(self):
+        """Re-arms the pool workers, but only when the color set or detection settings changed."""
+        color_specs = self.session.get_color_specs()
+        stride = pyramid_stride(self.engine.min_check_pixel, self.engine.min_target_size) if self.engine.pyramid_search else 1
+        key = (color_specs, self.engine.min_check_pixel, stride, self.engine.min_blob_area, self.engine.max_blob_area,
+               self.region.tile_size if self.region else None)
+        if key == self._armed_key: return
+        tile_masks = {self.region.tiles[i][:2]: mask for i, mask in self.region.tile_masks.items()} if self.region else {}
+        self.engine.pool.arm(key=self.session.key, config=AnalysisConfig([slot.name for slot in self.frame_ring.slots], self.frame_ring.shape,
+                                            self.frame_ring.dtype, color_specs, self.engine.min_check_pixel, stride, tile_masks,
+                                            channel_order=self.frame_source.channel_order, templates=self.session.templates,
+                                            blobs=self.blobs, min_blob_area=self.engine.min_blob_area, max_blob_area=self.engine.max_blob_area))
+        self._armed_key = key
+
+    def run(self):
+        cpu_meter = ThreadCpuMeter(self.metrics, "capture")
+        with self.frame_source as source:
+            while self._is_running:
+                try:
+                    if not source.is_alive():
+                        self.engine.report_error(f"{source.end_message} Stopping.")
+                        break
+
+                    self.governor.wait(lambda: self._is_running)
+                    if not self._is_running: break
+
+                    # Every slot is being analyzed: wait for the Brain instead of piling up work
+                    slot = self.frame_ring.acquire()
+                    if self.frame_ring.dropped_frames != self._dropped_frames_seen:
+                        self.metrics.count("dropped_frames", self.frame_ring.dropped_frames - self._dropped_frames_seen)
+                        self._dropped_frames_seen = self.frame_ring.dropped_frames
+                    if slot is None:
+                        time.sleep(0.001)
+                        continue
+
+                    # Capture straight into the acquired shared memory slot
+                    grab_started = time.perf_counter()
+                    capture_time = source.grab_into(slot.array)
+                    if capture_time is None:
+                        continue
+                    self.metrics.record("grab", time.perf_counter() - grab_started)
+                    self.metrics.count("frames")
+                    self.frame_ring.publish(slot, capture_time)
+
+                    while self._is_running:
+                        next_slot = self.frame_ring.next_submission()
+                        if next_slot is None: break
+                        self._submit(next_slot)
+                    cpu_meter.tick()
+
+                except Exception as e:
+                    self.engine.report_error(f"Capture error: {e}. Stopping.")
+                    break
+
+class IntelligentSession:
+    """
+    One run of Intelligent mode against a window: the frame ring, target tracker,
+    target queue and the Eye and Hand workers. The analysis pool belongs to the
+    engine and outlives sessions; sessions of several windows share it through a
+    RoundRobinScheduler.
+
+    Args:
+        engine (AutoClickerEngine): Settings, pool and metrics.
+        window: The target window.
+        key (int): This window's key in the pool and the scheduler.
+        scheduler (RoundRobinScheduler): Shared by the sessions of one run (None = own one).
+        colors (list): Colors for this window (None = the engine's, live).
+        color_settings (dict): Per-color overrides for this window (None = the engine's).
+        frame_source (FrameSource): Frames to analyze instead of capturing the
+            window, e.g. a ReplaySource (None = live capture). They are analyzed
+            whole: the region of interest only crops live captures. `window` may
+            then be None.
+
+    Raises:
+        ValueError: If the region of interest does not overlap the window, or a
+            template cannot be loaded.
+    """
+
+    def __init__(self, engine, window, key=0, scheduler=None, colors=None, color_settings=None, frame_source=None):
+        self.engine = engine
+        self.window = window
+        self.key = key
+        self.scheduler = scheduler or RoundRobinScheduler(engine.max_in_flight)
+        self._colors, self._color_settings = colors, color_settings
+        self.click_count = 0
+        self.latency = LatencyHistogram()  # Capture-to-click, written by this window's Hand only
+        self.started = time.perf_counter()
+        self.templates = load_templates(engine.templates)
+        self.target_queue = PriorityTargetQueue(maxsize=2000, ttl=engine.target_ttl, merge_radius=engine.min_check_pixel, anchor=engine.target_anchor,
+                                                age_weight=engine.age_weight, distance_weight=engine.distance_weight)
+        # Label (1-based index into colors, then templates) -> priority from the color and template settings
+        settings = {hex_color.upper(): value for hex_color, value in self.color_settings.items()}
+        self.label_priority = ([0.0] + [float(settings.get(color.upper(), {}).get("priority", 0)) for color in self.colors]
+                               + [float(entry.get("priority", 0)) for entry in engine.templates])
+        self.target_tracker = TargetTracker(match_radius=engine.min_check_pixel, cooldown=engine.click_cooldown)
+        region = None
+        if frame_source is None:
+            roi = RegionOfInterest.from_dict(engine.roi)
+            region = None if roi.is_empty() else roi.compile((window.height, window.width, FRAME_CHANNELS))
+            frame_source = LiveWindowSource(window, region=(region.origin + (region.shape[1], region.shape[0])) if region else None)
+        self.frame_origin = frame_source.origin
+        if engine.record_path: frame_source = RecordingSource(frame_source, engine.record_path, engine.record_max_frames)
+        self.frame_ring = FrameRing(frame_source.shape, np.uint8, slots=engine.frame_slots, max_in_flight=engine.max_in_flight)
+        # Whole-frame analysis: many small tiles that idle workers pull, sized from their measured cost
+        self.tiler = AdaptiveTiler(engine.num_cores)
+        self.click_action_worker = ClickActionWorker(self)
+        self.capture_worker = CaptureWorker(self, frame_source, region)
+
+    @property
+    def colors(self): return self.engine.colors if self._colors is None else self._colors
+
+    @property
+    def color_settings(self): return self.engine.color_settings if self._color_settings is None else self._color_settings
+
+    def get_color_specs(self):
+        return build_color_specs(self.colors, self.engine.color_tolerance, self.engine.color_mode, self.color_settings)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.click_action_worker.start()
+        self.capture_worker.start()
+
+    def stats(self):
+        """This window's click count, CPS since start and capture-to-click latency (ms) summary."""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        latency = summarize(self.latency.counts, self.latency.total_ns, self.latency.max_ns)
+        return {"window": self.window.title if self.window else "(no window)", "clicks": self.click_count, "cps": self.click_count / elapsed,
+                "p50_ms": latency["p50_us"] / 1e3, "p99_ms": latency["p99_us"] / 1e3}
+
+    def stats_line(self):
+        s = self.stats()
+        return f"'{s['window']}': {s['clicks']} clicks ({s['cps']:.1f} CPS), capture-to-click p50/p99 {s['p50_ms']:.2f}/{s['p99_ms']:.2f} ms"
+
+    def stop(self):
+        """Stops both workers, closes the frame ring and returns summary lines for the log."""
+        if self.capture_worker.is_alive(): self.capture_worker.stop()
+        self.scheduler.cancel(self.key)
+        if self.click_action_worker.is_alive(): self.click_action_worker.stop()
+        lines = [self.stats_line(), self.target_queue.summary()]
+        if self.frame_ring.dropped_frames or self.frame_ring.stale_results:
+            lines.append(f"Frames dropped: {self.frame_ring.dropped_frames} | Stale results discarded: {self.frame_ring.stale_results}")
+        self.frame_ring.close()
+        return lines
+
+    def invalidate_tile_cache(self):
+        if self.capture_worker.dirty_tracker: self.capture_worker.dirty_tracker.invalidate()
+
+    def handle_results(self, results, capture_time, frame_id):
+        if not self.engine.clicking: return
+        # Results of a frame older than one already delivered are out of date
+        if not self.frame_ring.mark_delivered(frame_id): self.engine.metrics.count("stale_results"); return
+        merged_points = merge_tile_results(results, self.engine.min_check_pixel, self.engine.min_blob_area, self.engine.max_blob_area)
+        if len(merged_points):
+            # Frame coordinates -> window coordinates (the frame may be cropped to the region of interest)
+            merged_points[:, :2] += self.frame_origin
+        merged_points = merged_points.tolist()
+        # The tracker drops targets still in cooldown and extrapolates moving ones.
+        # The queue keeps the best live targets and expires stale ones.
+        dropped, expired = self.target_queue.dropped, self.target_queue.expired
+        for x, y, label in self.target_tracker.update(merged_points, capture_time):
+            self.engine.metrics.count("targets")
+            priority = self.label_priority[label] if label < len(self.label_priority) else 0.0
+            self.target_queue.put(x, y, label, capture_time, priority)
+        if self.target_queue.dropped != dropped: self.engine.metrics.count("dropped_targets", self.target_queue.dropped - dropped)
+        if self.target_queue.expired != expired: self.engine.metrics.count("expired_targets", self.target_queue.expired - expired)
+
+    def split_screenshot_into_chunks(self, shape):
+        return self.tiler.tiles(shape)
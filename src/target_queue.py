@@ -0,0 +1,192 @@
+import heapq
+import itertools
+import threading
+import time
+
+# --- Priority Target Queue (between "The Brain" and "The Hand") ---
+# A FIFO makes the Hand click targets in detection order, even when they come
+# from frames that are long out of date. This queue always hands out the best
+# target right now: highest color priority, freshest capture, closest to an
+# anchor point. Targets older than a time-to-live are dropped, and a newer
+# detection at the same spot replaces the queued one instead of adding to it.
+
+DEFAULT_TTL = 0.25  # Seconds a detection stays clickable
+DEFAULT_AGE_WEIGHT = 10.0  # Priority levels lost per second of age
+DEFAULT_DISTANCE_WEIGHT = 0.01  # Priority levels lost per pixel from the anchor
+
+class _Entry:
+    __slots__ = ("x", "y", "label", "capture_time", "queued_time", "cell", "alive")
+
+    def __init__(self, x, y, label, capture_time, queued_time, cell):
+        self.x, self.y, self.label = x, y, label
+        self.capture_time, self.queued_time = capture_time, queued_time
+        self.cell = cell
+        self.alive = True
+
+class PriorityTargetQueue:
+    """
+    A bounded, thread-safe target queue ordered by score.
+
+    score = priority - age_weight * age - distance_weight * distance(anchor)
+
+    Every target ages at the same rate, so the order between queued targets never
+    changes and one heap keyed on `priority + age_weight * capture_time - ...`
+    is enough. A second heap orders targets by capture time for TTL expiry and
+    for evicting the stalest target when the queue is full. Both heaps use lazy
+    deletion: replaced, expired or handed-out entries are only marked dead.
+
+    Args:
+        maxsize (int): Max number of live targets.
+        ttl (float): Seconds after capture at which a target is discarded.
+        merge_radius (float): Targets closer than this (px) are the same spot.
+        anchor (tuple): (x, y) the distance term is measured from, e.g. a
+            crosshair. None disables the distance term.
+        age_weight (float): Score lost per second of age.
+        distance_weight (float): Score lost per pixel from the anchor.
+    """
+
+    def __init__(self, maxsize=2000, ttl=DEFAULT_TTL, merge_radius=10, anchor=None,
+                 age_weight=DEFAULT_AGE_WEIGHT, distance_weight=DEFAULT_DISTANCE_WEIGHT):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.merge_radius = max(1, merge_radius)
+        self.anchor = anchor
+        self.age_weight = age_weight
+        self.distance_weight = distance_weight
+        self.expired = 0
+        self.replaced = 0
+        self.dropped = 0
+        self._by_score = []  # (-static score, seq, entry)
+        self._by_age = []  # (capture_time, seq, entry)
+        self._cells = {}  # grid cell -> live entries in that cell
+        self._live = 0
+        self._seq = itertools.count()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _static_score(self, x, y, priority, capture_time):
+        score = priority + self.age_weight * capture_time
+        if self.anchor is not None:
+            score -= self.distance_weight * ((x - self.anchor[0]) ** 2 + (y - self.anchor[1]) ** 2) ** 0.5
+        return score
+
+    def _cell(self, x, y):
+        return (int(x // self.merge_radius), int(y // self.merge_radius))
+
+    def _kill(self, entry):
+        entry.alive = False
+        self._live -= 1
+        cell_entries = self._cells[entry.cell]
+        cell_entries.remove(entry)
+        if not cell_entries: del self._cells[entry.cell]
+
+    def _expire(self, now):
+        """Drops targets past their TTL, oldest first, and prunes dead heap tops."""
+        while self._by_age:
+            capture_time, _, entry = self._by_age[0]
+            if entry.alive and now - capture_time <= self.ttl:
+                break
+            heapq.heappop(self._by_age)
+            if entry.alive:
+                self._kill(entry)
+                self.expired += 1
+
+    def put(self, x, y, label=0, capture_time=None, priority=0.0):
+        """
+        Queues a target. Live targets within `merge_radius` are replaced by it,
+        unless one of them was captured later. Returns False if the target is
+        already past its TTL or such a newer detection is queued.
+        """
+        now = time.perf_counter()
+        capture_time = now if capture_time is None else capture_time
+        if now - capture_time > self.ttl:
+            with self._cond: self.expired += 1
+            return False
+        with self._cond:
+            self._expire(now)
+            cell = self._cell(x, y)
+            same_spot = [old for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                         for old in self._cells.get((cell[0] + dx, cell[1] + dy), ())
+                         if (old.x - x) ** 2 + (old.y - y) ** 2 < self.merge_radius ** 2]
+            if any(old.capture_time > capture_time for old in same_spot):
+                # A newer detection of this spot is already queued: this one is out of date
+                self.replaced += 1
+                return False
+            for old in same_spot:
+                self._kill(old)
+                self.replaced += 1
+            if self._live >= self.maxsize:
+                # Full: the stalest live target makes room
+                while self._by_age:
+                    _, _, oldest = heapq.heappop(self._by_age)
+                    if oldest.alive:
+                        self._kill(oldest)
+                        self.dropped += 1
+                        break
+            entry = _Entry(x, y, label, capture_time, now, cell)
+            seq = next(self._seq)
+            heapq.heappush(self._by_score, (-self._static_score(x, y, priority, capture_time), seq, entry))
+            heapq.heappush(self._by_age, (capture_time, seq, entry))
+            self._cells.setdefault(cell, []).append(entry)
+            self._live += 1
+            if len(self._by_score) > 2 * self._live + 64:
+                # Replaced and expired entries pile up in the score heap: compact it
+                self._by_score = [item for item in self._by_score if item[2].alive]
+                heapq.heapify(self._by_score)
+            self._cond.notify()
+        return True
+
+    def get(self, timeout=None):
+        """
+        Removes and returns the best live target as (x, y, label, capture_time,
+        queued_time). Blocks until one is available; returns None once the queue
+        is closed or the timeout passes.
+        """
+        batch = self.get_batch(1, timeout)
+        return batch[0] if batch else None
+
+    def get_batch(self, max_items, timeout=None):
+        """
+        Removes up to `max_items` of the best live targets under one lock, best
+        first, as a list of `get()` tuples. Blocks until at least one is
+        available; returns an empty list once the queue is closed or the
+        timeout passes.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    return []
+                now = time.perf_counter()
+                self._expire(now)
+                batch = []
+                while self._by_score and len(batch) < max_items:
+                    _, _, entry = heapq.heappop(self._by_score)
+                    if entry.alive:
+                        self._kill(entry)
+                        batch.append((entry.x, entry.y, entry.label, entry.capture_time, entry.queued_time))
+                if self._live == 0:
+                    # Everything left in the age heap is dead
+                    self._by_age.clear()
+                if batch:
+                    return batch
+                if deadline is not None and now >= deadline:
+                    return []
+                self._cond.wait(None if deadline is None else deadline - now)
+
+    def close(self):
+        """Wakes up every waiting `get()`; they return None from now on."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def clear(self):
+        with self._cond:
+            self._by_score.clear(); self._by_age.clear(); self._cells.clear()
+            self._live = 0
+
+    def __len__(self):
+        return self._live
+
+    def summary(self):
+        return f"Targets expired: {self.expired} | replaced: {self.replaced} | dropped (queue full): {self.dropped}"
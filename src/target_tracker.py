@@ -0,0 +1,123 @@
+import threading
+import time
+
+# --- Target Ledger (between "The Brain" and "The Hand") ---
+# Every frame re-detects the same targets. The tracker associates detections
+# across frames by proximity to where each track is predicted to be (its last
+# position plus velocity times the elapsed time), so each physical target is
+# clicked at most once per cooldown, and extrapolates moving targets by the
+# measured capture-to-click latency.
+
+class Track:
+    """A single target followed across frames."""
+    __slots__ = ("x", "y", "label", "vx", "vy", "last_seen", "last_click")
+
+    def __init__(self, x, y, timestamp, label=0):
+        self.x, self.y, self.label = x, y, label
+        self.vx = self.vy = 0.0
+        self.last_seen = timestamp
+        self.last_click = None
+
+class TargetTracker:
+    """
+    Associates detections across frames and decides which targets to click.
+
+    Args:
+        match_radius (float): Max distance (px) between a detection and a track's
+            predicted position for them to be considered the same target.
+        cooldown (float): Minimum seconds between two clicks on the same target.
+        max_age (float): Seconds a track survives without being re-detected.
+        velocity_smoothing (float): EMA weight of the newest velocity sample.
+        latency_smoothing (float): EMA weight of the newest latency sample.
+    """
+
+    def __init__(self, match_radius=10, cooldown=0.25, max_age=0.5,
+                 velocity_smoothing=0.5, latency_smoothing=0.2):
+        self.match_radius = max(1, match_radius)
+        self.cooldown = cooldown
+        self.max_age = max_age
+        self.velocity_smoothing = velocity_smoothing
+        self.latency_smoothing = latency_smoothing
+        self.latency = 0.0
+        self._tracks = []
+        self._lock = threading.Lock()
+
+    def _cell(self, x, y):
+        return (int(x // self.match_radius), int(y // self.match_radius))
+
+    def _predict(self, timestamp):
+        """Grid of (predicted x, predicted y, track) by the cell of each track's position at `timestamp`."""
+        grid = {}
+        for track in self._tracks:
+            dt = timestamp - track.last_seen
+            px, py = track.x + track.vx * dt, track.y + track.vy * dt
+            grid.setdefault(self._cell(px, py), []).append((px, py, track))
+        return grid
+
+    def _nearest_track(self, grid, x, y, claimed):
+        cx, cy = self._cell(x, y)
+        best, best_dist = None, self.match_radius ** 2
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                for px, py, track in grid.get((cx + dx, cy + dy), ()):
+                    if id(track) in claimed:
+                        continue
+                    dist = (px - x) ** 2 + (py - y) ** 2
+                    if dist <= best_dist:
+                        best, best_dist = track, dist
+        return best
+
+    def update(self, detections, timestamp=None):
+        """
+        Feeds one frame of detections into the ledger.
+
+        Args:
+            detections: Iterable of (x, y) or (x, y, label) window-relative coordinates.
+            timestamp (float): `time.perf_counter()` at capture time.
+
+        Returns:
+            A list of (x, y, label) click points for targets whose cooldown has
+            expired, extrapolated by the current capture-to-click latency estimate.
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        with self._lock:
+            claimed, updated, to_click = set(), [], []
+            grid = self._predict(timestamp)
+            for x, y, *label in detections:
+                label = label[0] if label else 0
+                track = self._nearest_track(grid, x, y, claimed)
+                if track is None:
+                    track = Track(x, y, timestamp, label)
+                else:
+                    dt = timestamp - track.last_seen
+                    if dt > 0:
+                        a = self.velocity_smoothing
+                        track.vx = a * (x - track.x) / dt + (1 - a) * track.vx
+                        track.vy = a * (y - track.y) / dt + (1 - a) * track.vy
+                    track.x, track.y, track.label, track.last_seen = x, y, label, timestamp
+                claimed.add(id(track))
+                updated.append(track)
+
+                if track.last_click is None or timestamp - track.last_click >= self.cooldown:
+                    track.last_click = timestamp
+                    to_click.append((int(round(x + track.vx * self.latency)),
+                                     int(round(y + track.vy * self.latency)), label))
+
+            # Keep the re-detected tracks; the others expire after max_age
+            self._tracks = updated + [track for track in self._tracks
+                                      if id(track) not in claimed and timestamp - track.last_seen <= self.max_age]
+        return to_click
+
+    def record_latency(self, latency):
+        """Feeds a measured capture-to-click latency (seconds) into the estimate."""
+        with self._lock:
+            a = self.latency_smoothing
+            self.latency = latency if self.latency == 0.0 else a * latency + (1 - a) * self.latency
+
+    def reset(self):
+        with self._lock:
+            self._tracks = []
+            self.latency = 0.0
+
+    def __len__(self):
+        return len(self._tracks)
@@ -0,0 +1,235 @@
+import os
+import numpy as np
+
+from color_classifier import get_color_classifier
+
+# --- Template Matching (for "The Brain") ---
+# Single-pixel color matching misfires on any UI that reuses a color. Templates
+# (small sprites or icons loaded from PNG files) are matched by normalized
+# cross-correlation instead. Correlation is expensive, so each template picks a
+# "key" color of its own, and the color classifier first finds the pixels where
+# that key could sit. Only the windows anchored at those pixels are correlated,
+# in small blocks that are batched through one FFT.
+
+DEFAULT_THRESHOLD = 0.8  # Minimum normalized cross-correlation (-1..1) for a match
+DEFAULT_KEY_TOLERANCE = 24  # RGB distance of the color pre-filter
+BLOCK_SIZE = 64  # Window positions per correlation block side
+
+_LUMA = {"R": 0.299, "G": 0.587, "B": 0.114}
+
+def to_gray(pixels, channel_order="RGB"):
+    """Converts (..., C) pixels in `channel_order` to float64 luma."""
+    weights = np.array([_LUMA[c] for c in channel_order[:3]])
+    return pixels[..., :3] @ weights
+
+def read_png(path):
+    """
+    Reads an image file into an (H, W, 4) RGBA uint8 array. Pillow is only needed
+    (and imported) when templates are used.
+
+    Raises:
+        ValueError: If Pillow is missing or the file cannot be read.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ValueError("Template matching needs Pillow: pip install Pillow")
+    try:
+        with Image.open(path) as image:
+            return np.asarray(image.convert("RGBA"))
+    except OSError as e:
+        raise ValueError(f"Cannot read template '{path}': {e}")
+
+class Template:
+    """
+    A template compiled for matching.
+
+    Args:
+        name (str): Shown in logs, e.g. the file name.
+        rgba (np.ndarray): (H, W, 3 or 4) RGB(A) uint8 pixels. Fully transparent
+            pixels are never used as the key color.
+        threshold (float): Minimum correlation for a match.
+        key_tolerance (float): RGB tolerance of the key color pre-filter.
+
+    Raises:
+        ValueError: If the template is a single flat color (use color targeting).
+    """
+
+    def __init__(self, name, rgba, threshold=DEFAULT_THRESHOLD, key_tolerance=DEFAULT_KEY_TOLERANCE):
+        self.name = name
+        self.threshold = threshold
+        self.key_tolerance = key_tolerance
+        rgb = np.ascontiguousarray(rgba[..., :3], dtype=np.uint8)
+        self.height, self.width = rgb.shape[:2]
+        gray = to_gray(rgb)
+        self.zero_mean = gray - gray.mean()
+        self.norm = float(np.sqrt(np.sum(self.zero_mean ** 2)))
+        if self.norm < 1e-6:
+            raise ValueError(f"Template '{name}' is a single flat color; add it as a target color instead.")
+        opaque = rgba[..., 3] > 0 if rgba.shape[-1] == 4 else np.ones((self.height, self.width), dtype=bool)
+        self.key_color, self.key_offset = self._pick_key(rgb, opaque)
+        self._spectra = {}  # FFT block shape -> template spectrum (per process)
+
+    def _pick_key(self, rgb, opaque):
+        """The most common (quantized) opaque color, and its occurrence nearest the template center."""
+        quantized = (rgb >> 3).astype(np.int32)
+        keys = (quantized[..., 0] << 10) | (quantized[..., 1] << 5) | quantized[..., 2]
+        values, counts = np.unique(keys[opaque], return_counts=True)
+        ys, xs = np.nonzero((keys == values[np.argmax(counts)]) & opaque)
+        nearest = np.argmin((ys - self.height / 2) ** 2 + (xs - self.width / 2) ** 2)
+        y, x = int(ys[nearest]), int(xs[nearest])
+        return "#%02X%02X%02X" % tuple(rgb[y, x]), (y, x)
+
+    def spectrum(self, shape):
+        if shape not in self._spectra:
+            self._spectra[shape] = np.conj(np.fft.rfft2(self.zero_mean, s=shape))
+        return self._spectra[shape]
+
+    def __getstate__(self):
+        # Spectra are rebuilt on demand by each pool worker
+        state = self.__dict__.copy()
+        state["_spectra"] = {}
+        return state
+
+def load_templates(template_settings):
+    """
+    Loads the templates of a profile.
+
+    Args:
+        template_settings (list): Dicts with a `path` and optional `threshold`
+            and `key_tolerance`, e.g. [{"path": "icons/coin.png", "threshold": 0.85}].
+
+    Returns:
+        A tuple of Template, in priority order.
+    """
+    return tuple(Template(os.path.basename(entry["path"]), read_png(entry["path"]),
+                          entry.get("threshold", DEFAULT_THRESHOLD), entry.get("key_tolerance", DEFAULT_KEY_TOLERANCE))
+                 for entry in template_settings)
+
+def _fft_length(n):
+    """Smallest 2^a * 3^b * 5^c >= n (FFTs of prime lengths are many times slower)."""
+    best = 1 << (n - 1).bit_length()
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            length = power35
+            while length < n: length *= 2
+            best = min(best, length)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+def suppress_overlaps(centers, radius):
+    """
+    Greedy non-maximum suppression: keeps a center unless a better one (earlier
+    in `centers`) lies within `radius` on both axes.
+    """
+    keep = []
+    remaining = np.arange(len(centers))
+    while len(remaining):
+        best = remaining[0]
+        keep.append(best)
+        delta = np.abs(centers[remaining] - centers[best])
+        remaining = remaining[(delta[:, 0] >= radius) | (delta[:, 1] >= radius)]
+    return centers[keep]
+
+def normalized_cross_correlation(blocks, template):
+    """
+    Normalized cross-correlation of a template over a stack of grayscale blocks.
+
+    The numerator is a correlation with the zero-mean template, computed for all
+    blocks with one batched FFT. The window means and variances of the blocks
+    come from integral images, so the whole map costs a few passes per block.
+
+    Args:
+        blocks (np.ndarray): (K, H, W) float64 grayscale blocks.
+        template (Template): The template (h x w, h <= H, w <= W).
+
+    Returns:
+        A (K, H - h + 1, W - w + 1) array of scores in [-1, 1]; flat windows score 0.
+    """
+    k, height, width = blocks.shape
+    th, tw = template.height, template.width
+    # Padding to a fast length is safe: windows of valid positions never wrap around
+    shape = (_fft_length(height), _fft_length(width))
+    correlation = np.fft.irfft2(np.fft.rfft2(blocks, s=shape) * template.spectrum(shape), s=shape)
+    correlation = correlation[:, :height - th + 1, :width - tw + 1]
+
+    integral = np.zeros((2, k, height + 1, width + 1))
+    integral[0, :, 1:, 1:] = blocks
+    integral[1, :, 1:, 1:] = blocks ** 2
+    integral = integral.cumsum(axis=2).cumsum(axis=3)
+    window = integral[:, :, th:, tw:] - integral[:, :, :-th, tw:] - integral[:, :, th:, :-tw] + integral[:, :, :-th, :-tw]
+    variance = window[1] - window[0] ** 2 / (th * tw)
+
+    denominator = np.sqrt(np.maximum(variance, 0)) * template.norm
+    flat = denominator < 1e-6 * template.norm
+    return np.where(flat, 0.0, correlation / np.where(flat, 1.0, denominator))
+
+class TemplateMatcher:
+    """
+    Matches a set of templates against tiles of a frame.
+
+    Args:
+        templates (tuple): Template instances, in priority order.
+        channel_order (str): Pixel layout of the frames.
+        first_label (int): Label of the first template (labels follow the colors').
+    """
+
+    def __init__(self, templates, channel_order="BGRA", first_label=1):
+        self.templates = tuple(templates)
+        self.channel_order = channel_order
+        self.first_label = first_label
+        self.margin = (max(t.height for t in self.templates) - 1, max(t.width for t in self.templates) - 1)
+        self.classifiers = [get_color_classifier(((t.key_color, float(t.key_tolerance), "rgb"),), channel_order=channel_order)
+                            for t in self.templates]
+
+    def find(self, pixels, height, width):
+        """
+        Finds template matches anchored in the top-left `height` x `width` part of
+        `pixels`. `pixels` may extend past it by up to `margin`, so that templates
+        straddling a tile seam are still matched whole.
+
+        Returns:
+            (ys, xs, labels) of match centers, best match of each template first.
+        """
+        gray = None
+        found = []
+        for index, (template, classifier) in enumerate(zip(self.templates, self.classifiers)):
+            # Color pre-filter: candidate windows are those whose key pixel matches
+            hit_y, hit_x = np.nonzero(classifier.match(pixels))
+            ys, xs = hit_y - template.key_offset[0], hit_x - template.key_offset[1]
+            valid = ((ys >= 0) & (xs >= 0) & (ys < height) & (xs < width)
+                     & (ys + template.height <= pixels.shape[0]) & (xs + template.width <= pixels.shape[1]))
+            ys, xs = ys[valid], xs[valid]
+            if not len(ys):
+                continue
+            if gray is None:
+                gray = to_gray(pixels, self.channel_order)
+
+            # Correlate only the blocks of window positions that hold a candidate
+            block_ys, block_xs = ys // BLOCK_SIZE, xs // BLOCK_SIZE
+            keys, block_of = np.unique(block_ys * (width // BLOCK_SIZE + 1) + block_xs, return_inverse=True)
+            block_of = block_of.ravel()
+            first = np.zeros(len(keys), dtype=np.intp)
+            first[block_of] = np.arange(len(ys))
+            span_y, span_x = BLOCK_SIZE + template.height - 1, BLOCK_SIZE + template.width - 1
+            blocks = np.zeros((len(keys), span_y, span_x))
+            for i, (by, bx) in enumerate(zip(block_ys[first] * BLOCK_SIZE, block_xs[first] * BLOCK_SIZE)):
+                crop = gray[by:by + span_y, bx:bx + span_x]
+                blocks[i, :crop.shape[0], :crop.shape[1]] = crop
+            scores = normalized_cross_correlation(blocks, template)[block_of, ys % BLOCK_SIZE, xs % BLOCK_SIZE]
+
+            matched = scores >= template.threshold
+            if not np.any(matched):
+                continue
+            order = np.argsort(-scores[matched], kind="stable")
+            centers = np.column_stack((xs[matched][order] + template.width // 2, ys[matched][order] + template.height // 2))
+            # Overlapping windows of one match: keep the best scoring one
+            centers = suppress_overlaps(centers, max(1, min(template.height, template.width) // 2))
+            found.append((centers[:, 1], centers[:, 0], np.full(len(centers), self.first_label + index)))
+
+        if not found:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        return tuple(np.concatenate(parts) for parts in zip(*found))
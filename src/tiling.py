@@ -0,0 +1,292 @@
+import threading
+import numpy as np
+
+# --- Frame Tiling (for "The Eye" and "The Brain") ---
+
+DEFAULT_TILE_SIZE = 128
+
+def tile_dimensions(tile_size):
+    """(tile_height, tile_width) of a square size or a (height, width) pair."""
+    return (tile_size, tile_size) if isinstance(tile_size, int) else tuple(tile_size)
+
+def tile_grid(shape, tile_size=DEFAULT_TILE_SIZE):
+    """
+    Splits a (height, width, ...) frame into row-major (start_y, start_x, height, width)
+    tiles of `tile_size` (an int for squares, or (tile_height, tile_width)).
+    """
+    height, width = shape[:2]
+    tile_height, tile_width = tile_dimensions(tile_size)
+    return [(y, x, min(tile_height, height - y), min(tile_width, width - x))
+            for y in range(0, height, tile_height)
+            for x in range(0, width, tile_width)]
+
+def split_frame(shape, parts):
+    """Splits a frame into about `parts` equal rectangles (one per pool worker), row-major."""
+    height, width = shape[:2]
+    rows = int(np.ceil(np.sqrt(parts)))
+    cols = int(np.ceil(parts / rows))
+    chunk_height, chunk_width = height // rows, width // cols
+    chunks = []
+    for row in range(rows):
+        for col in range(cols):
+            start_y = row * chunk_height
+            h = (height - start_y) if row == rows - 1 else chunk_height
+            start_x = col * chunk_width
+            w = (width - start_x) if col == cols - 1 else chunk_width
+            chunks.append((start_y, start_x, h, w))
+    return chunks
+
+# --- Adaptive Tiling ---
+# With one chunk per core, the chunk holding the most targets sets the frame
+# latency while the other workers sit idle. Frames are cut into many small
+# row-major tiles instead, and idle workers pull the next tile from the pool's
+# queue. Tiles should be big enough that per-task overhead stays small, yet
+# small enough to balance; their size follows the measured cost per pixel.
+# Incremental analysis and regions of interest re-tile their grids to the same size.
+
+TILE_ALIGN = 16  # Tile widths are multiples of 16 BGRA pixels, i.e. of 64-byte cache lines
+MIN_TILE_ROWS = 16
+DEFAULT_TILE_COST = 0.002  # Seconds of analysis aimed for per tile
+DEFAULT_TILES_PER_WORKER = 4  # At least this many tiles per worker, so there is work to steal
+
+class AdaptiveTiler:
+    """
+    Splits frames into row-major tiles whose size is tuned from observed per-tile cost.
+
+    Tiles are full-width row bands when those are at least MIN_TILE_ROWS high (contiguous
+    memory, fewest seams), otherwise MIN_TILE_ROWS-high tiles with cache-line aligned
+    widths. A new tile size is only adopted when it differs from the current one by
+    more than `hysteresis`, so the tiling does not flap between frames.
+
+    Args:
+        workers (int): Pool size.
+        target_cost (float): Seconds of analysis aimed for per tile.
+        tiles_per_worker (int): Minimum tiles per worker per frame.
+        smoothing (float): Weight of the newest frame in the cost estimate.
+        hysteresis (float): Size ratio that triggers re-tiling.
+    """
+
+    def __init__(self, workers, target_cost=DEFAULT_TILE_COST, tiles_per_worker=DEFAULT_TILES_PER_WORKER, smoothing=0.2, hysteresis=1.5):
+        self.workers = max(1, workers)
+        self.target_cost_ns = target_cost * 1e9
+        self.tiles_per_worker = tiles_per_worker
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self.ns_per_pixel = None
+        self._shape = None
+        self._tile_pixels = None
+        self._tiles = []
+        self._tile_size = None
+        self._lock = threading.Lock()
+
+    def _desired_pixels(self, height, width):
+        most = max(TILE_ALIGN * MIN_TILE_ROWS, height * width // (self.workers * self.tiles_per_worker))
+        if self.ns_per_pixel is None: return most
+        return int(min(most, max(TILE_ALIGN * MIN_TILE_ROWS, self.target_cost_ns / self.ns_per_pixel)))
+
+    def _split(self, height, width, pixels):
+        if pixels >= width * MIN_TILE_ROWS:
+            self._tile_size = (max(MIN_TILE_ROWS, pixels // width), width)
+        else:
+            self._tile_size = (MIN_TILE_ROWS, max(TILE_ALIGN, pixels // MIN_TILE_ROWS // TILE_ALIGN * TILE_ALIGN))
+        return tile_grid((height, width), self._tile_size)
+
+    def _ensure_shape(self, shape):
+        if shape[:2] != self._shape:
+            self._shape, self._tile_pixels = shape[:2], self._desired_pixels(*shape[:2])
+            self._tiles = self._split(*self._shape, self._tile_pixels)
+
+    def tiles(self, shape):
+        """The (start_y, start_x, height, width) tiles of a frame, row-major."""
+        with self._lock:
+            self._ensure_shape(shape)
+            return self._tiles
+
+    def tile_size(self, shape):
+        """The current (tile_height, tile_width) for frames of `shape`, for grids that `tile_grid` builds."""
+        with self._lock:
+            self._ensure_shape(shape)
+            return self._tile_size
+
+    def record(self, tiles, wall_ns):
+        """Feeds the measured analysis times (ns) of a frame's tiles into the cost estimate."""
+        pixels = sum(h * w for _, _, h, w in tiles)
+        if not pixels: return
+        cost = sum(wall_ns) / pixels
+        with self._lock:
+            self.ns_per_pixel = cost if self.ns_per_pixel is None else self.smoothing * cost + (1 - self.smoothing) * self.ns_per_pixel
+            if self._shape is None: return
+            desired = self._desired_pixels(*self._shape)
+            if max(desired, self._tile_pixels) > self.hysteresis * min(desired, self._tile_pixels):
+                self._tile_pixels = desired
+                self._tiles = self._split(*self._shape, desired)
+
+class DirtyTileTracker:
+    """
+    Incremental analysis: finds the tiles that changed since the previous frame
+    and caches the detections of the tiles that did not.
+
+    Each tile is fingerprinted with three cheap per-channel checksums: the plain
+    pixel sum plus sums weighted by the tile-local x and y coordinate, so both
+    color changes and content moving inside a tile are noticed. Only two
+    contiguous row-band reductions touch the full frame, far less work than
+    re-analyzing it.
+    """
+
+    def __init__(self, shape, tile_size=DEFAULT_TILE_SIZE):
+        self.shape = tuple(shape)
+        self.tile_size = tile_dimensions(tile_size)
+        self.tiles = tile_grid(self.shape, self.tile_size)
+        height, width = self.shape[:2]
+        tile_height, tile_width = self.tile_size
+        self._col_starts = np.arange(0, width, tile_width)
+        self._x_weights = (np.arange(width) % tile_width + 1).astype(np.uint64)[None, :, None]
+        self._y_weights = np.arange(1, tile_height + 1, dtype=np.uint32)
+        self._fingerprint = None
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _band_sums(self, frame):
+        """Plain and y-weighted sums over each band of tile rows (fast, contiguous reductions)."""
+        height, tile_height = frame.shape[0], self.tile_size[0]
+        rows = frame.reshape(height, -1)
+        full = height - height % tile_height
+        bands = rows[:full].reshape(-1, tile_height, rows.shape[1])
+        plain = bands.sum(axis=1, dtype=np.uint32)
+        weighted = np.einsum("y,tyx->tx", self._y_weights, bands, dtype=np.uint32)
+        if full < height:
+            tail = rows[full:]
+            plain = np.vstack([plain, tail.sum(axis=0, dtype=np.uint32)])
+            weighted = np.vstack([weighted, np.einsum("y,yx->x", self._y_weights[:height - full], tail, dtype=np.uint32)])
+        return plain.reshape(len(plain), *frame.shape[1:]), weighted.reshape(len(plain), *frame.shape[1:])
+
+    def fingerprint(self, frame):
+        """Returns a (tile_rows, tile_cols, 3, channels) checksum array for a frame."""
+        plain, y_weighted = self._band_sums(frame)
+        plain = plain.astype(np.uint64)
+        return np.stack([np.add.reduceat(plain, self._col_starts, axis=1),
+                         np.add.reduceat(plain * self._x_weights, self._col_starts, axis=1),
+                         np.add.reduceat(y_weighted, self._col_starts, axis=1, dtype=np.uint64)], axis=2)
+
+    def dirty_tiles(self, frame):
+        """Returns the indices (into `self.tiles`) of tiles that changed since the last call."""
+        fingerprint = self.fingerprint(frame)
+        previous, self._fingerprint = self._fingerprint, fingerprint
+        if previous is None:
+            return list(range(len(self.tiles)))
+        changed = np.any(fingerprint != previous, axis=(2, 3))
+        return np.flatnonzero(changed).tolist()
+
+    def update(self, tile_indices, results, frame_id=0):
+        """
+        Stores fresh per-tile results and returns the detections of every tile.
+        Results arriving out of order never overwrite those of a newer frame.
+        """
+        with self._lock:
+            for index, result in zip(tile_indices, results):
+                cached = self._cache.get(index)
+                if cached is None or cached[0] <= frame_id:
+                    self._cache[index] = (frame_id, result)
+            return [result for _, result in self._cache.values()]
+
+    def cached_results(self):
+        with self._lock:
+            return [result for _, result in self._cache.values()]
+
+    def invalidate(self):
+        """Forces the next frame to be fully re-analyzed (e.g. after the color set changed)."""
+        with self._lock:
+            self._fingerprint = None
+            self._cache = {}
+
+# --- Regions of Interest ---
+
+def _polygon_mask(points, height, width):
+    """Rasterizes a polygon (list of (x, y)) into a (height, width) mask, using pixel centers and the even-odd rule."""
+    ys, xs = np.mgrid[0:height, 0:width] + 0.5
+    inside = np.zeros((height, width), dtype=bool)
+    points = np.asarray(points, dtype=np.float64)
+    for (x0, y0), (x1, y1) in zip(points, np.roll(points, -1, axis=0)):
+        if y0 == y1:
+            continue
+        crosses = (ys >= min(y0, y1)) & (ys < max(y0, y1))
+        x_at_y = x0 + (ys - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (xs < x_at_y)
+    return inside
+
+class RegionOfInterest:
+    """
+    User-defined areas of the target window that should be scanned, in
+    window-relative pixels. Everything outside them (HUDs, chat panels, borders)
+    is neither captured nor analyzed. An empty ROI means the whole window.
+
+    Args:
+        rects (list): (x, y, width, height) rectangles.
+        polygons (list): Polygons, each a list of (x, y) vertices.
+    """
+
+    def __init__(self, rects=(), polygons=()):
+        self.rects = [tuple(int(v) for v in rect) for rect in rects]
+        self.polygons = [[tuple(int(v) for v in point) for point in polygon] for polygon in polygons]
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(data.get("rects", ()), data.get("polygons", ()))
+
+    def to_dict(self):
+        return {"rects": [list(rect) for rect in self.rects], "polygons": [[list(p) for p in polygon] for polygon in self.polygons]}
+
+    def is_empty(self):
+        return not self.rects and not self.polygons
+
+    def compile(self, window_shape, tile_size=DEFAULT_TILE_SIZE):
+        """Precomputes the capture region, pixel mask and tile list for a window size."""
+        return CompiledRegion(self, window_shape, tile_size)
+
+class CompiledRegion:
+    """
+    A RegionOfInterest rasterized for one window size.
+
+    Attributes:
+        origin (tuple): (x, y) of the captured region inside the window.
+        shape (tuple): Shape of the captured frame (the ROI bounding box).
+        mask (ndarray): Boolean mask of ROI pixels, in frame coordinates.
+        tile_size (tuple): (tile_height, tile_width) of the tile grid (see `retile`).
+        tiles (list): `tile_grid(shape, tile_size)`.
+        tile_indices (list): Indices into `tiles` of tiles touching the ROI.
+        tile_masks (dict): Tile index -> mask for tiles only partly inside the ROI
+            (tiles fully inside are absent and need no masking).
+    """
+
+    def __init__(self, region, window_shape, tile_size=DEFAULT_TILE_SIZE):
+        height, width = window_shape[:2]
+        window_mask = np.zeros((height, width), dtype=bool)
+        if region.is_empty():
+            window_mask[:] = True
+        for x, y, w, h in region.rects:
+            window_mask[max(0, y):max(0, y + h), max(0, x):max(0, x + w)] = True
+        for polygon in region.polygons:
+            window_mask |= _polygon_mask(polygon, height, width)
+        if not window_mask.any():
+            raise ValueError("The region of interest does not overlap the window.")
+
+        rows, cols = np.flatnonzero(window_mask.any(axis=1)), np.flatnonzero(window_mask.any(axis=0))
+        top, left = int(rows[0]), int(cols[0])
+        self.origin = (left, top)
+        self.mask = window_mask[top:int(rows[-1]) + 1, left:int(cols[-1]) + 1]
+        self.shape = self.mask.shape + tuple(window_shape[2:])
+        self.retile(tile_size)
+
+    def retile(self, tile_size):
+        """Rebuilds the tile list and the partial tile masks for another tile size."""
+        self.tile_size = tile_dimensions(tile_size)
+        self.tiles = tile_grid(self.shape, self.tile_size)
+        self.tile_indices, self.tile_masks = [], {}
+        for index, (y, x, h, w) in enumerate(self.tiles):
+            tile_mask = self.mask[y:y + h, x:x + w]
+            if not tile_mask.any():
+                continue
+            self.tile_indices.append(index)
+            if not tile_mask.all():
+                self.tile_masks[index] = tile_mask.copy()
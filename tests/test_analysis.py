@@ -0,0 +1,100 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import analysis
+from analysis import AnalysisBackend, AutoBackend
+
+class FakeBackend(AnalysisBackend):
+    """Records where frames are analyzed; pool fakes answer from their own thread."""
+
+    def __init__(self, name, workers=None):
+        self.name = name
+        self.threads = []
+        self.closed = False
+
+    def arm(self, config, key=0): pass
+
+    def submit(self, slot_index, frame_id, tiles, callback, error_callback, key=0, on_timings=None):
+        def run():
+            self.threads.append(threading.get_ident())
+            callback([])
+        if self.name == "inline": run()
+        else:
+            worker = threading.Thread(target=run)
+            worker.start(); worker.join()
+
+    def close(self): self.closed = True
+
+@pytest.fixture
+def fakes(monkeypatch):
+    created = []
+    def factory(name):
+        return lambda *args: created.append(FakeBackend(name)) or created[-1]
+    for name, cls in (("inline", "InlineBackend"), ("thread", "ThreadBackend"), ("process", "ProcessBackend")):
+        monkeypatch.setattr(analysis, cls, factory(name))
+    return created
+
+def config(shape=(10, 10, 4)):
+    return SimpleNamespace(shape=shape)
+
+def submit(backend, thread=None):
+    results = []
+    if thread is None:
+        backend.submit(0, 0, [], results.append, pytest.fail)
+    else:
+        worker = threading.Thread(target=backend.submit, args=(0, 0, [], results.append, pytest.fail))
+        worker.start(); worker.join()
+    return results
+
+def test_losers_are_closed_after_selection(fakes):
+    backend = AutoBackend(2, trials=2)
+    backend.arm(config())
+    while backend.selected is None: submit(backend)
+    submit(backend)
+    kept = {backend.selected.name, "thread" if backend.selected.name == "inline" else backend.selected.name}
+    assert {b.name for b in fakes if not b.closed} == kept
+    backend.close()
+    assert all(b.closed for b in fakes)
+
+def test_inline_samples_only_run_on_capture_threads(fakes):
+    backend = AutoBackend(2, trials=50)
+    backend.arm(config())
+    for _ in range(6): submit(backend, thread=True)
+    inline = backend.candidates[0]
+    assert inline.name == "inline" and inline.threads == []
+    submit(backend)
+    assert inline.threads == [threading.get_ident()]
+
+def test_benchmark_gives_up_after_timeout(fakes):
+    selected = []
+    backend = AutoBackend(2, trials=50, timeout=0, on_select=lambda name, medians: selected.append(name))
+    backend.arm(config())
+    assert submit(backend) == [[]]
+    assert selected == [AutoBackend.DEFAULT]
+    assert backend.selected.name == AutoBackend.DEFAULT
+
+def test_rearming_keeps_configs_of_frames_in_flight():
+    import numpy as np
+    from analysis import AnalysisConfig, ProcessBackend
+    from color_classifier import build_color_specs
+    from frame_ring import FrameRing
+
+    ring = FrameRing((32, 32, 4), slots=2, max_in_flight=1)
+    ring.slots[0].array[8:12, 8:12] = (0, 0, 255, 255)
+    backend = ProcessBackend(1)
+    done, errors = threading.Semaphore(0), []
+    try:
+        for generation in range(5):
+            backend.arm(AnalysisConfig([slot.name for slot in ring.slots], ring.shape, ring.dtype, build_color_specs(["#FF0000"]), 10 + generation))
+            for frame_id in range(4):
+                backend.submit(0, frame_id, [(0, 0, 16, 32), (16, 0, 16, 32)], lambda results: done.release(),
+                               lambda error: (errors.append(error), done.release()))
+        for _ in range(5 * 4):
+            assert done.acquire(timeout=30)
+        assert errors == []
+        # Only the current generation is still published once nothing is in flight
+        assert list(backend._config_shms) == [backend.generations[0]]
+    finally:
+        backend.close(); ring.close()
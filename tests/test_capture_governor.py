@@ -0,0 +1,17 @@
+import threading
+import time
+
+from capture_governor import CaptureGovernor
+
+def test_idle_wait_ends_when_a_result_brings_detections():
+    governor = CaptureGovernor(min_fps=0.5, max_fps=100)
+    governor.wait()  # the first capture is due at once; the next one at the 2 s idle rate
+    waited = []
+    eye = threading.Thread(target=lambda: (governor.wait(), waited.append(time.perf_counter())))
+    started = time.perf_counter()
+    eye.start()
+    time.sleep(0.05)
+    governor.record_analysis(0.01, detections=3)
+    eye.join(timeout=2)
+    assert waited and waited[0] - started < 0.5
+    assert not governor.is_idle() and governor.target_fps() == 100
@@ -0,0 +1,117 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import click_scheduler
+from click_scheduler import ClickScheduler, TokenBucket
+from metrics import PipelineMetrics
+from target_queue import PriorityTargetQueue
+
+SPIN_STEP_NS = 1_000
+
+class FakeClock:
+    """
+    Replaces the time module of click_scheduler: sleeping advances the clock, and
+    so does every nanosecond reading, like a busy-wait loop would.
+    """
+
+    def __init__(self, monkeypatch):
+        self.now = 100.0
+        self.sleeps = []
+        monkeypatch.setattr(click_scheduler, "time", SimpleNamespace(perf_counter=lambda: self.now, perf_counter_ns=self.perf_counter_ns,
+                                                                     sleep=self.sleep))
+
+    def perf_counter_ns(self):
+        self.now += SPIN_STEP_NS / 1e9
+        return round(self.now * 1e9)
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    return FakeClock(monkeypatch)
+
+def test_token_bucket_starts_full_and_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=100, burst=5)
+    assert bucket.wait() == 5 and clock.sleeps == []
+    bucket.consume(5)
+    # One token takes 10 ms at 100/s
+    assert bucket.wait() == 1
+    assert sum(clock.sleeps) == pytest.approx(0.01)
+    bucket.consume(1)
+    clock.now += 0.035
+    assert bucket.wait() == 3
+
+def test_token_bucket_saves_up_at_most_a_burst(clock):
+    bucket = TokenBucket(rate=100, burst=5)
+    bucket.consume(2)
+    clock.now += 60
+    assert bucket.wait() == 5
+
+def test_token_bucket_wait_stops_when_asked(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.consume(1)
+    assert bucket.wait(lambda: len(clock.sleeps) < 3) == 0
+    # Long waits sleep in short steps so they can be interrupted
+    assert clock.sleeps == [0.05] * 3
+
+def test_hand_posts_batches_capped_by_batch_size_and_tokens():
+    import pipeline
+    batches = []
+    engine = SimpleNamespace(click_sink=lambda key, batch: batches.append(len(batch)), click_batch=4, window_max_cps=2000,
+                             metrics=PipelineMetrics(), add_clicks=lambda clicks: None)
+    session = SimpleNamespace(key=0, engine=engine, target_queue=PriorityTargetQueue(merge_radius=1), click_count=0,
+                              target_tracker=SimpleNamespace(record_latency=lambda latency: None),
+                              latency=SimpleNamespace(record=lambda latency: None))
+    now = time.perf_counter()
+    for i in range(11): session.target_queue.put(10 * i, 0, capture_time=now)
+    hand = pipeline.ClickActionWorker(session)
+    started = time.perf_counter()
+    hand.start()
+    while session.click_count < 11 and time.perf_counter() - started < 5: time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    hand.stop()
+    assert sum(batches) == session.click_count == 11
+    # The full bucket allows one whole batch, after that the tokens set the pace
+    assert batches[0] == 4 and max(batches) <= 4
+    assert elapsed >= (11 - 4) / 2000
+
+def test_ticks_follow_absolute_deadlines(clock):
+    scheduler = ClickScheduler.from_cps(100, clicks_per_tick=4)
+    assert scheduler.period_ns == 40_000_000
+    scheduler.start()
+    start = clock.now
+    for tick in range(1, 11):
+        clock.now += 0.003  # the clicks themselves take time, which must not add up
+        assert scheduler.wait() < 10 * SPIN_STEP_NS
+        assert abs(clock.now - (start + tick * 0.04)) < 1e-4
+    assert scheduler.stats()["ticks"] == 10 and scheduler.missed == 0
+
+def test_sleeps_end_one_spin_threshold_before_the_deadline(clock):
+    scheduler = ClickScheduler(0.01, spin_threshold=0.002)
+    scheduler.start()
+    scheduler.wait()
+    assert clock.sleeps == [pytest.approx(0.008, abs=1e-5)]
+
+def test_missed_periods_are_skipped_not_replayed(clock):
+    scheduler = ClickScheduler(0.01)
+    scheduler.start()
+    start = clock.now
+    clock.now += 0.0355
+    assert scheduler.wait() == pytest.approx(25_500_000, abs=10 * SPIN_STEP_NS)
+    assert scheduler.missed == 2
+    # The next deadline stays on the original grid
+    scheduler.wait()
+    assert abs(clock.now - (start + 0.04)) < 1e-4
+    assert scheduler.stats()["missed"] == 2 and scheduler.stats()["target_rate"] == pytest.approx(100)
+
+def test_event_waits_can_be_interrupted(clock):
+    scheduler = ClickScheduler(0.01)
+    deadline = round((clock.now + 1) * 1e9)
+    assert scheduler.wait_for_event(deadline, lambda: len(clock.sleeps) < 2) is None
+    assert clock.sleeps == [0.05, 0.05] and scheduler.ticks == 0
+    assert scheduler.wait_for_event(deadline) < 10 * SPIN_STEP_NS
+    assert scheduler.ticks == 1 and scheduler.stats()["jitter_max_us"] < 10
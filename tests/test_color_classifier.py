@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from color_classifier import AMBIGUOUS, ColorClassifier, _color_distance, parse_hex_color
+
+COLORS = ("#FF0000", "#10A0C3", "#808080")
+
+def exact_rgb_labels(pixels_rgb, colors, tolerance):
+    """The original per-pixel check: every channel within `tolerance`, first color wins."""
+    labels = np.zeros(pixels_rgb.shape[:-1], dtype=np.uint8)
+    for label, color in enumerate(colors, start=1):
+        hits = np.all(np.abs(pixels_rgb.astype(np.int16) - parse_hex_color(color)) <= tolerance, axis=-1)
+        labels[hits & (labels == 0)] = label
+    return labels
+
+@pytest.mark.parametrize("tolerance", [0, 1, 10])
+@pytest.mark.parametrize("channel_order", ["RGB", "BGRA"])
+def test_matches_exact_per_pixel_check(tolerance, channel_order):
+    rng = np.random.default_rng(tolerance)
+    targets = np.array([parse_hex_color(color) for color in COLORS])
+    # Pixels around each target (inside, on and just past the tolerance) plus random ones
+    near = targets[rng.integers(0, len(COLORS), 50000)] + rng.integers(-tolerance - 5, tolerance + 6, (50000, 3))
+    pixels_rgb = np.clip(np.concatenate([near, targets, rng.integers(0, 256, (20000, 3))]), 0, 255).astype(np.uint8)
+    pixels = pixels_rgb[:, ["RGB".index(c) for c in channel_order[:3]]]
+    if len(channel_order) == 4:
+        pixels = np.concatenate([pixels, np.full((len(pixels), 1), 255, dtype=np.uint8)], axis=1)
+
+    classifier = ColorClassifier(tuple((color, float(tolerance), "rgb") for color in COLORS), channel_order=channel_order)
+    np.testing.assert_array_equal(classifier.labels(pixels[None])[0], exact_rgb_labels(pixels_rgb, COLORS, tolerance))
+
+def test_exact_target_color_matches_at_zero_tolerance():
+    classifier = ColorClassifier((("#FF0000", 0.0, "rgb"),))
+    pixels = np.array([[[255, 0, 0], [254, 0, 0], [255, 1, 0]]], dtype=np.uint8)
+    assert classifier.labels(pixels).tolist() == [[1, 0, 0]]
+
+@pytest.mark.parametrize("mode", ["hsv", "lab"])
+def test_other_modes_match_exact_distance(mode):
+    rng = np.random.default_rng(7)
+    pixels = rng.integers(0, 256, (30000, 3)).astype(np.uint8)
+    pixels[:10000] = np.clip(np.array(parse_hex_color(COLORS[1])) + rng.integers(-12, 13, (10000, 3)), 0, 255)
+    classifier = ColorClassifier(((COLORS[1], 10.0, mode),))
+    expected = _color_distance(mode, pixels.astype(np.float64), np.array(parse_hex_color(COLORS[1]), dtype=np.float64)) <= 10
+    np.testing.assert_array_equal(classifier.labels(pixels[None])[0] == 1, expected)
+
+def random_colors(count, seed=3):
+    rng = np.random.default_rng(seed)
+    return ["#%02X%02X%02X" % tuple(rng.integers(0, 256, 3)) for _ in range(count)]
+
+@pytest.mark.parametrize("mode", ["rgb", "hsv", "lab"])
+def test_many_colors_match_exact_distance(mode):
+    colors = random_colors(12)
+    rng = np.random.default_rng(11)
+    targets = np.array([parse_hex_color(color) for color in colors])
+    near = targets[rng.integers(0, len(colors), 40000)] + rng.integers(-15, 16, (40000, 3))
+    pixels_rgb = np.clip(np.concatenate([near, rng.integers(0, 256, (20000, 3))]), 0, 255).astype(np.uint8)
+    expected = np.zeros(len(pixels_rgb), dtype=np.uint8)
+    for label, color in enumerate(colors, start=1):
+        hits = _color_distance(mode, pixels_rgb.astype(np.float64), np.array(parse_hex_color(color), dtype=np.float64)) <= 10
+        expected[hits & (expected == 0)] = label
+    pixels = np.concatenate([pixels_rgb[:, ::-1], np.full((len(pixels_rgb), 1), 255, dtype=np.uint8)], axis=1)  # BGRA
+    classifier = ColorClassifier(tuple((color, 10.0, mode) for color in colors), channel_order="BGRA")
+    np.testing.assert_array_equal(classifier.labels(pixels[None])[0], expected)
+
+@pytest.mark.parametrize("mode", ["rgb", "hsv", "lab"])
+def test_ambiguous_cells_stay_a_small_fraction(mode):
+    # Only cells straddling a tolerance boundary are ambiguous, not every cell near a color
+    classifier = ColorClassifier(tuple((color, 10.0, mode) for color in random_colors(20)))
+    assert np.mean(classifier.lut == AMBIGUOUS) < 0.08
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from color_classifier import build_color_specs, get_color_classifier
+from detection import filter_points_by_distance, find_blobs, find_matching_pixels, pyramid_stride, stitch_blobs
+
+def greedy_filter(points, min_distance):
+    """The original filter: keep a point unless it conflicts with an earlier kept point."""
+    kept = []
+    for point in points:
+        if all(abs(point[0] - other[0]) >= min_distance or abs(point[1] - other[1]) >= min_distance for other in kept):
+            kept.append(point)
+    return kept
+
+def test_rejected_first_point_does_not_discard_its_cell():
+    points = [[35, 33], [12, 25], [18, 16], [10, 31], [11, 7]]
+    assert filter_points_by_distance(points, 10).tolist() == [[35, 33], [12, 25], [11, 7]]
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_greedy_filter(seed):
+    rng = np.random.default_rng(seed)
+    count, min_distance, span = int(rng.integers(1, 400)), int(rng.integers(2, 16)), int(rng.integers(10, 250))
+    points = np.column_stack([rng.integers(0, span, (count, 2)), rng.integers(1, 4, count)])
+    expected = greedy_filter(points.tolist(), min_distance)
+    assert filter_points_by_distance(points, min_distance).tolist() == expected
+
+def test_dense_region_matches_greedy_filter():
+    ys, xs = np.nonzero(np.ones((40, 60), dtype=bool))
+    points = np.column_stack([xs, ys])
+    assert filter_points_by_distance(points, 7).tolist() == greedy_filter(points.tolist(), 7)
+
+def tiled_blobs(label_image, tile_height, tile_width, min_area=1):
+    height, width = label_image.shape
+    rows = [find_blobs(label_image[y:y + tile_height, x:x + tile_width], (x, y), min_area)
+            for y in range(0, height, tile_height) for x in range(0, width, tile_width)]
+    return stitch_blobs(np.concatenate(rows), min_area)
+
+def sorted_rows(blobs):
+    return sorted(map(tuple, blobs.tolist()))
+
+def test_seam_does_not_join_blobs_whose_pixels_do_not_touch():
+    # A U-shape touches the seam (x = 3 | 4) at rows 1 and 7; a separate pixel sits across it at row 4
+    label_image = np.zeros((9, 8), dtype=np.uint8)
+    label_image[1, 1:4] = 1; label_image[7, 1:4] = 1; label_image[1:8, 1] = 1
+    label_image[4, 4] = 1
+    whole = stitch_blobs(find_blobs(label_image))
+    assert len(whole) == 2
+    assert sorted_rows(tiled_blobs(label_image, 9, 4)) == sorted_rows(whole)
+
+@pytest.mark.parametrize("seed", range(10))
+def test_tiled_blobs_match_whole_frame(seed):
+    rng = np.random.default_rng(seed)
+    label_image = (rng.random((60, 80)) < 0.35) * rng.integers(1, 3, (60, 80)).astype(np.uint8)
+    whole = stitch_blobs(find_blobs(label_image, min_area=3), min_area=3)
+    tile_height, tile_width = int(rng.integers(3, 20)), int(rng.integers(3, 20))
+    assert sorted_rows(tiled_blobs(label_image, tile_height, tile_width, min_area=3)) == sorted_rows(whole)
+
+def test_pyramid_stride_is_capped_by_the_minimum_target_size():
+    assert pyramid_stride(20) == 10
+    assert pyramid_stride(20, min_target_size=3) == 3
+    assert pyramid_stride(4, min_target_size=8) == 2
+
+def test_pyramid_search_finds_targets_of_the_minimum_size():
+    pixels = np.zeros((64, 64, 3), dtype=np.uint8)
+    pixels[23:26, 43:46] = (255, 0, 0)  # 3x3, between the samples of a stride of 10
+    classifier = get_color_classifier(build_color_specs(["#FF0000"], tolerance=0))
+    assert len(find_matching_pixels(pixels, classifier, pyramid_stride(20))[0]) == 0
+    ys, xs, _ = find_matching_pixels(pixels, classifier, pyramid_stride(20, min_target_size=3))
+    assert len(ys) == 9
@@ -0,0 +1,121 @@
+import ctypes
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import fast_input
+from engine import ClickWorker
+from fast_input import (MOUSEEVENTF_ABSOLUTE, MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP, MOUSEEVENTF_MOVE, MOUSEEVENTF_RIGHTDOWN,
+                        MOUSEEVENTF_RIGHTUP, INPUT_MOUSE, INPUT_SIZE, Input, compile_burst, compile_timeline, fast_click,
+                        fast_move_and_click, send_burst, send_event_group)
+from macro import MacroStep, Timeline
+from metrics import PipelineMetrics
+
+MOVE = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE
+MOVE_CLICK = MOVE | MOUSEEVENTF_LEFTDOWN | MOUSEEVENTF_LEFTUP
+
+class FakeUser32:
+    """Stands in for user32: a 1920x1080 screen that records every SendInput call."""
+
+    def __init__(self, width=1920, height=1080):
+        self.metrics = {0: width, 1: height}
+        self.calls = []
+
+    def GetSystemMetrics(self, index):
+        return self.metrics[index]
+
+    def SendInput(self, count, inputs, size):
+        assert size == INPUT_SIZE
+        # Input arrays and byref(array, offset) pointers alike
+        inputs = ctypes.cast(inputs, ctypes.POINTER(Input))
+        self.calls.append((count, [(inp.type, inp.ii.mi.dx, inp.ii.mi.dy, inp.ii.mi.dwFlags) for inp in inputs[:count]]))
+        return count
+
+@pytest.fixture
+def user32():
+    original = fast_input.user32
+    fake = FakeUser32()
+    fast_input.use_user32(fake)
+    yield fake
+    fast_input.use_user32(original)
+
+def test_use_user32_reads_screen_metrics(user32):
+    assert (fast_input.SCREEN_WIDTH, fast_input.SCREEN_HEIGHT) == (1920, 1080)
+
+def test_fast_click_sends_down_and_up_in_one_call(user32):
+    fast_click()
+    assert user32.calls == [(2, [(INPUT_MOUSE, 0, 0, MOUSEEVENTF_LEFTDOWN), (INPUT_MOUSE, 0, 0, MOUSEEVENTF_LEFTUP)])]
+
+def test_fast_move_and_click_scales_to_absolute_coordinates(user32):
+    fast_move_and_click(0, 0)
+    fast_move_and_click(1919, 1079)
+    assert user32.calls == [(1, [(INPUT_MOUSE, 0, 0, MOVE_CLICK)]), (1, [(INPUT_MOUSE, 65500, 65474, MOVE_CLICK)])]
+
+def test_burst_is_one_send_input_call(user32):
+    burst = compile_burst([(0, 0), (960, 540), (1919, 1079)])
+    assert send_burst(burst) == 3
+    assert user32.calls == [(3, [(INPUT_MOUSE, 0, 0, MOVE_CLICK), (INPUT_MOUSE, 32767, 32767, MOVE_CLICK),
+                                 (INPUT_MOUSE, 65500, 65474, MOVE_CLICK)])]
+
+def test_empty_burst_sends_nothing(user32):
+    assert send_burst(compile_burst([])) == 0
+    assert user32.calls == []
+
+def held_timeline():
+    """A left click at the origin, then a right button held 0.02 s at the center, 0.01 s later."""
+    return Timeline([MacroStep(0, 0), MacroStep(960, 540, delay=0.01, button="right", hold=0.02)], loop_delay=0.03)
+
+def test_timeline_groups_are_sent_from_their_offsets(user32):
+    timeline = Timeline([MacroStep(0, 0, repeat=2, interval=0.0, hold=0.01), MacroStep(1919, 1079)], loop_delay=0.0)
+    compiled = compile_timeline(*timeline.events())
+    # Events sharing a timestamp (a release and the next press) form one group
+    assert (compiled.offsets_ns, compiled.counts, compiled.clicks) == ([0, 10_000_000, 20_000_000], [1, 2, 2], [1, 1, 1])
+    assert [send_event_group(compiled, group) for group in range(3)] == [1, 2, 2]
+    down, up = MOVE | MOUSEEVENTF_LEFTDOWN, MOVE | MOUSEEVENTF_LEFTUP
+    assert user32.calls == [(1, [(INPUT_MOUSE, 0, 0, down)]),
+                            (2, [(INPUT_MOUSE, 0, 0, up), (INPUT_MOUSE, 0, 0, down)]),
+                            (2, [(INPUT_MOUSE, 0, 0, up), (INPUT_MOUSE, 65500, 65474, MOVE_CLICK)])]
+
+def test_held_buttons_count_one_click_per_press(user32):
+    compiled = compile_timeline(*held_timeline().events())
+    assert compiled.count == 3 and compiled.duration_ns == 60_000_000
+    assert compiled.counts == [1, 1, 1] and compiled.clicks == [1, 1, 0]
+    for group in range(3): send_event_group(compiled, group)
+    assert [inputs for _, inputs in user32.calls] == [[(INPUT_MOUSE, 0, 0, MOVE_CLICK)],
+                                                      [(INPUT_MOUSE, 32767, 32767, MOVE | MOUSEEVENTF_RIGHTDOWN)],
+                                                      [(INPUT_MOUSE, 32767, 32767, MOVE | MOUSEEVENTF_RIGHTUP)]]
+
+def test_timeline_playback_loops_the_groups_in_order(user32):
+    clicks, errors = [], []
+    engine = SimpleNamespace(metrics=PipelineMetrics(), add_clicks=clicks.append, report_error=errors.append)
+    worker = ClickWorker(engine, "multi-position", 0.01, [], timeline=held_timeline())
+    worker.start(); time.sleep(0.25); worker.stop()
+    assert errors == []
+    flags = [inputs[0][3] for _, inputs in user32.calls]
+    loops = len(flags) // 3
+    assert loops >= 2
+    assert flags[:3 * loops] == [MOVE_CLICK, MOVE | MOUSEEVENTF_RIGHTDOWN, MOVE | MOUSEEVENTF_RIGHTUP] * loops
+    # Presses only: the release of a held button is not another click
+    assert sum(clicks) == sum(1 for flag in flags if flag != MOVE | MOUSEEVENTF_RIGHTUP)
+
+@pytest.fixture
+def posted(monkeypatch):
+    """Stands in for pywin32: records every PostMessage as (hwnd, message, wparam, x, y)."""
+    messages = []
+    monkeypatch.setattr(fast_input, "win32api", SimpleNamespace(MAKELONG=lambda low, high: (high << 16) | low))
+    monkeypatch.setattr(fast_input, "win32con", SimpleNamespace(WM_LBUTTONDOWN=0x201, WM_LBUTTONUP=0x202, MK_LBUTTON=1))
+    monkeypatch.setattr(fast_input, "win32gui", SimpleNamespace(
+        PostMessage=lambda hwnd, message, wparam, lparam: messages.append((hwnd, message, wparam, lparam & 0xFFFF, lparam >> 16))))
+    return messages
+
+def test_background_clicks_post_down_and_up_per_target(posted):
+    fast_input.fast_background_clicks(7, [(10, 20, 0, 1.0, 1.0), (300, 5)])
+    assert posted == [(7, 0x201, 1, 10, 20), (7, 0x202, 0, 10, 20), (7, 0x201, 1, 300, 5), (7, 0x202, 0, 300, 5)]
+    fast_input.fast_background_clicks(7, [])
+    assert len(posted) == 4
+
+def test_background_clicks_need_pywin32(monkeypatch):
+    monkeypatch.setattr(fast_input, "win32api", None)
+    with pytest.raises(RuntimeError):
+        fast_input.fast_background_clicks(7, [(1, 1)])
@@ -0,0 +1,49 @@
+import pytest
+
+from frame_ring import FREE, IN_FLIGHT, PENDING, FrameRing
+
+@pytest.fixture
+def ring():
+    ring = FrameRing((4, 4, 4), slots=3, max_in_flight=2)
+    yield ring
+    ring.close()
+
+def capture(ring):
+    slot = ring.acquire()
+    ring.publish(slot, capture_time=0.0)
+    return slot
+
+def test_in_flight_limit(ring):
+    first, second, third = capture(ring), capture(ring), capture(ring)
+    assert [ring.next_submission(), ring.next_submission()] == [first, second]
+    # Two frames in flight: the third waits even though it is ready
+    assert ring.next_submission() is None and third.state == PENDING
+    ring.release(first)
+    assert ring.next_submission() is third and third.state == IN_FLIGHT
+
+def test_released_slots_are_reused_before_pending_ones_are_dropped(ring):
+    first, second = capture(ring), capture(ring)
+    ring.next_submission()
+    ring.release(first)
+    assert first.state == FREE
+    # The free slot is written next; the pending frame is kept
+    assert ring.acquire() is first and ring.dropped_frames == 0
+    assert second.state == PENDING
+
+def test_oldest_pending_frame_is_dropped_when_no_slot_is_free(ring):
+    first, second, third = capture(ring), capture(ring), capture(ring)
+    assert ring.next_submission() is first
+    assert ring.acquire() is second and ring.dropped_frames == 1
+    ring.publish(second, capture_time=0.0)
+    # Frame IDs keep increasing, so the remaining older frame is submitted first
+    assert (third.frame_id, second.frame_id) == (2, 3)
+    assert [ring.next_submission(), ring.next_submission()] == [third, None]
+
+def test_stale_results_are_reported(ring):
+    assert ring.mark_delivered(1)
+    assert not ring.mark_delivered(0)
+    assert ring.mark_delivered(2) and ring.stale_results == 1
+
+def test_in_flight_limit_must_leave_a_free_slot():
+    with pytest.raises(ValueError):
+        FrameRing((4, 4, 4), slots=2, max_in_flight=2)
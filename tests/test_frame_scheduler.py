@@ -0,0 +1,55 @@
+from frame_scheduler import RoundRobinScheduler
+
+class FakePool:
+    """Holds started frames until the test finishes them."""
+
+    def __init__(self):
+        self.started = []  # (name, callback, error_callback)
+
+    def start(self, name):
+        return lambda callback, error_callback: self.started.append((name, callback, error_callback))
+
+    def names(self):
+        return [name for name, _, _ in self.started]
+
+def submit(scheduler, pool, key, name, done):
+    scheduler.submit(key, pool.start(name), done.append, lambda error: done.append(("error", name, str(error))))
+
+def test_windows_take_turns_whatever_their_capture_rate():
+    scheduler, pool, done = RoundRobinScheduler(capacity=1), FakePool(), []
+    for i in range(3): submit(scheduler, pool, "a", f"a{i}", done)
+    submit(scheduler, pool, "b", "b0", done)
+    submit(scheduler, pool, "c", "c0", done)
+    assert pool.names() == ["a0"] and scheduler.pending() == 4
+    for i in range(5):
+        pool.started[i][1](pool.started[i][0])
+    assert pool.names() == ["a0", "b0", "c0", "a1", "a2"]
+    assert done == pool.names() and scheduler.pending() == 0
+
+def test_capacity_caps_frames_in_flight():
+    scheduler, pool, done = RoundRobinScheduler(capacity=2), FakePool(), []
+    for i in range(3): submit(scheduler, pool, "a", f"a{i}", done)
+    assert pool.names() == ["a0", "a1"] and scheduler.pending("a") == 1
+    # Errors free their place too
+    pool.started[1][2](RuntimeError("boom"))
+    assert pool.names() == ["a0", "a1", "a2"] and done == [("error", "a1", "boom")]
+
+def test_cancel_drops_only_the_waiting_frames_of_a_window():
+    scheduler, pool, done = RoundRobinScheduler(capacity=1), FakePool(), []
+    for i in range(2): submit(scheduler, pool, "a", f"a{i}", done)
+    for i in range(2): submit(scheduler, pool, "b", f"b{i}", done)
+    scheduler.cancel("b")
+    assert scheduler.pending("b") == 0 and scheduler.pending() == 1
+    # The frame already in flight still completes, and "a" now has the pool to itself
+    pool.started[0][1]("a0")
+    pool.started[1][1]("a1")
+    assert pool.names() == ["a0", "a1"] and done == ["a0", "a1"]
+    submit(scheduler, pool, "b", "b2", done)
+    assert pool.names() == ["a0", "a1", "b2"]
+
+def test_a_failing_start_reports_the_error_and_frees_its_place():
+    scheduler, pool, done = RoundRobinScheduler(capacity=1), FakePool(), []
+    def broken(callback, error_callback): raise OSError("pool closed")
+    scheduler.submit("a", broken, done.append, lambda error: done.append(("error", str(error))))
+    submit(scheduler, pool, "b", "b0", done)
+    assert done == [("error", "pool closed")] and pool.names() == ["b0"]
@@ -0,0 +1,28 @@
+import pytest
+
+from macro import MacroStep, Timeline
+
+def test_held_repeats_release_before_the_next_press():
+    timeline = Timeline([MacroStep(1, 1, repeat=2, interval=0.0, hold=0.02), MacroStep(5, 5, button="right")], loop_delay=0.1)
+    events, duration = timeline.events()
+    # A release and the next press share a timestamp; the sort keeps the release first
+    assert events == [(0.0, 1, 1, "left", "down"), (0.02, 1, 1, "left", "up"), (0.02, 1, 1, "left", "down"),
+                      (0.04, 1, 1, "left", "up"), (0.04, 5, 5, "right", "click")]
+    assert duration == pytest.approx(0.14)
+
+def test_steps_follow_delays_and_repeat_intervals():
+    timeline = Timeline([MacroStep(1, 1, repeat=3, interval=0.01), MacroStep(2, 2, delay=0.5)], loop_delay=0.2)
+    events, duration = timeline.events()
+    assert [(round(offset, 9), x) for offset, x, _, _, _ in events] == [(0.0, 1), (0.01, 1), (0.02, 1), (0.52, 2)]
+    assert duration == pytest.approx(0.72)
+
+def test_from_positions_spaces_clicks_evenly():
+    events, duration = Timeline.from_positions([(1, 1), (2, 2), (3, 3)], 0.1).events()
+    assert [round(offset, 9) for offset, *_ in events] == [0.0, 0.1, 0.2]
+    assert {phase for *_, phase in events} == {"click"}
+    assert duration == pytest.approx(0.3)
+
+def test_invalid_steps_are_rejected():
+    with pytest.raises(ValueError): MacroStep(0, 0, button="back")
+    with pytest.raises(ValueError): MacroStep(0, 0, repeat=0)
+    with pytest.raises(ValueError): MacroStep(0, 0, hold=-1)
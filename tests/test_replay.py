@@ -0,0 +1,36 @@
+import threading
+
+import numpy as np
+
+from engine import AutoClickerEngine
+from frame_sources import FrameRecorder, ReplaySource, SyntheticSource
+
+def record(path, frames=20):
+    source = SyntheticSource(160, 120, ["#FF0000"], targets=3, target_size=8, speed=0.0, frames=frames, seed=1)
+    recorder = FrameRecorder(path, source.shape, max_frames=frames)
+    frame = np.empty(source.shape, dtype=np.uint8)
+    while source.grab_into(frame) is not None:
+        recorder.record(frame, 0.0)
+    recorder.close()
+    # Stationary targets: the centers of the squares drawn in every frame
+    return source._positions.astype(int) + (source.target_size - 1) / 2
+
+def test_recording_replays_through_the_pipeline(tmp_path):
+    path = str(tmp_path / "session.apxrec")
+    centers = record(path)
+    clicks, finished, errors = [], threading.Event(), []
+    engine = AutoClickerEngine(on_message=lambda message: None, on_error=lambda message: (errors.append(message), finished.set()))
+    engine.colors = ["#FF0000"]; engine.mode = "intelligent"; engine.analysis_backend = "inline"; engine.num_cores = 1
+    engine.detection = "blobs"; engine.click_cooldown = 60
+    engine.frame_source = ReplaySource(path)
+    engine.click_sink = lambda key, targets: clicks.extend((key, x, y) for x, y, *_ in targets)
+    engine.start()
+    try:
+        assert finished.wait(10)
+    finally:
+        engine.close()
+    assert errors == ["Frame source exhausted. Stopping."]
+    # One click per target (the cooldown outlasts the replay), at the blob centers
+    assert len(clicks) == len(centers) and {key for key, _, _ in clicks} == {0}
+    clicked = np.array(sorted((x, y) for _, x, y in clicks))
+    assert np.abs(clicked - centers[np.lexsort(centers.T[::-1])]).max() <= 0.5
@@ -0,0 +1,26 @@
+import time
+
+from target_queue import PriorityTargetQueue
+
+def test_newer_detection_replaces_queued_one():
+    queue = PriorityTargetQueue(merge_radius=10)
+    now = time.perf_counter()
+    assert queue.put(50, 50, capture_time=now - 0.1)
+    assert queue.put(53, 50, capture_time=now)
+    assert queue.replaced == 1
+    assert [target[:2] for target in queue.get_batch(10, timeout=0)] == [(53, 50)]
+
+def test_older_detection_is_dropped_when_a_newer_one_is_queued():
+    queue = PriorityTargetQueue(merge_radius=10)
+    now = time.perf_counter()
+    assert queue.put(50, 50, capture_time=now)
+    assert not queue.put(53, 50, capture_time=now - 0.1)
+    assert queue.replaced == 1
+    assert [target[:2] for target in queue.get_batch(10, timeout=0)] == [(50, 50)]
+
+def test_distant_targets_are_both_queued():
+    queue = PriorityTargetQueue(merge_radius=10)
+    now = time.perf_counter()
+    assert queue.put(50, 50, capture_time=now)
+    assert queue.put(80, 50, capture_time=now - 0.1)
+    assert len(queue.get_batch(10, timeout=0)) == 2
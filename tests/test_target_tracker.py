@@ -0,0 +1,25 @@
+from target_tracker import TargetTracker
+
+def test_stationary_target_is_clicked_once_per_cooldown():
+    tracker = TargetTracker(match_radius=10, cooldown=1.0)
+    assert tracker.update([(50, 50, 1)], timestamp=0.0) == [(50, 50, 1)]
+    assert tracker.update([(51, 50, 1)], timestamp=0.5) == []
+    assert tracker.update([(50, 51, 1)], timestamp=1.0) == [(50, 51, 1)]
+    assert len(tracker) == 1
+
+def test_fast_target_is_matched_at_its_predicted_position():
+    tracker = TargetTracker(match_radius=10, cooldown=10.0, max_age=1.0, velocity_smoothing=1.0)
+    clicks = []
+    # 80 px/s: 8 px per frame, then 32 px (more than match_radius) over a longer gap
+    for timestamp, x in ((0.0, 0), (0.1, 8), (0.2, 16), (0.3, 24), (0.7, 56)):
+        clicks += tracker.update([(x, 100)], timestamp=timestamp)
+    assert clicks == [(0, 100, 0)]
+    assert len(tracker) == 1
+
+def test_unmatched_tracks_expire():
+    tracker = TargetTracker(match_radius=10, max_age=0.5)
+    tracker.update([(10, 10)], timestamp=0.0)
+    tracker.update([(100, 100)], timestamp=0.4)
+    assert len(tracker) == 2
+    tracker.update([(100, 100)], timestamp=1.0)
+    assert len(tracker) == 1
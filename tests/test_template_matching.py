@@ -0,0 +1,75 @@
+import numpy as np
+
+from template_matching import BLOCK_SIZE, Template, TemplateMatcher, normalized_cross_correlation, suppress_overlaps
+
+TILE = 128
+
+def sprite():
+    """A 12x12 RGBA sprite: mostly red (the key color) with an asymmetric white and black pattern."""
+    rgba = np.zeros((12, 12, 4), dtype=np.uint8)
+    rgba[...] = (255, 0, 0, 255)
+    rgba[1:4, 1:9] = (255, 255, 255, 255)
+    rgba[7:11, 2:4] = (0, 0, 0, 255)
+    rgba[8, 5:11] = (0, 0, 0, 255)
+    return rgba
+
+def plant(frame, rgba, x, y):
+    frame[y:y + rgba.shape[0], x:x + rgba.shape[1], :3] = rgba[..., 2::-1]  # RGBA -> BGR
+
+def match_frame(matcher, frame):
+    """Matches every tile the way analysis does: each tile extended by the matcher's margin."""
+    margin_y, margin_x = matcher.margin
+    centers = []
+    for y in range(0, frame.shape[0], TILE):
+        for x in range(0, frame.shape[1], TILE):
+            ys, xs, labels = matcher.find(frame[y:y + TILE + margin_y, x:x + TILE + margin_x], TILE, TILE)
+            centers += [(int(cx) + x, int(cy) + y, int(label)) for cy, cx, label in zip(ys, xs, labels)]
+    return sorted(centers)
+
+def brute_force_ncc(gray, template):
+    th, tw = template.height, template.width
+    scores = np.zeros((gray.shape[0] - th + 1, gray.shape[1] - tw + 1))
+    for y in range(scores.shape[0]):
+        for x in range(scores.shape[1]):
+            window = gray[y:y + th, x:x + tw] - gray[y:y + th, x:x + tw].mean()
+            norm = np.sqrt(np.sum(window ** 2)) * template.norm
+            scores[y, x] = np.sum(window * template.zero_mean) / norm if norm > 1e-6 * template.norm else 0.0
+    return scores
+
+def test_ncc_matches_brute_force():
+    rng = np.random.default_rng(1)
+    template = Template("sprite", sprite())
+    blocks = rng.uniform(0, 255, (3, 30, 37))
+    blocks[1, 5:17, 9:21] = template.zero_mean * 2 + 40  # a scaled, shifted copy scores 1
+    blocks[2, :, :20] = 90  # flat windows score 0
+    scores = normalized_cross_correlation(blocks, template)
+    for block, block_scores in zip(blocks, scores):
+        assert np.allclose(block_scores, brute_force_ncc(block, template), atol=1e-9)
+    assert abs(scores[1, 5, 9] - 1) < 1e-9
+    assert scores[1].argmax() == np.ravel_multi_index((5, 9), scores[1].shape)
+    assert (scores[2, :, :20 - 12 + 1] == 0).all()
+
+def test_planted_sprites_are_found_once_and_recolored_ones_are_rejected():
+    rng = np.random.default_rng(2)
+    frame = np.zeros((2 * TILE, 2 * TILE, 4), dtype=np.uint8)
+    frame[..., :3] = rng.integers(0, 256, (2 * TILE, 2 * TILE, 1), dtype=np.uint8)
+    frame[..., 3] = 255
+    rgba = sprite()
+    # Two sprites share one correlation block, one sits in another block, one straddles the tile seam
+    positions = [(5, 5), (30, 20), (3 * BLOCK_SIZE + 7, 70), (100, TILE - 6)]
+    for x, y in positions:
+        plant(frame, rgba, x, y)
+    # Same luma as the key color, so only the key-color pre-filter tells it apart
+    recolored = rgba.copy()
+    recolored[(rgba[..., :3] == (255, 0, 0)).all(axis=-1)] = (76, 76, 76, 255)
+    plant(frame, recolored, 180, 180)
+    template = Template("sprite", rgba)
+    gray = frame[180:192, 180:192, 2::-1] @ np.array([0.299, 0.587, 0.114])
+    assert brute_force_ncc(gray, template)[0, 0] > 0.99
+
+    matcher = TemplateMatcher([template], channel_order="BGRA", first_label=3)
+    assert match_frame(matcher, frame) == sorted((x + 6, y + 6, 3) for x, y in positions)
+
+def test_suppress_overlaps_keeps_the_best_of_each_cluster():
+    centers = np.array([[50, 50], [52, 49], [10, 10], [50, 56], [11, 12]])
+    assert suppress_overlaps(centers, 6).tolist() == [[50, 50], [10, 10], [50, 56]]
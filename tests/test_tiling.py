@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from tiling import MIN_TILE_ROWS, TILE_ALIGN, AdaptiveTiler, DirtyTileTracker, RegionOfInterest, _polygon_mask
+
+SHAPE = (1080, 1920, 4)
+
+def coverage(tiles, shape):
+    counts = np.zeros(shape[:2], dtype=int)
+    for y, x, h, w in tiles:
+        counts[y:y + h, x:x + w] += 1
+    return counts
+
+def feed(tiler, ns_per_pixel, frames=60):
+    for _ in range(frames):
+        tiles = tiler.tiles(SHAPE)
+        tiler.record(tiles, [ns_per_pixel * h * w for _, _, h, w in tiles])
+    return tiler.tiles(SHAPE)
+
+def test_initial_tiles_cover_the_frame_once_with_work_for_every_worker():
+    tiler = AdaptiveTiler(4)
+    tiles = tiler.tiles(SHAPE)
+    assert (coverage(tiles, SHAPE) == 1).all()
+    assert len(tiles) >= 4 * 4
+    assert tiler.tile_size(SHAPE) == (tiles[0][2], SHAPE[1])
+
+def test_record_converges_to_the_target_cost():
+    tiler = AdaptiveTiler(1, target_cost=0.002)
+    tiles = feed(tiler, ns_per_pixel=100)
+    # 2 ms / 100 ns = 20000 pixels: narrower than a full-width band of MIN_TILE_ROWS
+    assert tiler.tile_size(SHAPE) == (MIN_TILE_ROWS, 20000 // MIN_TILE_ROWS // TILE_ALIGN * TILE_ALIGN)
+    assert (coverage(tiles, SHAPE) == 1).all()
+    assert abs(tiler.ns_per_pixel - 100) < 1e-6
+    assert feed(tiler, ns_per_pixel=100) is tiles
+
+def test_record_clamps_the_tile_size():
+    tiler = AdaptiveTiler(1)
+    feed(tiler, ns_per_pixel=1e6)
+    assert tiler.tile_size(SHAPE) == (MIN_TILE_ROWS, TILE_ALIGN)
+
+    tiler = AdaptiveTiler(2, tiles_per_worker=4)
+    tiles = feed(tiler, ns_per_pixel=1e-3)
+    # Never fewer than tiles_per_worker tiles per worker
+    assert tiler.tile_size(SHAPE) == (SHAPE[0] // 8, SHAPE[1])
+    assert len(tiles) == 8
+
+def test_small_cost_changes_do_not_retile():
+    tiler = AdaptiveTiler(1)
+    tiles = feed(tiler, ns_per_pixel=100)
+    assert feed(tiler, ns_per_pixel=130) is tiles
+    assert feed(tiler, ns_per_pixel=400) is not tiles
+
+def test_dirty_tracker_and_region_follow_rectangular_tiles():
+    tracker = DirtyTileTracker(SHAPE, (MIN_TILE_ROWS, 1248))
+    frame = np.zeros(SHAPE, dtype=np.uint8)
+    tracker.dirty_tiles(frame)
+    frame[100, 1500, 1] = 7
+    assert [tracker.tiles[i] for i in tracker.dirty_tiles(frame)] == [(96, 1248, 16, 672)]
+
+    region = RegionOfInterest(rects=[(0, 0, 100, 50)]).compile(SHAPE)
+    region.retile((16, 64))
+    assert region.tile_size == (16, 64)
+    assert [region.tiles[i] for i in region.tile_indices] == [(y, x, min(16, 50 - y), min(64, 100 - x)) for y in (0, 16, 32, 48) for x in (0, 64)]
+    assert region.tile_masks == {}
+
+def test_dirty_tracker_first_frame_is_all_dirty_then_only_changed_tiles():
+    tracker = DirtyTileTracker((300, 260, 4), 128)
+    frame = np.random.default_rng(0).integers(0, 256, (300, 260, 4), dtype=np.uint8)
+    assert tracker.dirty_tiles(frame) == list(range(len(tracker.tiles))) == list(range(9))
+    assert tracker.dirty_tiles(frame.copy()) == []
+    # One pixel in the partial bottom-right tile, then one in a full tile
+    frame[299, 259, 0] ^= 1
+    assert tracker.dirty_tiles(frame) == [8]
+    frame[130, 5, 2] ^= 0x80
+    assert tracker.dirty_tiles(frame) == [3]
+
+def test_dirty_tracker_sees_content_moving_inside_a_tile():
+    tracker = DirtyTileTracker((128, 128, 4), 128)
+    frame = np.zeros((128, 128, 4), dtype=np.uint8)
+    frame[10, 10] = 200
+    tracker.dirty_tiles(frame)
+    # Same pixel sum, moved along x and then along y
+    frame[10, 10], frame[10, 40] = 0, 200
+    assert tracker.dirty_tiles(frame) == [0]
+    frame[10, 40], frame[70, 40] = 0, 200
+    assert tracker.dirty_tiles(frame) == [0]
+
+def test_dirty_tracker_keeps_the_newest_result_per_tile():
+    tracker = DirtyTileTracker((256, 128, 4), 128)
+    assert sorted(tracker.update([0, 1], ["a0", "b0"], frame_id=0)) == ["a0", "b0"]
+    # A late result of an older frame never replaces a newer one
+    assert sorted(tracker.update([0], ["a2"], frame_id=2)) == ["a2", "b0"]
+    assert sorted(tracker.update([0, 1], ["a1", "b1"], frame_id=1)) == ["a2", "b1"]
+    tracker.invalidate()
+    assert tracker.cached_results() == []
+    assert tracker.dirty_tiles(np.zeros((256, 128, 4), dtype=np.uint8)) == [0, 1]
+
+def test_polygon_mask_uses_pixel_centers_and_even_odd():
+    square = _polygon_mask([(2, 1), (6, 1), (6, 4), (2, 4)], 6, 8)
+    assert np.argwhere(square).tolist() == [[y, x] for y in (1, 2, 3) for x in (2, 3, 4, 5)]
+    # A pentagram winds twice around its center, which the even-odd rule leaves out
+    angles = np.radians(-90 + 144 * np.arange(5))
+    star = np.column_stack((50 + 40 * np.cos(angles), 50 + 40 * np.sin(angles))).round()
+    mask = _polygon_mask(star, 100, 100)
+    assert mask[15, 50] and mask[40, 20] and not mask[50, 50]
+
+def test_compiled_region_drops_tiles_outside_the_polygon():
+    # An L shape with a cut corner: the tile in the notch of the L is dropped
+    roi = RegionOfInterest(polygons=[[(100, 60), (110, 50), (356, 50), (356, 178), (228, 178), (228, 306), (100, 306)]])
+    region = roi.compile((400, 500, 4), tile_size=128)
+    assert region.origin == (100, 50) and region.shape == (256, 256, 4)
+    assert region.tiles == [(0, 0, 128, 128), (0, 128, 128, 128), (128, 0, 128, 128), (128, 128, 128, 128)]
+    assert region.tile_indices == [0, 1, 2]
+    # Only the tile with the cut corner needs a mask
+    assert list(region.tile_masks) == [0]
+    assert not region.tile_masks[0][0, 0] and region.tile_masks[0][127, 127]
+    assert not region.mask[128:, 128:].any()
+
+def test_compiled_region_must_overlap_the_window():
+    with pytest.raises(ValueError):
+        RegionOfInterest(rects=[(600, 0, 10, 10)]).compile((400, 500, 4))
+    assert RegionOfInterest().compile((40, 50, 4)).mask.all()